@@ -20,13 +20,16 @@ import time
 import hashlib
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Any
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Any, Iterable
 
 # Local module imports
 from config import (
-    VERSION, MAX_WORKERS, MODEL, MAX_TOKENS,
-    ENV_DIR, obtenir_api_key
+    VERSION, MAX_WORKERS, ADAPTIVE_MAX_WORKERS, API_URL, MODEL, MAX_TOKENS,
+    ENV_DIR, CONNECT_TIMEOUT, READ_TIMEOUT, RATE_LIMIT_RPM, RATE_LIMIT_TPM, RATE_LIMIT_BURST_S,
+    CACHE_FILE, CACHE_TTL_DAYS, CACHE_MAX_MB, LOG_LEVEL, LOG_MAX_MB, LOG_BACKUPS,
+    MODEL_PRICING, PLAN_COMPLETION_TOKENS, PLAN_LATENCY_S,
+    VIRTUAL_LATENCY, VIRTUAL_MS_PER_PROMPT_TOKEN, VIRTUAL_MS_PER_COMPLETION_TOKEN,
+    obtenir_api_key
 )
 from utils import compter_tokens
 from extractors import extraire_messages, detecter_format_json
@@ -39,22 +42,37 @@ from help import afficher_aide, afficher_aide_avancee, afficher_changelog
 # Global variables for directories
 LOGS_DIR = None
 RESULTS_DIR = None
+LOG_WRITER = None
 
 
-def ecrire_log_local(message: str, niveau: str = "INFO") -> None:
-    """Writes to log file with the correct directory."""
-    if LOGS_DIR is None:
-        return
+def ouvrir_log(logs_dir: Path, niveau: str = LOG_LEVEL, max_mb: float = LOG_MAX_MB) -> None:
+    """
+    Starts the background log writer for `logs_dir`.
 
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    log_message = f"[{timestamp}] [{niveau}] {message}\n"
+    Args:
+        logs_dir: Logs directory
+        niveau: Lowest level written (DEBUG, INFO, WARNING, ERROR)
+        max_mb: Size in MB at which the log file is rotated (0 = never)
+    """
+    global LOG_WRITER
+    from log_writer import BackgroundLogWriter, install_signal_handlers
 
-    try:
-        log_file = LOGS_DIR / f"log.prompt_executor.{VERSION}.log"
-        with open(log_file, 'a', encoding='utf-8') as f:
-            f.write(log_message)
-    except Exception as e:
-        print(f"⚠️ Log error: {e}")
+    if LOG_WRITER is not None:
+        LOG_WRITER.close()
+    LOG_WRITER = BackgroundLogWriter(
+        logs_dir / f"log.prompt_executor.{VERSION}.log",
+        level=niveau,
+        max_bytes=int(max_mb * 1024 * 1024) if max_mb else None,
+        backups=LOG_BACKUPS
+    ).start()
+    install_signal_handlers(LOG_WRITER)
+
+
+def ecrire_log_local(message: str, niveau: str = "INFO") -> None:
+    """Queues a line for the log file; the write happens in the background."""
+    if LOG_WRITER is None:
+        return
+    LOG_WRITER.write(message, niveau)
 
 
 def ensure_directory(directory: str) -> Path:
@@ -72,6 +90,18 @@ def ensure_directory(directory: str) -> Path:
     return dir_path
 
 
+def compter_messages_bruts(conv: Dict, format_conv: str) -> int:
+    """Counts raw messages of a conversation without extracting their text."""
+    if format_conv == "chatgpt":
+        mapping = conv.get("mapping", {})
+        return len([m for m in mapping.values() if isinstance(m, dict) and m.get("message")])
+    elif format_conv == "lechat":
+        return len(conv.get("messages", conv.get("exchanges", [])))
+    elif format_conv == "claude":
+        return len(conv.get("chat_messages", []))
+    return 0
+
+
 def generer_hash_conversation(conv: Dict, format_conv: str) -> str:
     """Generates a unique hash to detect duplicates."""
     signature_parts = []
@@ -88,18 +118,7 @@ def generer_hash_conversation(conv: Dict, format_conv: str) -> str:
     if created:
         signature_parts.append(f"created:{created}")
 
-    if format_conv == "chatgpt":
-        mapping = conv.get("mapping", {})
-        nb_messages = len([m for m in mapping.values() if m.get("message")])
-    elif format_conv == "lechat":
-        messages = conv.get("messages", conv.get("exchanges", []))
-        nb_messages = len(messages)
-    elif format_conv == "claude":
-        messages = conv.get("chat_messages", [])
-        nb_messages = len(messages)
-    else:
-        nb_messages = 0
-
+    nb_messages = compter_messages_bruts(conv, format_conv)
     signature_parts.append(f"msgs:{nb_messages}")
 
     signature = "|".join(signature_parts)
@@ -148,6 +167,99 @@ def detecter_doublons(toutes_conversations: List[Dict]) -> Dict[str, Any]:
     }
 
 
+def obtenir_id_stable(conv: Dict) -> str:
+    """Returns the stable conversation id/uuid shared by all export snapshots."""
+    conv_id = conv.get("conversation_id") or conv.get("id") or conv.get("uuid") or ""
+    return str(conv_id)
+
+
+def obtenir_date_mise_a_jour(conv: Dict) -> float:
+    """
+    Returns the last update time of a conversation as a UNIX timestamp.
+
+    ChatGPT exports use float seconds (update_time), Claude exports use
+    ISO 8601 strings (updated_at), LeChat may use updatedAt.
+    Falls back to creation time, then 0.
+    """
+    for key in ("update_time", "updated_at", "updatedAt",
+                "create_time", "created_at", "createdAt"):
+        valeur = conv.get(key)
+        if valeur in (None, ""):
+            continue
+        if isinstance(valeur, (int, float)):
+            return float(valeur)
+        try:
+            return float(valeur)
+        except (TypeError, ValueError):
+            pass
+        try:
+            return datetime.fromisoformat(str(valeur).replace("Z", "+00:00")).timestamp()
+        except ValueError:
+            continue
+    return 0.0
+
+
+def integrer_version(index_versions: Dict[Any, Dict], conv: Dict) -> bool:
+    """
+    Adds a conversation to the version index, keeping only its newest snapshot.
+
+    Conversations are grouped by (format, stable id). The most recent version
+    wins (update time, then message count). Conversations without a stable
+    id are always kept.
+
+    Args:
+        index_versions: Index being built (key -> conversation), insertion ordered
+        conv: Conversation to integrate
+
+    Returns:
+        bool: True if an older version was dropped (either this one or the indexed one)
+    """
+    format_conv = conv.get('_format', 'unknown')
+    conv_id = obtenir_id_stable(conv)
+
+    if not conv_id:
+        index_versions[('sans_id', len(index_versions))] = conv
+        return False
+
+    cle = (format_conv, conv_id)
+    actuelle = index_versions.get(cle)
+    if actuelle is None:
+        index_versions[cle] = conv
+        return False
+
+    rang_nouvelle = (obtenir_date_mise_a_jour(conv), compter_messages_bruts(conv, format_conv))
+    rang_actuelle = (obtenir_date_mise_a_jour(actuelle), compter_messages_bruts(actuelle, format_conv))
+    if rang_nouvelle > rang_actuelle:
+        index_versions[cle] = conv
+    return True
+
+
+def fusionner_versions(conversations: Iterable[Dict]) -> Dict[str, Any]:
+    """
+    Merges overlapping exports, keeping only the newest version of each conversation.
+
+    Works as a streaming group-by: the input is consumed once and only the
+    current best version per conversation id is held in memory.
+    """
+    index_versions: Dict[Any, Dict] = {}
+    nb_total = 0
+    nb_versions_remplacees = 0
+
+    for conv in conversations:
+        nb_total += 1
+        if integrer_version(index_versions, conv):
+            nb_versions_remplacees += 1
+
+    conversations_fusionnees = list(index_versions.values())
+
+    return {
+        'conversations_fusionnees': conversations_fusionnees,
+        'nb_total': nb_total,
+        'nb_fusionnees': len(conversations_fusionnees),
+        'nb_versions_remplacees': nb_versions_remplacees
+    }
+
+
 def filtrer_plus_grandes_conversations(conversations: List[Dict], max_big_conv: int) -> List[Dict]:
     """
     Filters to keep only the N largest conversations per AI format.
@@ -225,180 +337,204 @@ def filtrer_plus_grandes_conversations(conversations: List[Dict], max_big_conv:
 
 
 
-def charger_fichiers(fichiers_a_traiter: List[str], format_source: str) -> tuple:
-    """Loads and analyzes JSON files."""
-    toutes_conversations = []
-    stats_chargement = {'chatgpt': 0, 'lechat': 0, 'claude': 0, 'unknown': 0, 'erreurs': 0}
+def charger_fichiers(
+    fichiers_a_traiter: List[str],
+    format_source: str,
+    fusionner: bool = False
+) -> tuple:
+    """
+    Loads and analyzes JSON files.
+
+    With fusionner=True, overlapping exports are merged file by file: only the
+    newest version of each conversation is kept, so superseded snapshots are
+    released as soon as the next file has been read.
+    """
+    stats_chargement = {'chatgpt': 0, 'lechat': 0, 'claude': 0, 'unknown': 0, 'erreurs': 0,
+                        'versions_remplacees': 0}
     details_fichiers = []  # For detailed report
 
     print("📂 Loading files...")
     ecrire_log_local("=== FILE LOADING START ===", "INFO")
 
-    for fichier in fichiers_a_traiter:
-        try:
-            with open(fichier, "r", encoding="utf-8") as f:
-                data = json.load(f)
+    def lire_conversations() -> Iterable[Dict]:
+        # Conversations are yielded file by file, so the merge can drop superseded
+        # snapshots before the next file is read
+        for fichier in fichiers_a_traiter:
+            try:
+                with open(fichier, "r", encoding="utf-8") as f:
+                    data = json.load(f)
 
-            if format_source == "auto":
-                format_detecte = detecter_format_json(data, fichier)
-            else:
-                format_detecte = format_source
-
-            stats_chargement[format_detecte] = stats_chargement.get(format_detecte, 0) + 1
-            nb_conv = 0
-            nb_messages_total = 0
-            titres_conversations = []
-
-            if format_detecte == "chatgpt":
-                if isinstance(data, list):
-                    nb_conv = len(data)
-                    for conv in data:
-                        conv['_source_file'] = os.path.basename(fichier)
-                        conv['_format'] = 'chatgpt'
-                        titre = conv.get('title', 'Untitled')
+                if format_source == "auto":
+                    format_detecte = detecter_format_json(data, fichier)
+                else:
+                    format_detecte = format_source
+
+                stats_chargement[format_detecte] = stats_chargement.get(format_detecte, 0) + 1
+                nb_conv = 0
+                nb_messages_total = 0
+                titres_conversations = []
+
+                if format_detecte == "chatgpt":
+                    if isinstance(data, list):
+                        nb_conv = len(data)
+                        for conv in data:
+                            conv['_source_file'] = os.path.basename(fichier)
+                            conv['_format'] = 'chatgpt'
+                            titre = conv.get('title', 'Untitled')
+                            titres_conversations.append(titre)
+
+                            # Count messages
+                            mapping = conv.get('mapping', {})
+                            nb_messages_total += len([m for m in mapping.values() if m.get('message')])
+
+                            yield conv
+
+                        msg = f"✅ ChatGPT: {os.path.basename(fichier)} ({nb_conv} conversations, {nb_messages_total} messages)"
+                        print(f"   {msg}")
+                        ecrire_log_local(msg, "INFO")
+
+                elif format_detecte == "lechat":
+                    if isinstance(data, list):
+                        nb_conv = 1
+                        nb_messages_total = len(data)
+                        titre = os.path.splitext(os.path.basename(fichier))[0]
+                        import re
+                        titre = re.sub(r'^chat-', '', titre)
+                        titre = re.sub(r'^AI_exportation_', '', titre)
+                        titre = re.sub(r'_conversations$', '', titre)
                         titres_conversations.append(titre)
 
-                        # Count messages
-                        mapping = conv.get('mapping', {})
-                        nb_messages_total += len([m for m in mapping.values() if m.get('message')])
-
-                        toutes_conversations.append(conv)
-
-                    msg = f"✅ ChatGPT: {os.path.basename(fichier)} ({nb_conv} conversations, {nb_messages_total} messages)"
-                    print(f"   {msg}")
-                    ecrire_log_local(msg, "INFO")
-
-            elif format_detecte == "lechat":
-                if isinstance(data, list):
-                    nb_conv = 1
-                    nb_messages_total = len(data)
-                    titre = os.path.splitext(os.path.basename(fichier))[0]
-                    import re
-                    titre = re.sub(r'^chat-', '', titre)
-                    titre = re.sub(r'^AI_exportation_', '', titre)
-                    titre = re.sub(r'_conversations$', '', titre)
-                    titres_conversations.append(titre)
-
-                    conv = {
-                        "title": titre or "LeChat Conversation",
-                        "messages": data,
-                        "_source_file": os.path.basename(fichier),
-                        "_format": "lechat"
-                    }
-                    toutes_conversations.append(conv)
-
-                    msg = f"✅ LeChat: {os.path.basename(fichier)} ({nb_messages_total} messages)"
-                    print(f"   {msg}")
-                    ecrire_log_local(msg, "INFO")
-
-                elif isinstance(data, dict):
-                    nb_conv = 1
-                    titre = data.get("title", os.path.splitext(os.path.basename(fichier))[0])
-                    titres_conversations.append(titre)
-                    data['title'] = titre
-                    data['_source_file'] = os.path.basename(fichier)
-                    data['_format'] = 'lechat'
-                    toutes_conversations.append(data)
-                    nb_messages_total = len(data.get('messages', data.get('exchanges', [])))
-
-                    msg = f"✅ LeChat: {os.path.basename(fichier)} ({nb_messages_total} messages)"
-                    print(f"   {msg}")
-                    ecrire_log_local(msg, "INFO")
-
-            elif format_detecte == "claude":
-                if isinstance(data, list):
-                    nb_conv = len(data)
-                    for conv in data:
-                        conv['_source_file'] = os.path.basename(fichier)
-                        conv['_format'] = 'claude'
-                        if 'title' not in conv and 'name' not in conv:
-                            conv['title'] = f"Claude - {conv.get('uuid', 'Untitled')[:8]}"
-
-                        titre = conv.get('title', conv.get('name', 'Untitled'))
+                        conv = {
+                            "title": titre or "LeChat Conversation",
+                            "messages": data,
+                            "_source_file": os.path.basename(fichier),
+                            "_format": "lechat"
+                        }
+                        yield conv
+
+                        msg = f"✅ LeChat: {os.path.basename(fichier)} ({nb_messages_total} messages)"
+                        print(f"   {msg}")
+                        ecrire_log_local(msg, "INFO")
+
+                    elif isinstance(data, dict):
+                        nb_conv = 1
+                        titre = data.get("title", os.path.splitext(os.path.basename(fichier))[0])
                         titres_conversations.append(titre)
+                        data['title'] = titre
+                        data['_source_file'] = os.path.basename(fichier)
+                        data['_format'] = 'lechat'
+                        yield data
+                        nb_messages_total = len(data.get('messages', data.get('exchanges', [])))
+
+                        msg = f"✅ LeChat: {os.path.basename(fichier)} ({nb_messages_total} messages)"
+                        print(f"   {msg}")
+                        ecrire_log_local(msg, "INFO")
+
+                elif format_detecte == "claude":
+                    if isinstance(data, list):
+                        nb_conv = len(data)
+                        for conv in data:
+                            conv['_source_file'] = os.path.basename(fichier)
+                            conv['_format'] = 'claude'
+                            if 'title' not in conv and 'name' not in conv:
+                                conv['title'] = f"Claude - {conv.get('uuid', 'Untitled')[:8]}"
+
+                            titre = conv.get('title', conv.get('name', 'Untitled'))
+                            titres_conversations.append(titre)
+
+                            # Count messages
+                            chat_messages = conv.get('chat_messages', [])
+                            nb_messages_total += len(chat_messages)
+
+                            yield conv
+
+                        msg = f"✅ Claude: {os.path.basename(fichier)} ({nb_conv} conversations, {nb_messages_total} messages)"
+                        print(f"   {msg}")
+                        ecrire_log_local(msg, "INFO")
+
+                    elif isinstance(data, dict):
+                        nb_conv = 1
+                        data['_source_file'] = os.path.basename(fichier)
+                        data['_format'] = 'claude'
+                        if 'title' not in data and 'name' not in data:
+                            data['title'] = f"Claude - {data.get('uuid', 'Untitled')[:8]}"
+
+                        titre = data.get('title', data.get('name', 'Untitled'))
+                        titres_conversations.append(titre)
+                        chat_messages = data.get('chat_messages', [])
+                        nb_messages_total = len(chat_messages)
 
-                        # Count messages
-                        chat_messages = conv.get('chat_messages', [])
-                        nb_messages_total += len(chat_messages)
-
-                        toutes_conversations.append(conv)
-
-                    msg = f"✅ Claude: {os.path.basename(fichier)} ({nb_conv} conversations, {nb_messages_total} messages)"
-                    print(f"   {msg}")
-                    ecrire_log_local(msg, "INFO")
-
-                elif isinstance(data, dict):
-                    nb_conv = 1
-                    data['_source_file'] = os.path.basename(fichier)
-                    data['_format'] = 'claude'
-                    if 'title' not in data and 'name' not in data:
-                        data['title'] = f"Claude - {data.get('uuid', 'Untitled')[:8]}"
-
-                    titre = data.get('title', data.get('name', 'Untitled'))
-                    titres_conversations.append(titre)
-                    chat_messages = data.get('chat_messages', [])
-                    nb_messages_total = len(chat_messages)
+                        yield data
 
-                    toutes_conversations.append(data)
+                        msg = f"✅ Claude: {os.path.basename(fichier)} ({nb_messages_total} messages)"
+                        print(f"   {msg}")
+                        ecrire_log_local(msg, "INFO")
 
-                    msg = f"✅ Claude: {os.path.basename(fichier)} ({nb_messages_total} messages)"
+                else:
+                    msg = f"⚠️ Unknown format: {os.path.basename(fichier)}"
                     print(f"   {msg}")
-                    ecrire_log_local(msg, "INFO")
-
-            else:
-                msg = f"⚠️ Unknown format: {os.path.basename(fichier)}"
+                    ecrire_log_local(msg, "WARNING")
+                    stats_chargement['unknown'] = stats_chargement.get('unknown', 0) + 1
+
+                # Save details for report
+                details_fichiers.append({
+                    'fichier': os.path.basename(fichier),
+                    'chemin_complet': fichier,
+                    'format': format_detecte.upper(),
+                    'nb_conversations': nb_conv,
+                    'nb_messages': nb_messages_total,
+                    'titres': titres_conversations,
+                    'statut': 'OK'
+                })
+
+                # Log each conversation title
+                if titres_conversations:
+                    ecrire_log_local(f"  Conversations in {os.path.basename(fichier)}:", "INFO")
+                    for idx, titre in enumerate(titres_conversations, 1):
+                        ecrire_log_local(f"    [{idx}] {titre}", "INFO")
+
+            except json.JSONDecodeError as e:
+                msg = f"❌ JSON error: {os.path.basename(fichier)}"
                 print(f"   {msg}")
-                ecrire_log_local(msg, "WARNING")
-                stats_chargement['unknown'] = stats_chargement.get('unknown', 0) + 1
-
-            # Save details for report
-            details_fichiers.append({
-                'fichier': os.path.basename(fichier),
-                'chemin_complet': fichier,
-                'format': format_detecte.upper(),
-                'nb_conversations': nb_conv,
-                'nb_messages': nb_messages_total,
-                'titres': titres_conversations,
-                'statut': 'OK'
-            })
+                ecrire_log_local(f"JSON error {fichier}: {e}", "ERROR")
+                stats_chargement['erreurs'] += 1
+
+                details_fichiers.append({
+                    'fichier': os.path.basename(fichier),
+                    'chemin_complet': fichier,
+                    'format': 'ERROR',
+                    'nb_conversations': 0,
+                    'nb_messages': 0,
+                    'titres': [],
+                    'statut': f'ERROR: {str(e)[:100]}'
+                })
 
-            # Log each conversation title
-            if titres_conversations:
-                ecrire_log_local(f"  Conversations in {os.path.basename(fichier)}:", "INFO")
-                for idx, titre in enumerate(titres_conversations, 1):
-                    ecrire_log_local(f"    [{idx}] {titre}", "INFO")
-
-        except json.JSONDecodeError as e:
-            msg = f"❌ JSON error: {os.path.basename(fichier)}"
-            print(f"   {msg}")
-            ecrire_log_local(f"JSON error {fichier}: {e}", "ERROR")
-            stats_chargement['erreurs'] += 1
-
-            details_fichiers.append({
-                'fichier': os.path.basename(fichier),
-                'chemin_complet': fichier,
-                'format': 'ERROR',
-                'nb_conversations': 0,
-                'nb_messages': 0,
-                'titres': [],
-                'statut': f'ERROR: {str(e)[:100]}'
-            })
-
-        except Exception as e:
-            msg = f"❌ Error: {os.path.basename(fichier)}"
-            print(f"   {msg}")
-            ecrire_log_local(f"Error {fichier}: {e}", "ERROR")
-            stats_chargement['erreurs'] += 1
-
-            details_fichiers.append({
-                'fichier': os.path.basename(fichier),
-                'chemin_complet': fichier,
-                'format': 'ERROR',
-                'nb_conversations': 0,
-                'nb_messages': 0,
-                'titres': [],
-                'statut': f'ERROR: {str(e)[:100]}'
-            })
+            except Exception as e:
+                msg = f"❌ Error: {os.path.basename(fichier)}"
+                print(f"   {msg}")
+                ecrire_log_local(f"Error {fichier}: {e}", "ERROR")
+                stats_chargement['erreurs'] += 1
+
+                details_fichiers.append({
+                    'fichier': os.path.basename(fichier),
+                    'chemin_complet': fichier,
+                    'format': 'ERROR',
+                    'nb_conversations': 0,
+                    'nb_messages': 0,
+                    'titres': [],
+                    'statut': f'ERROR: {str(e)[:100]}'
+                })
+
+    if fusionner:
+        fusion = fusionner_versions(lire_conversations())
+        toutes_conversations = fusion['conversations_fusionnees']
+        stats_chargement['versions_remplacees'] = fusion['nb_versions_remplacees']
+        ecrire_log_local(
+            f"Version merge: {stats_chargement['versions_remplacees']} older snapshot(s) dropped",
+            "INFO"
+        )
+    else:
+        toutes_conversations = list(lire_conversations())
 
     ecrire_log_local("=== FILE LOADING END ===", "INFO")
 
@@ -467,10 +603,33 @@ def generer_rapport_fichiers(details_fichiers: List[Dict], logs_dir: Path) -> No
         ecrire_log_local(f"Report generation error: {e}", "ERROR")
 
 
-def decouper_conversation(conversation: Dict[str, Any], messages: List[str]) -> List[Dict[str, Any]]:
-    """Splits a conversation if > MAX_TOKENS."""
-    import uuid
+def identifiant_tache(conv: Dict, format_conv: str, partie: str, messages: List[str]) -> str:
+    """
+    Stable id of one unit of work (a conversation or one of its parts).
 
+    Built from the conversation id (or its duplicate-detection hash), the
+    part and the message text, so the same input gets the same id from one
+    run to the next and an edited conversation gets a new one.
+    """
+    base = obtenir_id_stable(conv) or generer_hash_conversation(conv, format_conv)
+    contenu = hashlib.sha256("\n".join(messages).encode('utf-8')).hexdigest()
+    return hashlib.sha256(f"{base}|{partie}|{contenu}".encode('utf-8')).hexdigest()[:24]
+
+
+def decouper_conversation(
+    conversation: Dict[str, Any],
+    messages: List[str],
+    max_tokens: int = MAX_TOKENS,
+    recursif: bool = False
+) -> List[Dict[str, Any]]:
+    """
+    Splits a conversation if > max_tokens.
+
+    The messages are cut in two halves (a single message is never cut).
+    With `recursif` (an explicit --chunk-tokens), halves still above the
+    budget are cut again, so a smaller budget gives more, smaller parts
+    numbered 1/n to n/n.
+    """
     titre = conversation.get("title", "Untitled")
 
     if not messages:
@@ -479,35 +638,486 @@ def decouper_conversation(conversation: Dict[str, Any], messages: List[str]) ->
     texte_complet = "\n".join(messages)
     token_count = compter_tokens(texte_complet)
 
-    if token_count <= MAX_TOKENS:
+    if token_count <= max_tokens:
         return [{
             "title": titre,
             "messages": messages,
             "partie": "1/1",
-            "titre_original": titre
+            "titre_original": titre,
+            "token_count": token_count
         }]
 
-    conv_id = str(uuid.uuid4())
-    moitie = len(messages) // 2
+    # Deterministic so that every part keeps the same id across runs (--resume)
+    conv_id = obtenir_id_stable(conversation) or hashlib.sha256(texte_complet.encode('utf-8')).hexdigest()[:32]
+
+    def couper(bloc: List[str]) -> List[tuple]:
+        moitie = len(bloc) // 2
+        morceaux = []
+        for moitie_bloc in (bloc[:moitie], bloc[moitie:]):
+            tokens = compter_tokens("\n".join(moitie_bloc))
+            if recursif and tokens > max_tokens and len(moitie_bloc) > 1:
+                morceaux.extend(couper(moitie_bloc))
+            else:
+                morceaux.append((moitie_bloc, tokens))
+        return morceaux
+
+    morceaux = couper(messages) if len(messages) > 1 else [(messages, token_count)]
+    total = len(morceaux)
+    if total == 1:
+        return [{
+            "title": titre,
+            "messages": messages,
+            "partie": "1/1",
+            "titre_original": titre,
+            "token_count": token_count
+        }]
 
     return [
         {
-            "title": f"{titre} (Part 1/2)",
-            "messages": messages[:moitie],
+            "title": f"{titre} (Part {numero}/{total})",
+            "messages": bloc,
             "conversation_id": conv_id,
-            "partie": "1/2",
-            "titre_original": titre
-        },
-        {
-            "title": f"{titre} (Part 2/2)",
-            "messages": messages[moitie:],
-            "conversation_id": conv_id,
-            "partie": "2/2",
-            "titre_original": titre
+            "partie": f"{numero}/{total}",
+            "titre_original": titre,
+            "token_count": tokens
         }
+        for numero, (bloc, tokens) in enumerate(morceaux, 1)
     ]
 
 
+FORMATS_SORTIE = ['csv', 'json', 'jsonl', 'txt', 'markdown', 'sqlite', 'parquet']
+
+
+def analyser_formats(valeur: str) -> List[str]:
+    """argparse type of --format: one format or several separated by commas."""
+    formats = []
+    for nom in valeur.split(','):
+        nom = nom.strip().lower()
+        if nom not in FORMATS_SORTIE:
+            raise argparse.ArgumentTypeError(
+                f"invalid format '{nom}' (choose from {', '.join(FORMATS_SORTIE)})"
+            )
+        if nom not in formats:
+            formats.append(nom)
+    return formats
+
+
+def verifier_formats(formats: List[str], compression: str = None) -> bool:
+    """Checks the optional dependencies of the requested output formats and compression."""
+    if 'parquet' in formats:
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            print("❌ --format parquet requires pyarrow.")
+            print("💡 Install it with: pip install pyarrow")
+            return False
+    if compression == 'zstd':
+        try:
+            import zstandard  # noqa: F401
+        except ImportError:
+            print("❌ --compress zstd requires zstandard.")
+            print("💡 Install it with: pip install zstandard (or use --compress gzip)")
+            return False
+    return True
+
+
+def chemins_sortie(output_base: str, formats: List[str]) -> Dict[str, Path]:
+    """
+    Output path of each format in RESULTS_DIR.
+
+    A single format keeps an --output name that already has an extension;
+    with several formats the extension is replaced by each format's own.
+    """
+    from result_formatter import STREAM_WRITERS
+    extensions = [writer.extension for writer in STREAM_WRITERS.values()] + ['.markdown']
+    for ext in extensions:
+        if output_base.endswith(ext):
+            if len(formats) == 1:
+                return {formats[0]: RESULTS_DIR / output_base}
+            output_base = output_base[:-len(ext)]
+            break
+    return {fmt: RESULTS_DIR / f"{output_base}{STREAM_WRITERS[fmt].extension}" for fmt in formats}
+
+
+def ouvrir_sorties(
+    chemins: Dict[str, Path],
+    run_id: str = "",
+    prompt_name: str = "",
+    prompt_hash: str = "",
+    model: str = "",
+    compression: str = None,
+    rotate_rows: int = None,
+    rotate_mb: float = None
+):
+    """
+    Opens one streaming writer per format behind a single fan-out writer.
+
+    Text formats go through the requested compression (SQLite and Parquet
+    are left as they are). With a row or size limit, each format is split
+    into numbered shards listed in a manifest.
+    """
+    from result_formatter import (
+        open_stream_writer, MultiStreamWriter, RotatingStreamWriter,
+        STREAM_WRITERS, COMPRESSION_SUFFIXES
+    )
+    options = {
+        'sqlite': {'run_id': run_id, 'prompt': prompt_name, 'prompt_hash': prompt_hash, 'model': model},
+        'parquet': {'run_id': run_id}
+    }
+    rotate_bytes = int(rotate_mb * 1024 * 1024) if rotate_mb else None
+
+    writers = []
+    for fmt, chemin in chemins.items():
+        writer_options = dict(options.get(fmt, {}))
+        compression_format = compression if STREAM_WRITERS[fmt].compressible else None
+
+        if rotate_rows or rotate_bytes:
+            extension = STREAM_WRITERS[fmt].extension
+            base = str(chemin)[:-len(extension)] if str(chemin).endswith(extension) else str(chemin)
+            writers.append(RotatingStreamWriter(
+                fmt, base, rotate_rows, rotate_bytes, compression_format, **writer_options
+            ).open())
+            continue
+
+        if compression_format:
+            writer_options['compression'] = compression_format
+            chemin = Path(f"{chemin}{COMPRESSION_SUFFIXES[compression_format]}")
+        writers.append(open_stream_writer(fmt, str(chemin), **writer_options))
+
+    return MultiStreamWriter(writers)
+
+
+def rapporter_sorties(sorties) -> bool:
+    """Prints and logs the outcome of every output file. Returns True if all were saved."""
+    tout_ok = True
+    for writer in sorties.writers:
+        if writer.failed:
+            tout_ok = False
+            print(f"❌ Error during save: {writer.output_file}")
+            ecrire_log_local(f"Results save error: {writer.output_file}", "ERROR")
+            continue
+        shards = getattr(writer, 'shards', None)
+        if shards is not None:
+            file_size = sum(shard['bytes'] for shard in shards)
+        else:
+            file_size = os.path.getsize(writer.output_file)
+        print(f"✅ Results saved: {writer.output_file}")
+        print(f"   📊 Format: {writer.name.upper()} | 📏 Size: {file_size:,} bytes"
+              f"{f' in {len(shards)} shard(s)' if shards is not None else ''}")
+        ecrire_log_local(f"Results saved: {writer.output_file} ({file_size} bytes, {writer.count} results)", "INFO")
+    return tout_ok
+
+
+def exporter_resultats(args) -> None:
+    """Renders --format output(s) from an existing run journal or results store, without any API call."""
+    from run_journal import RunJournal
+    from result_formatter import iter_results_store
+
+    source = args.export
+    prompt_name, prompt_hash, model = "", "", ""
+    if source.endswith('.sqlite'):
+        if not os.path.exists(source):
+            print(f"❌ Results store not found: {source}")
+            return
+        run_id = args.export_run or ""
+        resultats = iter_results_store(source, args.export_run)
+        nom_source = Path(source).stem
+    else:
+        journal_path = Path(source) if os.path.exists(source) else RunJournal.path_for(RESULTS_DIR / "runs", source)
+        if not journal_path.exists():
+            print(f"❌ No journal or results store found for '{source}'")
+            return
+        entete, par_tache = RunJournal.load(str(journal_path))
+        entete = entete or {}
+        run_id = entete.get('run_id', '')
+        prompt_name = entete.get('prompt_name', '')
+        prompt_hash = entete.get('prompt', '')
+        model = entete.get('model', '')
+        resultats = par_tache.values()
+        nom_source = run_id or journal_path.stem
+
+    if not verifier_formats(args.format, args.compress):
+        return
+
+    if args.output:
+        output_base = args.output
+    else:
+        output_base = f"export_{nom_source}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+
+    print(f"\n📤 Exporting {source} to {', '.join(args.format)}...")
+    ecrire_log_local(f"Export of {source} to {args.format}", "INFO")
+
+    sorties = ouvrir_sorties(chemins_sortie(output_base, args.format), run_id, prompt_name, prompt_hash, model,
+                             args.compress, args.rotate_rows, args.rotate_mb)
+    try:
+        for result in resultats:
+            sorties.write(result)
+    finally:
+        sorties.close()
+
+    print(f"   {sorties.count} result(s)\n")
+    rapporter_sorties(sorties)
+
+
+def rechercher_resultats(args) -> None:
+    """Runs a --query against a SQLite results store and prints the hits."""
+    if not args.results_store:
+        print("❌ --query requires --results-store <file.sqlite>")
+        return
+    if not os.path.exists(args.results_store):
+        print(f"❌ Results store not found: {args.results_store}")
+        return
+
+    from result_formatter import query_results_store
+    debut = time.perf_counter()
+    try:
+        resultats = query_results_store(
+            args.results_store,
+            text=args.query,
+            prompt=args.query_prompt,
+            model=args.query_model,
+            since=args.query_since,
+            until=args.query_until,
+            limit=args.query_limit
+        )
+    except Exception as e:
+        print(f"❌ Query error: {e}")
+        return
+    duree_ms = (time.perf_counter() - debut) * 1000
+
+    print(f"\n🔎 {len(resultats)} hit(s) in {duree_ms:.1f} ms\n")
+    for r in resultats:
+        statut = "✅" if r['success'] else "❌"
+        print(f"{statut} [{r['created_at']}] {r['titre']} ({r['partie']})")
+        print(f"   prompt: {r['prompt']} | model: {r['model']} | run: {r['run_id']} | conversation: {r['conversation_id']}")
+        extrait = (r['snippet'] or r['error'] or '').replace("\n", " ")
+        print(f"   {extrait}\n")
+
+
+def sauver_profil(profiler, run_id: str) -> None:
+    """
+    Writes and summarizes the --profile files of the run.
+
+    Called on every exit once profiling has started (--plan, --virtual,
+    --autotune and early errors included), so profiled stages are never
+    dropped silently. Runs stopped before a run id exists get a fresh one.
+    """
+    if profiler is None:
+        return
+    if not run_id:
+        from run_journal import RunJournal
+        run_id = RunJournal.new_run_id()
+    try:
+        fichiers_profil = profiler.save(LOGS_DIR / "profiles", run_id)
+        print(f"🔬 Profile: {fichiers_profil[0]} (+{len(fichiers_profil) - 1} stage file(s))")
+        for ligne in profiler.summary_lines():
+            print(ligne)
+        ecrire_log_local(f"Profile saved: {fichiers_profil[0]}", "INFO")
+    except OSError as e:
+        print(f"⚠️  Profile not saved: {e}")
+        ecrire_log_local(f"Profile save error: {e}", "ERROR")
+
+
+def planifier(args, conversations_a_traiter: List[Dict], prompt_template: str) -> None:
+    """
+    Prints the --plan report of the conversations that a run would send.
+
+    Answer size and latency come from --plan-completion / --plan-latency,
+    else from the latest run metrics in <target-results>/runs, else from
+    the config defaults.
+    """
+    from planner import build_plan, projected_costs, estimate_duration, previous_run_stats, format_plan
+    from prompt_executor import template_token_cost, DEFAULT_MAX_TOKENS
+
+    precedent = previous_run_stats(RESULTS_DIR / "runs")
+    completion = args.plan_completion or (precedent and precedent['completion_tokens']) or PLAN_COMPLETION_TOKENS
+    latence = args.plan_latency or (precedent and precedent['latency']) or PLAN_LATENCY_S
+    if precedent and not (args.plan_completion and args.plan_latency):
+        print(f"📈 Using run {precedent['run_id']}: {precedent['latency']}s median latency, "
+              f"{precedent['completion_tokens']} answer tokens per request\n")
+
+    plan = build_plan(conversations_a_traiter, template_token_cost(prompt_template), completion)
+    totaux = plan['totals']
+    couts = projected_costs(totaux['prompt_tokens'], totaux['completion_tokens'], MODEL_PRICING)
+    duree = estimate_duration(
+        totaux['requests'], totaux['prompt_tokens'], DEFAULT_MAX_TOKENS,
+        args.max_workers if args.adaptive else args.workers, latence,
+        delay=args.delay, rpm=args.rpm, tpm=args.tpm
+    )
+
+    for ligne in format_plan(plan, couts, duree, args.model):
+        print(ligne)
+    print()
+    ecrire_log_local(f"Plan: {totaux['requests']} requests, {totaux['prompt_tokens']} prompt tokens, "
+                     f"estimated {duree['seconds']}s ({duree['bound']})", "INFO")
+
+
+def simuler_virtuel(args, conversations_a_traiter: List[Dict], prompt_template: str) -> None:
+    """
+    Runs the --virtual simulation of the conversations that a run would send.
+
+    The scheduler settings are the run's (--workers, --delay, --rpm/--tpm,
+    --adaptive, --max-retries, circuit breaker); the provider quota is
+    --virtual-quota-rpm/--virtual-quota-tpm, by default the same as
+    --rpm/--tpm.
+    """
+    import random
+    from benchmark import MockMistralServer
+    from planner import previous_run_stats
+    from prompt_executor import template_token_cost
+    from rate_limiter import RateLimiter
+    from retry_queue import RetryPolicy, CircuitBreaker
+    from simulation import VirtualClock, VirtualRun, format_report
+
+    precedent = previous_run_stats(RESULTS_DIR / "runs")
+    completion = args.plan_completion or (precedent and precedent['completion_tokens']) or PLAN_COMPLETION_TOKENS
+    quota_rpm = args.virtual_quota_rpm or args.rpm
+    quota_tpm = args.virtual_quota_tpm or args.tpm
+
+    clock = VirtualClock()
+    try:
+        server = MockMistralServer(
+            latency=args.virtual_latency,
+            ms_per_prompt_token=VIRTUAL_MS_PER_PROMPT_TOKEN,
+            ms_per_completion_token=VIRTUAL_MS_PER_COMPLETION_TOKEN,
+            completion_tokens=completion,
+            rate_5xx=args.virtual_5xx,
+            rpm=quota_rpm,
+            tpm=quota_tpm,
+            seed=args.virtual_seed,
+            clock=clock
+        )
+    except ValueError as e:
+        print(f"❌ {e}")
+        return
+
+    concurrency = None
+    if args.adaptive:
+        from concurrency import AdaptiveConcurrency
+        concurrency = AdaptiveConcurrency(initial=args.workers, minimum=args.min_workers,
+                                          maximum=args.max_workers, clock=clock)
+
+    print(f"🕰️  Virtual run of {len(conversations_a_traiter):,} requests: latency {args.virtual_latency} "
+          f"+ {VIRTUAL_MS_PER_PROMPT_TOKEN:g} ms/prompt token + {VIRTUAL_MS_PER_COMPLETION_TOKEN:g} ms x "
+          f"{completion} answer tokens; provider quota {quota_rpm or '∞'} RPM, {quota_tpm or '∞'} TPM\n")
+
+    run = VirtualRun(
+        conversations_a_traiter,
+        server,
+        clock,
+        args.workers,
+        template_tokens=template_token_cost(prompt_template),
+        delay=args.delay,
+        rate_limiter=RateLimiter(args.rpm, args.tpm, clock=clock, burst=args.rate_burst) if (args.rpm or args.tpm) else None,
+        concurrency=concurrency,
+        retry_policy=RetryPolicy(max_attempts=args.max_retries, rng=random.Random(args.virtual_seed)),
+        circuit_breaker=None if args.no_circuit_breaker else CircuitBreaker(clock=clock),
+        interval=args.virtual_interval,
+        model=args.model
+    )
+    rapport = run.run()
+
+    for ligne in format_report(rapport):
+        print(ligne)
+    print()
+    if args.virtual_report:
+        Path(args.virtual_report).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.virtual_report, 'w', encoding='utf-8') as f:
+            json.dump(rapport, f, ensure_ascii=False, indent=2)
+        print(f"💾 Simulation report: {args.virtual_report}\n")
+    ecrire_log_local(f"Virtual run: {rapport['conversations']} requests, {rapport['virtual_seconds']}s projected, "
+                     f"HTTP {rapport['statuses']}", "INFO")
+
+
+def lancer_autotune(args, conversations_extraites: List[tuple], prompt_template: str, api_key: str) -> None:
+    """
+    Runs the --autotune sweep on a sample of the loaded conversations.
+
+    Args:
+        args: Parsed command line (quota, candidates, executor settings)
+        conversations_extraites: (conversation, format, messages) before splitting
+        prompt_template: Prompt of the run
+        api_key: API key ('autotune' with --autotune-mock)
+    """
+    from prompt_executor import PromptExecutor
+    from autotune import Autotuner, parse_candidates, save_profile
+
+    budget = args.chunk_tokens or MAX_TOKENS
+    try:
+        candidats_workers = parse_candidates(args.autotune_workers, int)
+        candidats_delais = parse_candidates(args.autotune_delays, float)
+        candidats_chunks = parse_candidates(
+            args.autotune_chunks or f"{budget},{budget // 2},{budget // 4}", int
+        )
+    except ValueError as e:
+        print(f"❌ {e}")
+        return
+
+    serveur = None
+    api_url = args.api_url
+    if args.autotune_mock:
+        from benchmark import MockMistralServer, SCENARIOS
+        parametres = dict(SCENARIOS['baseline']['server'])
+        serveur = MockMistralServer(rpm=args.rpm, tpm=args.tpm, **parametres)
+        api_url = serveur.start()
+        print(f"🧪 Mock server: {api_url} (quota: {args.rpm or '∞'} rpm, {args.tpm or '∞'} tpm)")
+    if not args.rpm and not args.tpm:
+        print("⚠️  No --rpm/--tpm quota given: settings are tuned for raw throughput only")
+
+    def afficher_essai(essai: Dict[str, Any]) -> None:
+        marque = "⚠️ " if essai['throttled'] or essai['failed'] else "  "
+        print(f"  {marque}workers {essai['workers']:>3}  delay {essai['delay']:<5g} chunk {essai['chunk_tokens']:>6}  "
+              f"{essai['requests']:>4} req  {essai['tokens_per_s']:>9.1f} tok/s  "
+              f"(sustained {essai['sustained_tokens_per_s']:.1f})  429: {essai['throttled']}  "
+              f"p95 {essai['p95_latency']}s")
+        ecrire_log_local(f"Autotune trial: {essai}", "INFO")
+
+    tuner = Autotuner(
+        conversations_extraites,
+        # Budgets below the default only make sense if halves are cut again
+        lambda conv, messages, limite: decouper_conversation(conv, messages, limite, recursif=True),
+        prompt_template,
+        lambda workers: PromptExecutor(api_key=api_key, api_url=api_url, model=args.model, pool_size=workers,
+                                       connect_timeout=args.connect_timeout, read_timeout=args.read_timeout),
+        rpm=args.rpm,
+        tpm=args.tpm,
+        sample=args.autotune_sample,
+        max_retries=args.max_retries,
+        cooldown=0.0 if serveur else 10.0,
+        on_trial=afficher_essai
+    )
+
+    print(f"\n🎛️  Autotune on {len(tuner.conversations)} conversations: workers {candidats_workers}, "
+          f"delays {candidats_delais}, chunks {candidats_chunks}\n")
+    try:
+        essais = tuner.sweep(candidats_workers, candidats_delais, candidats_chunks)
+    finally:
+        if serveur is not None:
+            serveur.stop()
+
+    meilleur = tuner.recommend(essais)
+    if meilleur is None:
+        print("❌ No autotune trial completed")
+        return
+
+    options = f"--workers {meilleur['workers']} --delay {meilleur['delay']:g} --chunk-tokens {meilleur['chunk_tokens']}"
+    if args.rpm:
+        options += f" --rpm {args.rpm:g}"
+    if args.tpm:
+        options += f" --tpm {args.tpm:g}"
+    print(f"\n✅ Recommended: {options}")
+    print(f"   {meilleur['sustained_tokens_per_s']:.1f} tok/s sustained, {meilleur['requests_per_s']} req/s, "
+          f"p95 latency {meilleur['p95_latency']}s, {meilleur['throttled']} x 429")
+    if meilleur['throttled'] or meilleur['failed']:
+        print("⚠️  Every trial was throttled or failed: lower --autotune-workers or raise --autotune-delays")
+    ecrire_log_local(f"Autotune recommendation: {options}", "INFO")
+
+    if args.autotune_save:
+        save_profile(args.autotune_save, meilleur, args.rpm, args.tpm, essais,
+                     model=args.model, api_url=None if serveur else api_url, mock=bool(serveur))
+        print(f"💾 Tuning profile: {args.autotune_save} (use it with --tuning-profile)")
+
+
 def main() -> None:
     """Main function."""
     global LOGS_DIR, RESULTS_DIR
@@ -532,10 +1142,45 @@ def main() -> None:
     parser.add_argument('--not-split', action='store_true', default=False)
     parser.add_argument('--cnbr', type=int)
     parser.add_argument('--max-big-conv', type=int, help='Keep only N largest conversations per AI format')
+    parser.add_argument('--chunk-tokens', type=int, default=None,
+                        help=f'Split conversations above N tokens into as many parts as needed '
+                             f'(default: {MAX_TOKENS}, in two halves)')
     parser.add_argument('--fichier', '-F', type=str, nargs='*', default=[])
     parser.add_argument('--model', '-m', type=str, default=MODEL)
+    parser.add_argument('--api-url', type=str, default=API_URL,
+                        help='Chat completions endpoint (OpenAI/Mistral-compatible, e.g. a local mock)')
     parser.add_argument('--workers', '-w', type=int, default=MAX_WORKERS)
     parser.add_argument('--delay', '-d', type=float, default=0.5)
+    parser.add_argument('--engine', choices=['threads', 'async'], default='threads',
+                        help='Execution engine: thread pool or asyncio (workers = concurrent requests)')
+    parser.add_argument('--adaptive', action='store_true', default=False,
+                        help='AIMD concurrency: start at --workers, grow while healthy, cut on 429/5xx/latency')
+    parser.add_argument('--min-workers', type=int, default=1)
+    parser.add_argument('--max-workers', type=int, default=ADAPTIVE_MAX_WORKERS)
+    parser.add_argument('--max-retries', type=int, default=3,
+                        help='Attempts per conversation for 429/5xx/timeouts (deferred retry queue)')
+    parser.add_argument('--no-circuit-breaker', action='store_true', default=False,
+                        help='Do not pause dispatch when the error rate spikes')
+    parser.add_argument('--rpm', type=float, default=RATE_LIMIT_RPM,
+                        help='Requests per minute quota (shared token bucket, replaces --delay)')
+    parser.add_argument('--tpm', type=float, default=RATE_LIMIT_TPM,
+                        help='Tokens per minute quota (prompt estimate + max_tokens per request)')
+    parser.add_argument('--rate-burst', type=float, default=RATE_LIMIT_BURST_S,
+                        help=f'Seconds of --rpm/--tpm quota that may be sent at once (default: {RATE_LIMIT_BURST_S:g})')
+    parser.add_argument('--connect-timeout', type=float, default=CONNECT_TIMEOUT)
+    parser.add_argument('--read-timeout', type=float, default=READ_TIMEOUT)
+    parser.add_argument('--cache-mode', choices=['read-write', 'read-only', 'refresh', 'off'],
+                        default='read-write', help='Response cache usage (keyed by model + prompts + parameters)')
+    parser.add_argument('--cache-file', type=str,
+                        help=f'Response cache database (default: <target-results>/{CACHE_FILE})')
+    parser.add_argument('--cache-ttl', type=float, default=CACHE_TTL_DAYS,
+                        help='Days before a cached response expires (0 = never)')
+    parser.add_argument('--cache-max-mb', type=float, default=CACHE_MAX_MB,
+                        help='Cache size above which least recently used responses are evicted (0 = unlimited)')
+    parser.add_argument('--resume', type=str, metavar='RUN_ID',
+                        help='Resume a run from its journal, skipping conversations already completed')
+    parser.add_argument('--retry-failed', action='store_true', default=False,
+                        help='With --resume: only redo the conversations that failed')
     parser.add_argument('--prerequis', action='store_true')
     parser.add_argument('--changelog', action='store_true')
     parser.add_argument('--recursive', action='store_true', default=False)
@@ -544,16 +1189,108 @@ def main() -> None:
     parser.add_argument('--prompt-file', '-p', type=str)
     parser.add_argument('--prompt-list', action='store_true')
     parser.add_argument('--prompt-text', '-pt', type=str)
-    parser.add_argument('--format', choices=['csv', 'json', 'txt', 'markdown'], default='csv')
+    parser.add_argument('--format', type=analyser_formats, default=['csv'],
+                        help=f'Output format(s), comma-separated: {",".join(FORMATS_SORTIE)}')
+    parser.add_argument('--compress', choices=['gzip', 'zstd'],
+                        help='Streaming compression of the text formats (csv, json, jsonl, txt, markdown)')
+    parser.add_argument('--rotate-rows', type=int,
+                        help='Start a new output shard every N results (manifest listing the shards)')
+    parser.add_argument('--rotate-mb', type=float,
+                        help='Start a new output shard when the current one reaches N MB on disk')
+    parser.add_argument('--export', type=str, metavar='SOURCE',
+                        help='Render --format output(s) from a run journal (run id or .jsonl) or a .sqlite store')
+    parser.add_argument('--export-run', type=str, metavar='RUN_ID',
+                        help='With --export of a results store: only this run')
+    parser.add_argument('--results-store', type=str,
+                        help='SQLite results store shared by every run (written in addition to --format)')
+    parser.add_argument('--query', type=str,
+                        help='Full-text search in the --results-store responses ("" = filters only)')
+    parser.add_argument('--query-prompt', type=str)
+    parser.add_argument('--query-model', type=str)
+    parser.add_argument('--query-since', type=str, help='YYYY-MM-DD')
+    parser.add_argument('--query-until', type=str, help='YYYY-MM-DD')
+    parser.add_argument('--query-limit', type=int, default=20)
     parser.add_argument('--output', '-o', type=str)
     parser.add_argument('--target-logs', type=str, default='./')
+    parser.add_argument('--log-level', type=str.upper, choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'],
+                        default=LOG_LEVEL, help=f'Lowest level written to the log file (default: {LOG_LEVEL})')
+    parser.add_argument('--profile', nargs='?', const='full', choices=['full', 'sample'],
+                        help='Profile each stage: full (cProfile + tracemalloc) or sample (low overhead)')
+    parser.add_argument('--profile-top', type=int, default=10,
+                        help='Allocation sites kept per stage with --profile full (default: 10)')
+    parser.add_argument('--events', nargs='?', const='auto', metavar='FILE',
+                        help='JSONL event stream of every conversation and API attempt '
+                             '(default file: <target-results>/runs/run_<id>.events.jsonl)')
+    parser.add_argument('--metrics-port', type=int,
+                        help='Serve Prometheus metrics on http://<metrics-host>:PORT/metrics during the run')
+    parser.add_argument('--metrics-host', type=str, default='127.0.0.1',
+                        help='Address of the metrics endpoint (default: 127.0.0.1)')
+    parser.add_argument('--metrics-textfile', type=str,
+                        help='Refresh Prometheus metrics in this file (node_exporter textfile collector)')
+    parser.add_argument('--metrics-interval', type=float, default=15.0,
+                        help='Refresh period of --metrics-textfile in seconds (default: 15)')
+    parser.add_argument('--plan', action='store_true', default=False,
+                        help='Load, split and count tokens, then print requests, tokens, cost and duration')
+    parser.add_argument('--plan-completion', type=int,
+                        help=f'Expected answer tokens per request for --plan and --virtual '
+                             f'(default: last run, else {PLAN_COMPLETION_TOKENS})')
+    parser.add_argument('--plan-latency', type=float,
+                        help=f'Expected seconds per request (default: last run median, else {PLAN_LATENCY_S:g})')
+    parser.add_argument('--virtual', action='store_true', default=False,
+                        help='Simulate the run on a virtual clock (scheduler, quota, 429s, retries), no API call')
+    parser.add_argument('--virtual-latency', type=str, default=VIRTUAL_LATENCY,
+                        help=f'Base latency distribution of the simulated API (default: {VIRTUAL_LATENCY})')
+    parser.add_argument('--virtual-quota-rpm', type=float,
+                        help='Provider requests-per-minute quota of the simulated API (default: --rpm)')
+    parser.add_argument('--virtual-quota-tpm', type=float,
+                        help='Provider tokens-per-minute quota of the simulated API (default: --tpm)')
+    parser.add_argument('--virtual-5xx', type=float, default=0.0,
+                        help='Share of simulated requests failing with a 503 (default: 0)')
+    parser.add_argument('--virtual-seed', type=int, default=42,
+                        help='Seed of the simulated latencies and errors (default: 42)')
+    parser.add_argument('--virtual-interval', type=float, default=60.0,
+                        help='Virtual seconds between timeline points (default: 60)')
+    parser.add_argument('--virtual-report', type=str,
+                        help='Write the simulation report (metrics and full timeline) to this JSON file')
+    parser.add_argument('--autotune', action='store_true', default=False,
+                        help='Sweep workers, delay and chunk budget on a sample instead of running the analysis')
+    parser.add_argument('--autotune-sample', type=int, default=30,
+                        help='Conversations sent by each autotune trial (default: 30)')
+    parser.add_argument('--autotune-mock', action='store_true', default=False,
+                        help='Autotune against a local mock server enforcing --rpm/--tpm instead of the API')
+    parser.add_argument('--autotune-workers', type=str, default='1,2,4,8,16,32',
+                        help='Worker counts to try (default: 1,2,4,8,16,32)')
+    parser.add_argument('--autotune-delays', type=str, default='0,0.25,0.5,1',
+                        help='Delays tried when a setting is throttled (default: 0,0.25,0.5,1)')
+    parser.add_argument('--autotune-chunks', type=str,
+                        help='Chunk budgets to try (default: --chunk-tokens, its half and its quarter)')
+    parser.add_argument('--autotune-save', type=str, metavar='FILE',
+                        help='Save the recommended settings as a tuning profile')
+    parser.add_argument('--tuning-profile', type=str, metavar='FILE',
+                        help='Use the settings of an --autotune-save profile (explicit options win)')
+    parser.add_argument('--log-max-mb', type=float, default=LOG_MAX_MB,
+                        help=f'Rotate the log file past N MB, 0 = never (default: {LOG_MAX_MB})')
     parser.add_argument('--target-results', type=str, default='./')
 
     # New argiuments for claude
     parser.add_argument('--no-dedup', action='store_true', help='Disable duplicate detection')
+    parser.add_argument('--no-merge', action='store_true',
+                        help='Disable merging of conversation versions across overlapping exports')
 
     args = parser.parse_args()
 
+    if args.tuning_profile:
+        from autotune import load_profile
+        try:
+            reglages = load_profile(args.tuning_profile)
+        except (OSError, ValueError) as e:
+            print(f"❌ Tuning profile error: {e}")
+            return
+        # Profile values become defaults: options given on the command line still win
+        parser.set_defaults(**reglages)
+        args = parser.parse_args()
+        print("🎛️  Tuning profile: " + ", ".join(f"{cle}={valeur}" for cle, valeur in reglages.items()))
+
     # Handle simple commands
     if args.help:
         afficher_aide()
@@ -588,7 +1325,22 @@ def main() -> None:
             print("\n⚠️  No prompts found in 'prompts/' folder\n")
         return
 
-    if not args.exec:
+    if args.query is not None:
+        rechercher_resultats(args)
+        return
+
+    if args.export:
+        LOGS_DIR = ensure_directory(args.target_logs)
+        RESULTS_DIR = ensure_directory(args.target_results)
+        ouvrir_log(LOGS_DIR, args.log_level, args.log_max_mb)
+        exporter_resultats(args)
+        return
+
+    if args.autotune and args.simulate:
+        print("❌ --autotune measures real API calls: use it without --simulate (or with --autotune-mock)")
+        return
+
+    if not args.exec and not args.autotune and not args.plan and not args.virtual:
         print("❌ Use --exec to launch the analysis.")
         print("💡 Use --help or --help-adv for more information.")
         return
@@ -607,6 +1359,7 @@ def main() -> None:
     RESULTS_DIR = ensure_directory(args.target_results)
 
     # Initialize log
+    ouvrir_log(LOGS_DIR, args.log_level, args.log_max_mb)
     ecrire_log_local("=" * 80, "INFO")
     ecrire_log_local("CONVERSATION ANALYSIS START", "INFO")
     ecrire_log_local(f"Version: {VERSION}", "INFO")
@@ -622,13 +1375,23 @@ def main() -> None:
 
     # Dependencies check
     api_key = None
-    if not args.simulate:
+    if not args.simulate and not args.plan and not args.virtual:
         manquantes = verifier_dependances()
         if manquantes:
             print("❌ Missing dependencies.")
             print(f"   Activate venv: source {ENV_DIR}/bin/activate")
             sys.exit(1)
-        api_key = obtenir_api_key()
+        if args.engine == 'async':
+            try:
+                import aiohttp  # noqa: F401
+            except ImportError:
+                print("❌ --engine async requires aiohttp.")
+                print("💡 Install it with: pip install aiohttp")
+                sys.exit(1)
+        api_key = 'autotune' if args.autotune and args.autotune_mock else obtenir_api_key()
+
+    if not verifier_formats(args.format, args.compress):
+        sys.exit(1)
 
     # Load prompt
     from prompt_executor import PromptLoader
@@ -661,37 +1424,49 @@ def main() -> None:
 
     ecrire_log_local(f"Source format: {format_source}", "INFO")
 
+    # Stage timings and per-request metrics
+    from run_metrics import RunMetrics, format_summary
+    profiler = None
+    if args.profile:
+        from profiler import StageProfiler
+        profiler = StageProfiler(args.profile, top=args.profile_top)
+        print(f"🔬 Profiling: {args.profile} mode")
+        ecrire_log_local(f"Profiling enabled: {args.profile}", "INFO")
+    metrics = RunMetrics(profiler=profiler, simulated=args.simulate)
+
     # File search
-    fichier_patterns = args.fichier if isinstance(args.fichier, list) else [args.fichier]
-    fichiers_a_traiter = []
-
-    for pattern in fichier_patterns:
-        if args.recursive and '**' not in pattern:
-            if os.path.isdir(pattern):
-                pattern = os.path.join(pattern, '**', '*.json')
-            elif '*' in pattern:
-                base_dir = os.path.dirname(pattern) or '.'
-                filename = os.path.basename(pattern)
-                pattern = os.path.join(base_dir, '**', filename)
-            else:
-                base_dir = os.path.dirname(pattern) or '.'
-                filename = os.path.basename(pattern)
-                if filename:
+    with metrics.stage('discovery'):
+        fichier_patterns = args.fichier if isinstance(args.fichier, list) else [args.fichier]
+        fichiers_a_traiter = []
+
+        for pattern in fichier_patterns:
+            if args.recursive and '**' not in pattern:
+                if os.path.isdir(pattern):
+                    pattern = os.path.join(pattern, '**', '*.json')
+                elif '*' in pattern:
+                    base_dir = os.path.dirname(pattern) or '.'
+                    filename = os.path.basename(pattern)
                     pattern = os.path.join(base_dir, '**', filename)
                 else:
-                    pattern = os.path.join(pattern, '**', '*.json')
+                    base_dir = os.path.dirname(pattern) or '.'
+                    filename = os.path.basename(pattern)
+                    if filename:
+                        pattern = os.path.join(base_dir, '**', filename)
+                    else:
+                        pattern = os.path.join(pattern, '**', '*.json')
 
-        if '**' in pattern or args.recursive:
-            fichiers_trouves = glob.glob(pattern, recursive=True)
-        else:
-            fichiers_trouves = glob.glob(pattern)
+            if '**' in pattern or args.recursive:
+                fichiers_trouves = glob.glob(pattern, recursive=True)
+            else:
+                fichiers_trouves = glob.glob(pattern)
 
-        if fichiers_trouves:
-            fichiers_a_traiter.extend(fichiers_trouves)
+            if fichiers_trouves:
+                fichiers_a_traiter.extend(fichiers_trouves)
 
     if not fichiers_a_traiter:
         print(f"❌ No files found")
         ecrire_log_local("No files found", "ERROR")
+        sauver_profil(profiler, metrics.run_id)
         return
 
     fichiers_a_traiter = sorted(list(set(fichiers_a_traiter)))
@@ -707,12 +1482,19 @@ def main() -> None:
     print(f"🤖 Model: {args.model}")
     print(f"⚡ Workers: {args.workers}")
     print(f"📄 Format: {format_source.upper()}")
-    if args.simulate:
+    if args.plan:
+        print("📐 Mode: PLAN (no API call)")
+    elif args.virtual:
+        print("🕰️  Mode: VIRTUAL CLOCK (no API call)")
+    elif args.simulate:
         print("🧪 Mode: SIMULATION")
     print()
 
     # Loading
-    toutes_conversations, stats_chargement, details_fichiers = charger_fichiers(fichiers_a_traiter, format_source)
+    with metrics.stage('load'):
+        toutes_conversations, stats_chargement, details_fichiers = charger_fichiers(
+            fichiers_a_traiter, format_source, fusionner=not args.no_merge
+        )
 
     # Generate detailed file report
     generer_rapport_fichiers(details_fichiers, LOGS_DIR)
@@ -720,6 +1502,7 @@ def main() -> None:
     if not toutes_conversations:
         print("\n❌ No conversations found.")
         ecrire_log_local("No conversations found", "ERROR")
+        sauver_profil(profiler, metrics.run_id)
         return
 
     print(f"\n{'─' * 70}")
@@ -728,6 +1511,16 @@ def main() -> None:
 
     ecrire_log_local(f"Total conversations loaded: {len(toutes_conversations)}", "INFO")
 
+    # Version merge (overlapping exports)
+    if not args.no_merge:
+        nb_remplacees = stats_chargement.get('versions_remplacees', 0)
+        if nb_remplacees > 0:
+            print(f"🔀 {nb_remplacees} older version(s) merged (newest snapshot kept per conversation)")
+            ecrire_log_local(f"Older versions merged: {nb_remplacees}", "INFO")
+    else:
+        print("⚠️  Version merge DISABLED (--no-merge) – Every snapshot of a conversation will be processed")
+        ecrire_log_local("Version merge disabled by user", "INFO")
+
     # # Duplicate detection
     # print("🔍 Detecting duplicates...")
     # ecrire_log_local("Detecting duplicates...", "INFO")
@@ -755,7 +1548,8 @@ def main() -> None:
     if not args.no_dedup:
         print("🔍 Detecting duplicates...")
         ecrire_log_local("Detecting duplicates...", "INFO")
-        rapport_doublons = detecter_doublons(toutes_conversations)
+        with metrics.stage('dedup'):
+            rapport_doublons = detecter_doublons(toutes_conversations)
         if rapport_doublons['nb_doublons'] > 0:
             print(f"⚠️  {rapport_doublons['nb_doublons']} duplicate(s) detected and excluded")
             ecrire_log_local(f"Duplicates detected: {rapport_doublons['nb_doublons']}", "WARNING")
@@ -780,6 +1574,7 @@ def main() -> None:
         if not toutes_conversations:
             print("❌ No conversations after --max-big-conv filtering.")
             ecrire_log_local("No conversations after --max-big-conv filtering", "ERROR")
+            sauver_profil(profiler, metrics.run_id)
             return
 
     # Message extraction and splitting
@@ -787,20 +1582,33 @@ def main() -> None:
     ecrire_log_local("Extracting messages...", "INFO")
     conversations_a_traiter = []
 
-    for conv in toutes_conversations:
-        format_conv = conv.get('_format', 'unknown')
-        messages = extraire_messages(conv, format_conv)
+    # Two passes so that each stage is timed (and profiled) in one block
+    with metrics.stage('extraction'):
+        conversations_extraites = []
+        for conv in toutes_conversations:
+            format_conv = conv.get('_format', 'unknown')
+            messages = extraire_messages(conv, format_conv)
+            if messages:
+                conversations_extraites.append((conv, format_conv, messages))
 
-        if not messages:
-            continue
+    if args.autotune:
+        lancer_autotune(args, conversations_extraites, prompt_template, api_key)
+        sauver_profil(profiler, metrics.run_id)
+        return
 
-        # Split if necessary
-        conversations_decoupees = decouper_conversation(conv, messages)
-        for conv_decoupee in conversations_decoupees:
-            # Preserve metadata
-            conv_decoupee['_source_file'] = conv.get('_source_file', 'unknown')
-            conv_decoupee['_format'] = format_conv
-            conversations_a_traiter.append(conv_decoupee)
+    # Split if necessary
+    with metrics.stage('splitting'):
+        for conv, format_conv, messages in conversations_extraites:
+            for conv_decoupee in decouper_conversation(conv, messages, args.chunk_tokens or MAX_TOKENS,
+                                                       recursif=args.chunk_tokens is not None):
+                # Preserve metadata
+                conv_decoupee['_source_file'] = conv.get('_source_file', 'unknown')
+                conv_decoupee['_format'] = format_conv
+                conv_decoupee['_task_id'] = identifiant_tache(
+                    conv, format_conv, conv_decoupee['partie'], conv_decoupee['messages']
+                )
+                conversations_a_traiter.append(conv_decoupee)
+        conversations_extraites = None
 
     print(f"✅ {len(conversations_a_traiter)} conversations ready (after splitting)\n")
     ecrire_log_local(f"Conversations ready: {len(conversations_a_traiter)}", "INFO")
@@ -814,6 +1622,7 @@ def main() -> None:
         else:
             print(f"❌ --cnbr {args.cnbr} out of bounds (1-{len(conversations_a_traiter)})")
             ecrire_log_local(f"Error --cnbr: {args.cnbr} out of bounds", "ERROR")
+            sauver_profil(profiler, metrics.run_id)
             return
 
     if args.only_split:
@@ -829,27 +1638,254 @@ def main() -> None:
     if not conversations_a_traiter:
         print("❌ No conversations to process after filtering.")
         ecrire_log_local("No conversations after filtering", "ERROR")
+        sauver_profil(profiler, metrics.run_id)
         return
 
+    if args.plan:
+        planifier(args, conversations_a_traiter, prompt_template)
+        sauver_profil(profiler, metrics.run_id)
+        return
+
+    if args.virtual:
+        simuler_virtuel(args, conversations_a_traiter, prompt_template)
+        sauver_profil(profiler, metrics.run_id)
+        return
+
+    # Run journal (write-ahead, every final result is appended as soon as it is known)
+    from run_journal import RunJournal
+    journal_dir = RESULTS_DIR / "runs"
+    ordre_taches = [c['_task_id'] for c in conversations_a_traiter]
+    empreinte_prompt = hashlib.sha256(prompt_template.encode('utf-8')).hexdigest()[:16]
+    prompt_name = args.prompt_file if args.prompt_file else "custom"
+
+    if args.retry_failed and not args.resume:
+        print("❌ --retry-failed requires --resume <run-id>")
+        sauver_profil(profiler, metrics.run_id)
+        return
+
+    if args.resume:
+        run_id = args.resume
+        journal_path = RunJournal.path_for(journal_dir, run_id)
+        if not journal_path.exists():
+            print(f"❌ No journal for run '{run_id}' ({journal_path})")
+            ecrire_log_local(f"Resume: journal not found {journal_path}", "ERROR")
+            sauver_profil(profiler, metrics.run_id)
+            return
+
+        entete, resultats_precedents = RunJournal.load(str(journal_path))
+        if entete and (entete.get('prompt') != empreinte_prompt or entete.get('model') != args.model):
+            print("⚠️  Prompt or model differs from the original run: previous results are kept as they are")
+            ecrire_log_local("Resume: prompt or model differs from the original run", "WARNING")
+
+        reussies = {tid for tid, r in resultats_precedents.items() if r.get('success')}
+        if args.retry_failed:
+            conversations_a_traiter = [
+                c for c in conversations_a_traiter
+                if c['_task_id'] in resultats_precedents and c['_task_id'] not in reussies
+            ]
+        else:
+            conversations_a_traiter = [c for c in conversations_a_traiter if c['_task_id'] not in reussies]
+
+        print(f"♻️  Resuming run {run_id}: {len(reussies)} already completed, "
+              f"{len(conversations_a_traiter)} to process"
+              f"{' (failed only)' if args.retry_failed else ''}\n")
+        ecrire_log_local(
+            f"Resume {run_id}: {len(reussies)} completed, {len(conversations_a_traiter)} to process "
+            f"(retry-failed: {args.retry_failed})",
+            "INFO"
+        )
+    else:
+        run_id = RunJournal.new_run_id()
+        journal_path = RunJournal.path_for(journal_dir, run_id)
+
+    journal = RunJournal(str(journal_path), run_id)
+    metrics.run_id = run_id
+    journal.write_header(
+        model=args.model,
+        prompt=empreinte_prompt,
+        prompt_name=prompt_name,
+        tasks=len(ordre_taches),
+        resumed=bool(args.resume),
+        retry_failed=args.retry_failed
+    )
+    print(f"📓 Run journal: {journal_path}")
+    print(f"   Resume with: --resume {run_id}\n")
+    ecrire_log_local(f"Run {run_id}, journal: {journal_path}", "INFO")
+
     # Executor initialization
-    from prompt_executor import PromptExecutor, process_conversation_with_prompt
+    from prompt_executor import PromptExecutor
+    from execution_engine import run_thread_engine, run_async_engine, ObserverGroup
 
     executor = None
-    if not args.simulate:
+    executor_config = None
+    if args.simulate:
+        # Simulation mode: pas besoin d'executor, géré dans process_conversation_with_prompt
+        ecrire_log_local("Simulation mode activated", "INFO")
+    elif args.engine == 'async':
+        # The async executor is created inside the event loop by the engine
+        executor_config = {
+            'api_key': api_key,
+            'api_url': args.api_url,
+            'model': args.model,
+            'connect_timeout': args.connect_timeout,
+            'read_timeout': args.read_timeout
+        }
+        ecrire_log_local(f"Async executor configured: {args.model} (concurrency {args.workers})", "INFO")
+    else:
+        # The thread engine runs up to --max-workers threads with --adaptive
+        taille_pool = args.max_workers if args.adaptive else args.workers
         executor = PromptExecutor(
             api_key=api_key,
-            model=args.model
+            api_url=args.api_url,
+            model=args.model,
+            pool_size=taille_pool,
+            connect_timeout=args.connect_timeout,
+            read_timeout=args.read_timeout
+        )
+        ecrire_log_local(
+            f"Executor initialized: {args.model} (pool {taille_pool}, "
+            f"timeouts {args.connect_timeout}s/{args.read_timeout}s)",
+            "INFO"
+        )
+
+    # Response cache
+    cache = None
+    if not args.simulate and args.cache_mode != 'off':
+        from response_cache import ResponseCache
+        cache_path = Path(args.cache_file) if args.cache_file else RESULTS_DIR / CACHE_FILE
+        cache = ResponseCache(
+            str(cache_path),
+            mode=args.cache_mode,
+            ttl=args.cache_ttl * 86400 if args.cache_ttl else None,
+            max_size_mb=args.cache_max_mb or None
         )
-        ecrire_log_local(f"Executor initialized: {args.model}", "INFO")
+        print(f"🗄️  Response cache: {cache_path} ({args.cache_mode})")
+        ecrire_log_local(f"Response cache: {cache_path} (mode {args.cache_mode}, "
+                         f"TTL {args.cache_ttl} days, max {args.cache_max_mb} MB)", "INFO")
+
+    # Shared rate limiter (replaces the fixed per-request delay)
+    rate_limiter = None
+    if args.rpm or args.tpm:
+        from rate_limiter import RateLimiter
+        rate_limiter = RateLimiter(requests_per_minute=args.rpm, tokens_per_minute=args.tpm, burst=args.rate_burst)
+        print(f"🚦 Rate limits: {args.rpm or '∞'} requests/min, {args.tpm or '∞'} tokens/min")
+        ecrire_log_local(f"Rate limiter: {args.rpm} RPM, {args.tpm} TPM (--delay ignored)", "INFO")
+
+    # Adaptive concurrency (AIMD)
+    concurrency = None
+    if args.adaptive:
+        from concurrency import AdaptiveConcurrency
+
+        def journaliser_concurrence(ancienne: int, nouvelle: int, raison: str) -> None:
+            ecrire_log_local(f"Concurrency {ancienne} -> {nouvelle} ({raison})",
+                             "INFO" if nouvelle > ancienne else "WARNING")
+
+        concurrency = AdaptiveConcurrency(
+            initial=args.workers,
+            minimum=args.min_workers,
+            maximum=args.max_workers,
+            on_change=journaliser_concurrence
+        )
+        print(f"📈 Adaptive concurrency: start {concurrency.limit}, range {concurrency.minimum}-{concurrency.maximum}")
+        ecrire_log_local(
+            f"Adaptive concurrency: start {concurrency.limit}, range {concurrency.minimum}-{concurrency.maximum}",
+            "INFO"
+        )
+
+    # Deferred retries and circuit breaker
+    from retry_queue import RetryPolicy, CircuitBreaker
+    retry_policy = RetryPolicy(max_attempts=args.max_retries)
+    circuit_breaker = None
+    if not args.no_circuit_breaker:
+        def journaliser_disjoncteur(etat: str, raison: str) -> None:
+            ecrire_log_local(f"Circuit breaker {etat}: {raison}", "WARNING" if etat == 'open' else "INFO")
+        circuit_breaker = CircuitBreaker(on_change=journaliser_disjoncteur)
+
+    # Generate output filename
+    if args.output:
+        output_base = args.output
     else:
-        # Simulation mode: pas besoin d'executor, géré dans process_conversation_with_prompt
-        executor = None
-        ecrire_log_local("Simulation mode activated", "INFO")
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        output_base = f"results_{prompt_name}_{timestamp}"
+
+    chemins = chemins_sortie(output_base, args.format)
+    for fmt, chemin in chemins.items():
+        ecrire_log_local(f"Output file ({fmt}): {chemin}", "INFO")
+
+    # Streaming writers: each result is written as soon as it is final, to every format in one pass
+    from result_formatter import open_stream_writer
+    sorties = ouvrir_sorties(chemins, run_id, prompt_name, empreinte_prompt, args.model,
+                             args.compress, args.rotate_rows, args.rotate_mb)
+    store = None
+    if args.results_store:
+        store = open_stream_writer('sqlite', args.results_store, run_id=run_id, prompt=prompt_name,
+                                   prompt_hash=empreinte_prompt, model=args.model)
+        print(f"🗃️  Results store: {args.results_store}")
+        ecrire_log_local(f"Results store: {args.results_store}", "INFO")
+    # Prometheus metrics (pull over HTTP and/or textfile collector)
+    exporter = None
+    if args.metrics_port is not None or args.metrics_textfile:
+        from metrics_exporter import PrometheusExporter
+        exporter = PrometheusExporter(run_id, total=len(conversations_a_traiter), cache=cache,
+                                      model=args.model)
+        if args.metrics_port is not None:
+            try:
+                hote, port = exporter.serve(args.metrics_host, args.metrics_port)
+                print(f"📡 Metrics: http://{hote}:{port}/metrics")
+                ecrire_log_local(f"Metrics endpoint: http://{hote}:{port}/metrics", "INFO")
+            except OSError as e:
+                print(f"⚠️  Metrics endpoint not started: {e}")
+                ecrire_log_local(f"Metrics endpoint error: {e}", "ERROR")
+        if args.metrics_textfile:
+            exporter.start_textfile(args.metrics_textfile, args.metrics_interval)
+            print(f"📡 Metrics textfile: {args.metrics_textfile} (every {args.metrics_interval:g}s)")
+            ecrire_log_local(f"Metrics textfile: {args.metrics_textfile}", "INFO")
+
+    # Structured event stream (one JSON line per step, with conversation and attempt ids)
+    evenements = None
+    if args.events:
+        from event_log import EventLog
+        chemin_evenements = EventLog.path_for(journal_dir, run_id) if args.events == 'auto' else Path(args.events)
+        evenements = EventLog(str(chemin_evenements), run_id)
+        evenements.emit('run_started', model=args.model, prompt=prompt_name, prompt_hash=empreinte_prompt,
+                        engine=args.engine, workers=args.workers, tasks=len(conversations_a_traiter),
+                        resumed=bool(args.resume), simulate=args.simulate)
+        print(f"🧾 Event log: {chemin_evenements}")
+        ecrire_log_local(f"Event log: {chemin_evenements}", "INFO")
+    noms_sorties = [writer.name.lower() for writer in sorties.writers] + (['store'] if store is not None else [])
+
+    bilan = {'total': 0, 'success': 0, 'cached': 0, 'reprises': 0}
+
+    def comptabiliser(result: Dict[str, Any]) -> None:
+        sorties.write(result)
+        if store is not None:
+            store.write(result)
+        bilan['total'] += 1
+        if result.get('success', False):
+            bilan['success'] += 1
+        if result.get('cached', False):
+            bilan['cached'] += 1
+        if evenements is not None:
+            evenements.written(result, noms_sorties)
+
+    if args.resume:
+        # Results of the resumed run that are not processed again go to the output first
+        a_traiter = {c['_task_id'] for c in conversations_a_traiter}
+        for tid in ordre_taches:
+            if tid in resultats_precedents and tid not in a_traiter:
+                comptabiliser(resultats_precedents[tid])
+                bilan['reprises'] += 1
+        resultats_precedents = None
+
+    if evenements is not None:
+        evenements.queued(conversations_a_traiter)
 
     # Parallel execution
-    print(f"🚀 Starting analysis ({args.workers} workers)...\n")
-    ecrire_log_local(f"Starting analysis: {args.workers} workers, delay {args.delay}s", "INFO")
-    resultats = []
+    print(f"🚀 Starting analysis ({args.workers} {'concurrent requests' if args.engine == 'async' else 'workers'})...\n")
+    ecrire_log_local(
+        f"Starting analysis: engine {args.engine}, {args.workers} workers, delay {args.delay}s",
+        "INFO"
+    )
 
     try:
         from tqdm import tqdm
@@ -858,150 +1894,166 @@ def main() -> None:
         ecrire_log_local("tqdm not available", "WARNING")
         tqdm = None
 
-    with ThreadPoolExecutor(max_workers=args.workers) as pool:
-        futures = {}
-
-        for conv in conversations_a_traiter:
-            messages = conv.get('messages', [])
-            future = pool.submit(
-                process_conversation_with_prompt,
-                conv,
-                messages,
-                prompt_template,
-                executor,
-                args.simulate,
-                args.delay
-            )
-            futures[future] = conv.get('titre', 'Untitled')
-
-        # Progress bar
-        if tqdm:
-            with tqdm(total=len(futures), desc="Analysis", unit="conv") as pbar:
-                for future in as_completed(futures):
-                    try:
-                        result = future.result()
-                        resultats.append(result)
-
-                        # Log each result
-                        titre = result.get('titre', 'Untitled')
-                        success = result.get('success', False)
-                        if success:
-                            ecrire_log_local(f"✅ Processed: {titre}", "INFO")
-                        else:
-                            error = result.get('error', 'Unknown error')
-                            ecrire_log_local(f"❌ Failed: {titre} - {error}", "ERROR")
-
-                        pbar.update(1)
-                    except Exception as e:
-                        titre = futures[future]
-                        ecrire_log_local(f"Processing error '{titre}': {e}", "ERROR")
-                        print(f"\n⚠️  Error: {titre}")
-                        pbar.update(1)
+    # Progress and ETA weighted by the estimated tokens of each conversation
+    from progress import TokenProgress
+    progression = TokenProgress(conversations_a_traiter, tqdm_class=tqdm)
+    ecrire_log_local(f"Estimated prompt tokens: {progression.total_tokens}", "INFO")
+    observateurs = ObserverGroup([metrics, exporter, evenements, progression])
+
+    def enregistrer_resultat(result: Dict[str, Any]) -> None:
+        journal.append(result)
+        comptabiliser(result)
+
+        # Log each result
+        titre = result.get('titre', 'Untitled')
+        if result.get('success', False):
+            ecrire_log_local(f"✅ Processed: {titre}", "INFO")
         else:
-            # Without tqdm
-            completed = 0
-            for future in as_completed(futures):
-                try:
-                    result = future.result()
-                    resultats.append(result)
-
-                    # Log each result
-                    titre = result.get('titre', 'Untitled')
-                    success = result.get('success', False)
-                    if success:
-                        ecrire_log_local(f"✅ Processed: {titre}", "INFO")
-                    else:
-                        error = result.get('error', 'Unknown error')
-                        ecrire_log_local(f"❌ Failed: {titre} - {error}", "ERROR")
+            error = result.get('error', 'Unknown error')
+            ecrire_log_local(f"❌ Failed: {titre} - {error}", "ERROR")
 
-                    completed += 1
-                    if completed % 10 == 0:
-                        print(f"   Progress: {completed}/{len(futures)}")
-                except Exception as e:
-                    titre = futures[future]
-                    ecrire_log_local(f"Processing error '{titre}': {e}", "ERROR")
-                    print(f"⚠️  Error: {titre}")
-                    completed += 1
+    compteurs = {'retries': 0}
 
-    # Save results
-    print(f"\n💾 Saving results...")
-    ecrire_log_local("Saving results...", "INFO")
+    def planifier_reessai(titre: str, tentative: int, attente: float, erreur: str) -> None:
+        compteurs['retries'] += 1
+        ecrire_log_local(f"🔁 Retry #{tentative} of '{titre}' in {attente:.1f}s ({erreur})", "WARNING")
 
-    from result_formatter import ResultFormatter
-    formatter = ResultFormatter()
+    def enregistrer_erreur(titre: str, e: Exception) -> None:
+        ecrire_log_local(f"Processing error '{titre}': {e}", "ERROR")
+        print(f"\n⚠️  Error: {titre}")
 
-    # Generate output filename
-    if args.output:
-        output_base = args.output
-    else:
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        prompt_name = args.prompt_file if args.prompt_file else "custom"
-        output_base = f"results_{prompt_name}_{timestamp}"
+    try:
+        with metrics.stage('dispatch'):
+            if args.engine == 'async':
+                run_async_engine(
+                    conversations_a_traiter,
+                    prompt_template,
+                    executor_config,
+                    args.workers,
+                    enregistrer_resultat,
+                    enregistrer_erreur,
+                    simulate=args.simulate,
+                    delay=args.delay,
+                    rate_limiter=rate_limiter,
+                    concurrency=concurrency,
+                    retry_policy=retry_policy,
+                    circuit_breaker=circuit_breaker,
+                    on_retry=planifier_reessai,
+                    cache=cache,
+                    observer=observateurs
+                )
+            else:
+                run_thread_engine(
+                    conversations_a_traiter,
+                    prompt_template,
+                    executor,
+                    args.workers,
+                    enregistrer_resultat,
+                    enregistrer_erreur,
+                    simulate=args.simulate,
+                    delay=args.delay,
+                    rate_limiter=rate_limiter,
+                    concurrency=concurrency,
+                    retry_policy=retry_policy,
+                    circuit_breaker=circuit_breaker,
+                    on_retry=planifier_reessai,
+                    cache=cache,
+                    observer=observateurs
+                )
+    finally:
+        progression.close()
+        if executor is not None:
+            executor.close()
+            ecrire_log_local("Executor session closed", "INFO")
+        if exporter is not None:
+            exporter.close()
+        if cache is not None:
+            cache.close()
+        journal.close()
+        ecrire_log_local(f"Run journal closed: {journal.written} result(s) written", "INFO")
+        with metrics.stage('save'):
+            sorties.close()
+            store_ok = store.close() if store is not None else True
+        if evenements is not None:
+            evenements.emit('run_finished', total=bilan['total'], success=bilan['success'],
+                            cached=bilan['cached'], carried_over=bilan['reprises'], retries=compteurs['retries'])
+            evenements.close()
 
-    # Add extension according to format
-    if not any(output_base.endswith(ext) for ext in ['.csv', '.json', '.txt', '.md', '.markdown']):
-        if args.format == 'csv':
-            output_file = f"{output_base}.csv"
-        elif args.format == 'json':
-            output_file = f"{output_base}.json"
-        elif args.format == 'txt':
-            output_file = f"{output_base}.txt"
-        elif args.format == 'markdown':
-            output_file = f"{output_base}.md"
-    else:
-        output_file = output_base
-
-    # Save in RESULTS_DIR
-    output_path = RESULTS_DIR / output_file
-
-    ecrire_log_local(f"Output file: {output_path}", "INFO")
-    ecrire_log_local(f"Format: {args.format}", "INFO")
-
-    # Save according to format
-    success = False
-    if args.format == 'csv':
-        success = formatter.save_csv(resultats, str(output_path))
-    elif args.format == 'json':
-        success = formatter.save_json(resultats, str(output_path))
-    elif args.format == 'txt':
-        success = formatter.save_txt(resultats, str(output_path))
-    elif args.format == 'markdown':
-        success = formatter.save_markdown(resultats, str(output_path))
-
-    if success:
-        print(f"✅ Results saved: {output_path}")
-        print(f"   📊 Format: {args.format.upper()}")
-        file_size = os.path.getsize(output_path)
-        print(f"   📏 Size: {file_size:,} bytes")
-        ecrire_log_local(f"Results saved: {output_path} ({file_size} bytes)", "INFO")
-    else:
-        print(f"❌ Error during save")
-        ecrire_log_local("Results save error", "ERROR")
+    print()
+    rapporter_sorties(sorties)
+    if store is not None:
+        if store_ok:
+            print(f"🗃️  Results store updated: {args.results_store} ({store.count} rows)")
+            ecrire_log_local(f"Results store updated: {store.count} rows", "INFO")
+        else:
+            print(f"❌ Results store error: {args.results_store}")
+            ecrire_log_local("Results store error", "ERROR")
+
+    # Run metrics (stage timings, latency percentiles, throughput)
+    metrics_path = RunMetrics.path_for(journal_dir, run_id)
+    try:
+        resume_metriques = metrics.save(str(metrics_path))
+        print(f"📐 Run metrics: {metrics_path}")
+        ecrire_log_local(f"Run metrics: {metrics_path}", "INFO")
+    except OSError as e:
+        resume_metriques = metrics.summary()
+        print(f"⚠️  Run metrics not saved: {e}")
+        ecrire_log_local(f"Run metrics save error: {e}", "ERROR")
+
+    sauver_profil(profiler, run_id)
 
     # Final statistics
     temps_total = time.time() - temps_debut
-    success_count = sum(1 for r in resultats if r.get('success', False))
-    error_count = len(resultats) - success_count
+    success_count = bilan['success']
+    error_count = bilan['total'] - success_count
+    cached_count = bilan['cached']
 
     print(f"\n{'═' * 70}")
     print(f"📊 FINAL REPORT")
     print(f"{'═' * 70}")
     print(f"⏱️  Total time: {temps_total:.2f}s")
+    for ligne in format_summary(resume_metriques):
+        print(ligne)
+    print(f"📓 Run: {run_id}")
+    if bilan['reprises']:
+        print(f"♻️  Carried over from previous attempts: {bilan['reprises']}")
     print(f"✅ Success: {success_count}")
+    if cache is not None:
+        print(f"   🗄️  From cache: {cached_count} (API calls: {success_count - cached_count})")
     print(f"❌ Errors: {error_count}")
-    print(f"📊 Total processed: {len(resultats)}")
-    if len(resultats) > 0:
-        print(f"📈 Success rate: {(success_count/len(resultats)*100):.1f}%")
+    print(f"📊 Total processed: {bilan['total']}")
+    if bilan['total'] > 0:
+        print(f"📈 Success rate: {(success_count/bilan['total']*100):.1f}%")
+    if compteurs['retries']:
+        print(f"🔁 Retries: {compteurs['retries']}")
+    if circuit_breaker is not None and circuit_breaker.opened_count:
+        print(f"⛔ Circuit breaker opened: {circuit_breaker.opened_count} time(s)")
+    if concurrency is not None:
+        resume_concurrence = concurrency.summary()
+        raisons = ", ".join(f"{k}: {v}" for k, v in resume_concurrence['decrease_reasons'].items()) or "none"
+        print(f"⚡ Concurrency: final {resume_concurrence['current']}, peak {resume_concurrence['peak']} "
+              f"(+{resume_concurrence['increases']} / -{resume_concurrence['decreases']}, cuts: {raisons})")
     print(f"{'═' * 70}\n")
 
     ecrire_log_local("=" * 80, "INFO")
     ecrire_log_local("FINAL REPORT", "INFO")
     ecrire_log_local(f"Total time: {temps_total:.2f}s", "INFO")
+    ecrire_log_local(f"Stages: {resume_metriques['stages']}", "INFO")
+    ecrire_log_local(f"Latency: {resume_metriques['latency']}, queue wait: {resume_metriques['queue_wait']}", "INFO")
+    ecrire_log_local(f"Throughput: {resume_metriques['throughput']}, tokens: {resume_metriques['tokens']}", "INFO")
+    ecrire_log_local(f"Run: {run_id} ({journal_path})", "INFO")
     ecrire_log_local(f"Success: {success_count}", "INFO")
+    if cache is not None:
+        ecrire_log_local(f"Cache hits: {cached_count} (cache stats: {cache.stats()})", "INFO")
     ecrire_log_local(f"Errors: {error_count}", "INFO")
-    ecrire_log_local(f"Total processed: {len(resultats)}", "INFO")
-    if len(resultats) > 0:
-        ecrire_log_local(f"Success rate: {(success_count/len(resultats)*100):.1f}%", "INFO")
+    ecrire_log_local(f"Total processed: {bilan['total']}", "INFO")
+    if bilan['total'] > 0:
+        ecrire_log_local(f"Success rate: {(success_count/bilan['total']*100):.1f}%", "INFO")
+    ecrire_log_local(f"Retries: {compteurs['retries']}", "INFO")
+    if circuit_breaker is not None:
+        ecrire_log_local(f"Circuit breaker opened: {circuit_breaker.opened_count} time(s)", "INFO")
+    if concurrency is not None:
+        ecrire_log_local(f"Concurrency summary: {concurrency.summary()}", "INFO")
     ecrire_log_local("=" * 80, "INFO")
     ecrire_log_local("ANALYSIS END", "INFO")
 
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Autotune Module
+Sweeps workers, pacing and chunk budget to find the fastest settings within a quota
+"""
+
+import json
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Any, Callable, Optional, Tuple
+
+from execution_engine import run_thread_engine, ObserverGroup
+from metrics_exporter import PrometheusExporter
+from retry_queue import RetryPolicy
+from run_metrics import RunMetrics
+
+# Options a tuning profile may set (argparse destinations of the main script)
+TUNED_SETTINGS = ['workers', 'delay', 'chunk_tokens', 'rpm', 'tpm']
+
+
+def parse_candidates(valeur: str, cast: Callable = float) -> List:
+    """'1,2,4,8' -> [1, 2, 4, 8] (sorted, duplicates removed)."""
+    try:
+        return sorted({cast(v.strip()) for v in valeur.split(',') if v.strip()})
+    except ValueError:
+        raise ValueError(f"Invalid list of values: {valeur}")
+
+
+class Autotuner:
+    """
+    Runs the same sample of conversations with each candidate setting.
+
+    A trial splits the sampled conversations with one chunk budget and sends
+    them through the thread engine with a PromptExecutor, observed by
+    RunMetrics (throughput, latency) and PrometheusExporter (429 and 5xx
+    counts). The sweep is short-circuited where more cannot help: pacing is
+    only increased while a trial is throttled or failing, and workers stop
+    growing once tokens/s plateaus, the quota ceiling is reached or the
+    errors persist at the slowest pacing.
+
+    A small sample fits in a quota's one-minute burst, so its raw tokens/s
+    can exceed what a full run sustains. Trials are therefore scored by
+    their sustainable tokens/s, capped by `tpm` and by `rpm` times the
+    tokens per request.
+    """
+
+    def __init__(
+        self,
+        conversations: List[Tuple[Dict[str, Any], str, List[str]]],
+        split: Callable[[Dict[str, Any], List[str], int], List[Dict[str, Any]]],
+        prompt_template: str,
+        executor_factory: Callable[[int], Any],
+        rpm: Optional[float] = None,
+        tpm: Optional[float] = None,
+        sample: int = 30,
+        max_retries: int = 3,
+        cooldown: float = 0.0,
+        on_trial: Optional[Callable[[Dict[str, Any]], None]] = None
+    ):
+        pas = max(1, len(conversations) // max(1, sample))
+        self.conversations = conversations[::pas][:sample]
+        self.split = split
+        self.prompt_template = prompt_template
+        self.executor_factory = executor_factory
+        self.rpm = rpm
+        self.tpm = tpm
+        self.max_retries = max_retries
+        self.cooldown = cooldown
+        self.on_trial = on_trial
+        self._parts: Dict[int, List[Dict[str, Any]]] = {}
+
+    def parts(self, chunk_tokens: int) -> List[Dict[str, Any]]:
+        """The sample split with `chunk_tokens`, with task ids (split once per budget, copied per trial)."""
+        if chunk_tokens not in self._parts:
+            parts = []
+            for index, (conv, format_conv, messages) in enumerate(self.conversations):
+                for part in self.split(conv, messages, chunk_tokens):
+                    part['_source_file'] = conv.get('_source_file', 'unknown')
+                    part['_format'] = format_conv
+                    part['_task_id'] = f"autotune-{index}-{part['partie']}"
+                    parts.append(part)
+            self._parts[chunk_tokens] = parts
+        return [dict(part) for part in self._parts[chunk_tokens]]
+
+    def trial(self, workers: int, delay: float, chunk_tokens: int) -> Dict[str, Any]:
+        parts = self.parts(chunk_tokens)
+        metrics = RunMetrics()
+        compteurs = PrometheusExporter(total=len(parts))
+        executor = self.executor_factory(workers)
+        try:
+            with metrics.stage('dispatch'):
+                run_thread_engine(
+                    parts,
+                    self.prompt_template,
+                    executor,
+                    workers,
+                    lambda result: None,
+                    lambda titre, e: None,
+                    delay=delay,
+                    retry_policy=RetryPolicy(max_attempts=self.max_retries),
+                    observer=ObserverGroup([metrics, compteurs])
+                )
+        finally:
+            executor.close()
+
+        resume = metrics.summary()
+        echecs = {}
+        for (_, classe), nombre in compteurs.failures.items():
+            echecs[classe] = echecs.get(classe, 0) + nombre
+        trial = {
+            'workers': workers,
+            'delay': delay,
+            'chunk_tokens': chunk_tokens,
+            'requests': resume['requests']['final'],
+            'failed': resume['requests']['failed'],
+            'retries': resume['requests']['retries'],
+            'throttled': echecs.get('rate_limited', 0),
+            'server_errors': echecs.get('server_error', 0),
+            'seconds': resume['stages'].get('dispatch', 0.0),
+            'requests_per_s': resume['throughput']['requests_per_s'],
+            'tokens_per_s': resume['throughput']['tokens_per_s'],
+            'p95_latency': resume['latency'].get('p95')
+        }
+        trial['sustained_tokens_per_s'] = round(self.sustained(trial), 1)
+        if self.on_trial is not None:
+            self.on_trial(trial)
+        if trial['throttled'] and self.cooldown:
+            time.sleep(self.cooldown)
+        return trial
+
+    def sustained(self, trial: Dict[str, Any]) -> float:
+        """Tokens/s a full run could keep with these settings, within the quota."""
+        tokens_per_s = trial['tokens_per_s']
+        plafonds = [tokens_per_s]
+        if self.tpm:
+            plafonds.append(self.tpm / 60.0)
+        if self.rpm and trial['requests_per_s']:
+            plafonds.append(self.rpm / 60.0 * tokens_per_s / trial['requests_per_s'])
+        return min(plafonds)
+
+    def sweep(
+        self,
+        workers: List[int],
+        delays: List[float],
+        chunks: List[int],
+        tolerance: float = 0.05
+    ) -> List[Dict[str, Any]]:
+        trials = []
+        for chunk_tokens in sorted(chunks, reverse=True):
+            precedent = None
+            for nb_workers in sorted(workers):
+                for delay in sorted(delays):
+                    trial = self.trial(nb_workers, delay, chunk_tokens)
+                    trials.append(trial)
+                    if not trial['throttled'] and not trial['failed']:
+                        break
+                if trial['throttled'] or trial['failed']:
+                    # Still throttled or failing at the slowest pacing: more workers cannot help
+                    break
+                if trial['sustained_tokens_per_s'] < trial['tokens_per_s']:
+                    # Quota ceiling reached
+                    break
+                if (precedent is not None and trial['sustained_tokens_per_s']
+                        < precedent['sustained_tokens_per_s'] * (1 + tolerance)):
+                    break
+                precedent = trial
+        return trials
+
+    def recommend(self, trials: List[Dict[str, Any]], tolerance: float = 0.05) -> Optional[Dict[str, Any]]:
+        """
+        Best trial: highest sustainable tokens/s without 429s or failures,
+        then the fewest workers and the largest chunks within `tolerance`.
+        """
+        propres = [t for t in trials if not t['throttled'] and not t['failed']]
+        if not propres:
+            propres = sorted(trials, key=lambda t: (t['throttled'] + t['failed']))[:1]
+        if not propres:
+            return None
+        meilleur = max(t['sustained_tokens_per_s'] for t in propres)
+        proches = [t for t in propres if t['sustained_tokens_per_s'] >= meilleur * (1 - tolerance)]
+        return min(proches, key=lambda t: (t['workers'], -t['chunk_tokens'], -t['sustained_tokens_per_s']))
+
+
+def save_profile(path: str, recommendation: Dict[str, Any], rpm: Optional[float], tpm: Optional[float],
+                 trials: List[Dict[str, Any]], **meta) -> Dict[str, Any]:
+    """Writes a tuning profile that --tuning-profile applies to later runs."""
+    profile = {
+        'settings': {
+            'workers': recommendation['workers'],
+            'delay': recommendation['delay'],
+            'chunk_tokens': recommendation['chunk_tokens'],
+            'rpm': rpm,
+            'tpm': tpm
+        },
+        'measured': {key: recommendation[key] for key in
+                     ('tokens_per_s', 'sustained_tokens_per_s', 'requests_per_s', 'p95_latency')},
+        'generated': datetime.now().isoformat(timespec='seconds'),
+        **meta,
+        'trials': trials
+    }
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(profile, f, ensure_ascii=False, indent=2)
+    return profile
+
+
+def load_profile(path: str) -> Dict[str, Any]:
+    """Settings of a tuning profile (only the keys of TUNED_SETTINGS, None values dropped)."""
+    with open(path, 'r', encoding='utf-8') as f:
+        profile = json.load(f)
+    settings = profile.get('settings') if isinstance(profile, dict) else None
+    if not isinstance(settings, dict):
+        raise ValueError(f"{path} is not a tuning profile")
+    return {key: settings[key] for key in TUNED_SETTINGS if settings.get(key) is not None}
@@ -0,0 +1,554 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark Module
+End-to-end benchmark of the --exec pipeline against a local mock Mistral server
+
+Usage:
+    python benchmark.py --scenario baseline
+    python benchmark.py --scenario throttled --repeat 3 -- --engine async -w 32
+    python benchmark.py --compare --scenario baseline
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import random
+import hashlib
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Any, Callable, Optional, Tuple
+
+from synthetic_exports import generer_export
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+MAIN_SCRIPT = SCRIPT_DIR / "analyse_conversations_merged.py"
+RESULTS_FILE = SCRIPT_DIR / "benchmarks" / "results.jsonl"
+
+# Fixed parameters of each scenario, so that runs on different commits are comparable
+SCENARIOS: Dict[str, Dict[str, Any]] = {
+    'smoke': {
+        'corpus': {'formats': ['chatgpt'], 'conversations': 20, 'messages_median': 6, 'words_median': 30},
+        'server': {'latency': 'fixed:0.01', 'ms_per_prompt_token': 0.0, 'ms_per_completion_token': 0.0,
+                   'completion_tokens': 50, 'rate_429': 0.1, 'rate_5xx': 0.0, 'retry_after': 0},
+        'pipeline': ['--delay', '0', '-w', '4']
+    },
+    'baseline': {
+        'corpus': {'formats': ['chatgpt', 'claude'], 'conversations': 250},
+        'server': {'latency': 'lognormal:0.2:0.5', 'ms_per_prompt_token': 0.02, 'ms_per_completion_token': 2.0,
+                   'completion_tokens': 200, 'rate_429': 0.0, 'rate_5xx': 0.0, 'retry_after': 1},
+        'pipeline': ['--delay', '0', '-w', '16']
+    },
+    'throttled': {
+        'corpus': {'formats': ['chatgpt', 'claude'], 'conversations': 250},
+        'server': {'latency': 'lognormal:0.2:0.5', 'ms_per_prompt_token': 0.02, 'ms_per_completion_token': 2.0,
+                   'completion_tokens': 200, 'rate_429': 0.1, 'rate_5xx': 0.02, 'retry_after': 1},
+        'pipeline': ['--delay', '0', '-w', '16']
+    },
+    'large': {
+        'corpus': {'formats': ['chatgpt'], 'conversations': 5000, 'messages_median': 30, 'words_median': 120,
+                   'branch_factor': 0.2, 'duplicate_ratio': 0.05},
+        'server': {'latency': 'lognormal:0.05:0.5', 'ms_per_prompt_token': 0.0, 'ms_per_completion_token': 0.2,
+                   'completion_tokens': 200, 'rate_429': 0.01, 'rate_5xx': 0.0, 'retry_after': 1},
+        'pipeline': ['--delay', '0', '-w', '64', '--engine', 'async']
+    }
+}
+
+
+def parse_distribution(spec: str) -> Callable[[random.Random], float]:
+    """
+    Parses a latency distribution, in seconds.
+
+    fixed:S, uniform:MIN:MAX, exp:MEAN or lognormal:MEDIAN:SIGMA
+    """
+    nom, *valeurs = spec.split(':')
+    try:
+        valeurs = [float(v) for v in valeurs]
+    except ValueError:
+        raise ValueError(f"Invalid distribution: {spec}")
+
+    if nom == 'fixed' and len(valeurs) == 1:
+        return lambda rng: valeurs[0]
+    if nom == 'uniform' and len(valeurs) == 2:
+        return lambda rng: rng.uniform(valeurs[0], valeurs[1])
+    if nom == 'exp' and len(valeurs) == 1:
+        return lambda rng: rng.expovariate(1.0 / valeurs[0]) if valeurs[0] > 0 else 0.0
+    if nom == 'lognormal' and len(valeurs) == 2:
+        mu = math.log(valeurs[0]) if valeurs[0] > 0 else 0.0
+        return lambda rng: rng.lognormvariate(mu, valeurs[1]) if valeurs[0] > 0 else 0.0
+    raise ValueError(f"Invalid distribution: {spec}")
+
+
+class _MockHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default backlog (5) refuses connections under high concurrency
+    request_queue_size = 256
+
+
+class MockMistralServer:
+    """
+    Local OpenAI/Mistral-compatible chat completions endpoint.
+
+    Each request waits for a base latency drawn from `latency`, plus
+    `ms_per_prompt_token` per estimated prompt token (4 characters) and
+    `ms_per_completion_token` per generated token, like a real model whose
+    time grows with the prompt and the answer. The answer length is drawn
+    around `completion_tokens` and capped by the request's max_tokens.
+    `rate_429` of the requests are rejected at once with a Retry-After
+    header, `rate_5xx` fail with a 503 after the base latency. Draws come
+    from a seeded random.Random, so a scenario injects the same error rate
+    on every run.
+
+    `rpm` / `tpm` emulate a provider quota: requests and tokens (prompt +
+    answer) are drawn from buckets holding one second of quota, and a
+    request that finds a bucket empty gets a 429 whose Retry-After is the
+    time needed to refill it.
+
+    respond() decides the outcome and the duration of one request without
+    sleeping; with a virtual `clock` it serves the simulation engine
+    (simulation.py) without any HTTP server.
+    """
+
+    def __init__(
+        self,
+        latency: str = 'lognormal:0.2:0.5',
+        ms_per_prompt_token: float = 0.0,
+        ms_per_completion_token: float = 0.0,
+        completion_tokens: int = 200,
+        rate_429: float = 0.0,
+        rate_5xx: float = 0.0,
+        retry_after: float = 1,
+        rpm: Optional[float] = None,
+        tpm: Optional[float] = None,
+        seed: int = 42,
+        host: str = '127.0.0.1',
+        port: int = 0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.latency = parse_distribution(latency)
+        self.ms_per_prompt_token = ms_per_prompt_token
+        self.ms_per_completion_token = ms_per_completion_token
+        self.completion_tokens = completion_tokens
+        self.rate_429 = rate_429
+        self.rate_5xx = rate_5xx
+        self.retry_after = retry_after
+        self.rpm = rpm
+        self.tpm = tpm
+        self.host = host
+        self.port = port
+        self.clock = clock
+
+        self.stats = {'requests': 0, 'ok': 0, 'throttled': 0, 'quota_exceeded': 0, 'server_errors': 0,
+                      'prompt_tokens': 0, 'completion_tokens': 0}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server: Optional[_MockHTTPServer] = None
+        # Quota buckets: [level, capacity, refill per second]
+        self._buckets = {}
+        for nom, limite in (('requests', rpm), ('tokens', tpm)):
+            if limite:
+                capacite = max(1.0, limite / 60.0)
+                self._buckets[nom] = [capacite, capacite, limite / 60.0]
+        self._refilled = clock()
+
+    def _quota(self, tokens: int) -> Optional[float]:
+        """Takes one request and `tokens` from the quota buckets; returns the wait when one is empty."""
+        with self._lock:
+            maintenant = self.clock()
+            ecoule = maintenant - self._refilled
+            self._refilled = maintenant
+            for bucket in self._buckets.values():
+                bucket[0] = min(bucket[1], bucket[0] + ecoule * bucket[2])
+            couts = {'requests': 1, 'tokens': tokens}
+            attente = 0.0
+            for nom, bucket in self._buckets.items():
+                # A request larger than the bucket passes once the bucket is full
+                besoin = min(couts[nom], bucket[1])
+                if bucket[0] < besoin:
+                    attente = max(attente, (besoin - bucket[0]) / bucket[2])
+            if attente:
+                return attente
+            for nom, bucket in self._buckets.items():
+                bucket[0] -= couts[nom]
+            return None
+
+    def _tirage(self, max_tokens: int):
+        """Outcome, base latency and answer length of one request."""
+        with self._lock:
+            self.stats['requests'] += 1
+            tirage = self._rng.random()
+            base = max(0.0, self.latency(self._rng))
+            longueur = max(1, int(self._rng.lognormvariate(math.log(max(1, self.completion_tokens)), 0.5)))
+        if tirage < self.rate_429:
+            return 429, base, 0
+        if tirage < self.rate_429 + self.rate_5xx:
+            return 503, base, 0
+        return 200, base, min(longueur, max_tokens or longueur)
+
+    def _compter(self, cle: str, valeur: int = 1) -> None:
+        with self._lock:
+            self.stats[cle] += valeur
+
+    def respond(self, prompt_tokens: int, max_tokens: int = 0) -> Tuple[int, float, int, Optional[float]]:
+        """
+        Outcome of one request, without waiting.
+
+        Returns:
+            tuple: (HTTP status, seconds before the answer, completion tokens,
+                Retry-After in seconds for a 429, else None)
+        """
+        status, base, completion = self._tirage(max_tokens)
+        attente = self._quota(prompt_tokens + completion) if status == 200 and self._buckets else None
+        if attente is not None:
+            self._compter('quota_exceeded')
+            return 429, 0.0, 0, float(math.ceil(attente))
+        if status == 429:
+            self._compter('throttled')
+            return 429, 0.0, 0, self.retry_after
+        if status == 503:
+            self._compter('server_errors')
+            return 503, base, 0, None
+        self._compter('ok')
+        self._compter('prompt_tokens', prompt_tokens)
+        self._compter('completion_tokens', completion)
+        return 200, base + (prompt_tokens * self.ms_per_prompt_token
+                            + completion * self.ms_per_completion_token) / 1000.0, completion, None
+
+    def start(self) -> str:
+        """Starts serving in a background thread. Returns the chat completions URL."""
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _repondre(self, status: int, body: bytes = b'', headers: Dict[str, str] = None) -> None:
+                self.send_response(status)
+                for cle, valeur in (headers or {}).items():
+                    self.send_header(cle, valeur)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                payload = json.loads(self.rfile.read(length) or b'{}')
+                caracteres = sum(len(str(m.get('content', ''))) for m in payload.get('messages', []))
+                prompt_tokens = max(1, caracteres // 4)
+                status, duree, completion, retry_after = mock.respond(
+                    prompt_tokens, int(payload.get('max_tokens') or 0)
+                )
+                if status == 429:
+                    self._repondre(429, b'{"message": "Requests rate limit exceeded"}',
+                                   {'Content-Type': 'application/json', 'Retry-After': f"{retry_after:g}"})
+                    return
+                time.sleep(duree)
+                if status == 503:
+                    self._repondre(503, b'{"message": "Service unavailable"}', {'Content-Type': 'application/json'})
+                    return
+
+                body = json.dumps({
+                    "id": f"mock-{mock.stats['requests']}",
+                    "object": "chat.completion",
+                    "model": payload.get('model', 'mock'),
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": "mock " * completion}}],
+                    "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion,
+                              "total_tokens": prompt_tokens + completion}
+                }).encode('utf-8')
+                self._repondre(200, body, {'Content-Type': 'application/json'})
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = _MockHTTPServer((self.host, self.port), Handler)
+        threading.Thread(target=self._server.serve_forever, name="mock-mistral", daemon=True).start()
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1/chat/completions"
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+def version_code() -> Dict[str, Any]:
+    """Commit of the benchmarked tree (and whether it has local changes)."""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=SCRIPT_DIR,
+                                capture_output=True, text=True, timeout=30).stdout.strip()
+        etat = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=SCRIPT_DIR,
+                              capture_output=True, text=True, timeout=30).stdout.strip()
+        return {'commit': commit or 'unknown', 'dirty': bool(etat)}
+    except (OSError, subprocess.SubprocessError):
+        return {'commit': 'unknown', 'dirty': False}
+
+
+def lancer_pipeline(commande: List[str], env: Dict[str, str], journal: Path):
+    """
+    Runs the pipeline and returns (exit code, wall time, peak RSS in MB).
+
+    The peak RSS comes from the child's own rusage (os.wait4), so it is the
+    pipeline's memory and not the benchmark's. None where wait4 is missing.
+    """
+    debut = time.perf_counter()
+    with open(journal, 'w', encoding='utf-8') as sortie:
+        proc = subprocess.Popen(commande, stdout=sortie, stderr=subprocess.STDOUT, env=env)
+        if hasattr(os, 'wait4'):
+            _, status, usage = os.wait4(proc.pid, 0)
+            proc.returncode = os.waitstatus_to_exitcode(status)
+            diviseur = 1024 * 1024 if sys.platform == 'darwin' else 1024
+            peak_rss = round(usage.ru_maxrss / diviseur, 1)
+        else:
+            proc.wait()
+            peak_rss = None
+    return proc.returncode, time.perf_counter() - debut, peak_rss
+
+
+def run_benchmark(
+    name: str,
+    scenario: Dict[str, Any],
+    extra_args: List[str] = None,
+    seed: int = 42,
+    workdir: str = None,
+    keep: bool = False
+) -> Dict[str, Any]:
+    """
+    Generates the scenario's corpus, starts the mock server and runs the
+    full --exec pipeline against it.
+
+    Returns:
+        dict: Benchmark record (parameters, stage timings, throughput,
+        latency percentiles, peak RSS, server counters)
+    """
+    extra_args = list(extra_args or [])
+    racine = Path(workdir or tempfile.mkdtemp(prefix="bench_"))
+    racine.mkdir(parents=True, exist_ok=True)
+
+    corpus = dict(scenario['corpus'])
+    formats = corpus.pop('formats')
+    fichiers = []
+    debut = time.perf_counter()
+    for format_name in formats:
+        bilan = generer_export(format_name, str(racine / "corpus" / format_name), seed=seed, **corpus)
+        fichiers.extend(bilan['files'])
+    generation = time.perf_counter() - debut
+
+    server = MockMistralServer(seed=seed, **scenario['server'])
+    url = server.start()
+    commande = [
+        sys.executable, str(MAIN_SCRIPT), '--exec', '--aiall',
+        '-F', *fichiers,
+        '-pt', "Summarize the security topics discussed in this conversation.",
+        '--api-url', url,
+        '--target-logs', str(racine / "logs"),
+        '--target-results', str(racine / "results"),
+        '--format', 'jsonl',
+        '--cache-mode', 'off',
+        *scenario['pipeline'], *extra_args
+    ]
+    env = dict(os.environ, MISTRAL_API_KEY=os.environ.get('MISTRAL_API_KEY', 'benchmark'))
+    try:
+        code, wall, peak_rss = lancer_pipeline(commande, env, racine / "pipeline.log")
+    finally:
+        server.stop()
+
+    metriques = {}
+    fichiers_metriques = sorted((racine / "results" / "runs").glob("run_*.metrics.json"))
+    if fichiers_metriques:
+        with open(fichiers_metriques[-1], 'r', encoding='utf-8') as f:
+            metriques = json.load(f)
+        metriques.pop('attempts', None)
+
+    parametres = {'corpus': scenario['corpus'], 'server': scenario['server'],
+                  'pipeline': scenario['pipeline'] + extra_args, 'seed': seed}
+    empreinte = hashlib.sha256(json.dumps(parametres, sort_keys=True).encode('utf-8')).hexdigest()[:12]
+
+    record = {
+        'scenario': name,
+        'config_id': empreinte,
+        'date': datetime.now().isoformat(timespec='seconds'),
+        **version_code(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'parameters': parametres,
+        'exit_code': code,
+        'generation_s': round(generation, 3),
+        'wall_s': round(wall, 3),
+        'peak_rss_mb': peak_rss,
+        'stages': metriques.get('stages', {}),
+        'requests': metriques.get('requests', {}),
+        'throughput': metriques.get('throughput', {}),
+        'latency': metriques.get('latency', {}),
+        'queue_wait': metriques.get('queue_wait', {}),
+        'server': dict(server.stats)
+    }
+    if keep:
+        record['workdir'] = str(racine)
+    else:
+        import shutil
+        shutil.rmtree(racine, ignore_errors=True)
+    return record
+
+
+def enregistrer(record: Dict[str, Any], results_file: Path) -> None:
+    results_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(results_file, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def _mediane(valeurs: List[float]) -> Optional[float]:
+    valeurs = sorted(v for v in valeurs if v is not None)
+    if not valeurs:
+        return None
+    milieu = len(valeurs) // 2
+    return valeurs[milieu] if len(valeurs) % 2 else (valeurs[milieu - 1] + valeurs[milieu]) / 2
+
+
+def comparer(results_file: Path, scenario: str = None) -> List[Dict[str, Any]]:
+    """
+    Medians per commit of every recorded configuration, oldest commit first.
+
+    Only records with the same config_id (same scenario parameters, seed and
+    extra pipeline arguments) are compared with each other.
+    """
+    if not results_file.exists():
+        return []
+    groupes: Dict[tuple, List[Dict[str, Any]]] = {}
+    with open(results_file, 'r', encoding='utf-8') as f:
+        for ligne in f:
+            if not ligne.strip():
+                continue
+            record = json.loads(ligne)
+            if scenario and record['scenario'] != scenario:
+                continue
+            cle = (record['scenario'], record['config_id'],
+                   record['commit'] + ('+dirty' if record.get('dirty') else ''))
+            groupes.setdefault(cle, []).append(record)
+
+    lignes = []
+    for (nom, config_id, commit), records in groupes.items():
+        lignes.append({
+            'scenario': nom,
+            'config_id': config_id,
+            'commit': commit,
+            'runs': len(records),
+            'wall_s': _mediane([r['wall_s'] for r in records]),
+            'requests_per_s': _mediane([r['throughput'].get('requests_per_s') for r in records]),
+            'p95_latency': _mediane([r['latency'].get('p95') for r in records]),
+            'p99_latency': _mediane([r['latency'].get('p99') for r in records]),
+            'peak_rss_mb': _mediane([r['peak_rss_mb'] for r in records])
+        })
+    return lignes
+
+
+def afficher_record(record: Dict[str, Any]) -> None:
+    requetes = record['requests']
+    print(f"✅ {record['scenario']} @ {record['commit']}{' (dirty)' if record['dirty'] else ''}: "
+          f"exit {record['exit_code']}, wall {record['wall_s']:.2f}s, peak RSS {record['peak_rss_mb']} MB")
+    if record['stages']:
+        print("   Stages: " + ", ".join(f"{nom} {duree:.2f}s" for nom, duree in record['stages'].items()))
+    if requetes:
+        print(f"   Requests: {requetes.get('success', 0)}/{requetes.get('final', 0)} ok, "
+              f"{requetes.get('retries', 0)} retries, {record['throughput'].get('requests_per_s', 0)} req/s, "
+              f"{record['throughput'].get('tokens_per_s', 0)} tok/s")
+    if record['latency']:
+        print(f"   Latency: p50 {record['latency'].get('p50')}s, p95 {record['latency'].get('p95')}s, "
+              f"p99 {record['latency'].get('p99')}s")
+    serveur = record['server']
+    print(f"   Mock server: {serveur['requests']} requests, {serveur['throttled']} x 429, "
+          f"{serveur['server_errors']} x 503"
+          + (f", {serveur['quota_exceeded']} over quota" if serveur.get('quota_exceeded') else ""))
+
+
+def afficher_comparaison(lignes: List[Dict[str, Any]]) -> None:
+    if not lignes:
+        print("⚠️  No benchmark results to compare")
+        return
+    reference: Dict[tuple, Dict[str, Any]] = {}
+    print(f"{'scenario':<10} {'config':<12} {'commit':<16} {'runs':>4} {'wall s':>8} {'req/s':>8} "
+          f"{'p95 s':>7} {'p99 s':>7} {'RSS MB':>7}  Δ req/s")
+    for ligne in lignes:
+        base = reference.setdefault((ligne['scenario'], ligne['config_id']), ligne)
+        delta = ""
+        if base is not ligne and base['requests_per_s'] and ligne['requests_per_s'] is not None:
+            delta = f"{(ligne['requests_per_s'] / base['requests_per_s'] - 1) * 100:+.1f}%"
+
+        def cellule(valeur, largeur, format_spec):
+            return f"{valeur:>{largeur}{format_spec}}" if valeur is not None else f"{'-':>{largeur}}"
+
+        print(f"{ligne['scenario']:<10} {ligne['config_id']:<12} {ligne['commit']:<16} {ligne['runs']:>4} "
+              f"{cellule(ligne['wall_s'], 8, '.2f')} {cellule(ligne['requests_per_s'], 8, '.2f')} "
+              f"{cellule(ligne['p95_latency'], 7, '.3f')} {cellule(ligne['p99_latency'], 7, '.3f')} "
+              f"{cellule(ligne['peak_rss_mb'], 7, '.1f')}  {delta}")
+
+
+def main() -> int:
+    argv = sys.argv[1:]
+    extra_args = []
+    if '--' in argv:
+        extra_args = argv[argv.index('--') + 1:]
+        argv = argv[:argv.index('--')]
+
+    parser = argparse.ArgumentParser(
+        description="Benchmarks the --exec pipeline against a local mock Mistral server "
+                    "(arguments after -- are passed to the pipeline)"
+    )
+    parser.add_argument('--scenario', choices=list(SCENARIOS), default='baseline')
+    parser.add_argument('--repeat', type=int, default=1, help='Runs of the scenario (medians are compared)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--conversations', type=int, help='Override the corpus size per format')
+    parser.add_argument('--latency', type=str, help='Base latency: fixed:S, uniform:A:B, exp:MEAN, lognormal:MEDIAN:SIGMA')
+    parser.add_argument('--ms-per-token', type=float, help='Generation time per completion token (ms)')
+    parser.add_argument('--rate-429', type=float, help='Share of requests rejected with 429')
+    parser.add_argument('--rate-5xx', type=float, help='Share of requests failing with 503')
+    parser.add_argument('--retry-after', type=float, help='Retry-After header of the 429 responses (seconds)')
+    parser.add_argument('--results-file', type=str, default=str(RESULTS_FILE))
+    parser.add_argument('--workdir', type=str, help='Directory for the corpus, logs and results (default: temporary)')
+    parser.add_argument('--keep', action='store_true', default=False, help='Keep the working directory')
+    parser.add_argument('--compare', action='store_true', default=False,
+                        help='Compare recorded results per commit instead of running')
+    args = parser.parse_args(argv)
+    results_file = Path(args.results_file)
+
+    if args.compare:
+        afficher_comparaison(comparer(results_file, args.scenario if '--scenario' in argv else None))
+        return 0
+
+    scenario = json.loads(json.dumps(SCENARIOS[args.scenario]))
+    if args.conversations is not None:
+        scenario['corpus']['conversations'] = args.conversations
+    surcharges = {'latency': args.latency, 'ms_per_completion_token': args.ms_per_token,
+                  'rate_429': args.rate_429, 'rate_5xx': args.rate_5xx, 'retry_after': args.retry_after}
+    scenario['server'].update({cle: valeur for cle, valeur in surcharges.items() if valeur is not None})
+    try:
+        parse_distribution(scenario['server']['latency'])
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+
+    code = 0
+    for numero in range(1, max(1, args.repeat) + 1):
+        print(f"🏁 Benchmark {args.scenario} ({numero}/{max(1, args.repeat)})...")
+        workdir = os.path.join(args.workdir, f"run_{numero}") if args.workdir else None
+        record = run_benchmark(args.scenario, scenario, extra_args, seed=args.seed,
+                               workdir=workdir, keep=args.keep or bool(args.workdir))
+        enregistrer(record, results_file)
+        afficher_record(record)
+        code = code or record['exit_code']
+
+    print(f"💾 Results appended to {results_file}")
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
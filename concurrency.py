@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Adaptive Concurrency Module
+AIMD controller for the number of in-flight API requests
+"""
+
+import time
+import asyncio
+import threading
+from collections import deque
+from typing import Callable, Dict, List, Any, Optional
+
+
+class AdaptiveConcurrency:
+    """
+    Additive-increase / multiplicative-decrease limit on in-flight requests.
+
+    - Every `limit` healthy responses, the limit grows by `increase`.
+    - A 429, a 5xx, a timeout or a p95 latency rising above
+      `latency_factor` x the best p95 seen so far cuts the limit by
+      `decrease_factor`.
+    - After a cut, further cuts are ignored until as many responses as the
+      new limit have come back, so a burst of 429s already in flight only
+      counts once.
+
+    Workers call acquire()/release() around each request (acquire_async()
+    from coroutines) and the executor reports every HTTP attempt through
+    record_response().
+    """
+
+    def __init__(
+        self,
+        initial: int,
+        minimum: int = 1,
+        maximum: int = 64,
+        increase: int = 1,
+        decrease_factor: float = 0.5,
+        latency_window: int = 50,
+        latency_factor: float = 1.5,
+        on_change: Optional[Callable[[int, int, str], None]] = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = min(max(initial, self.minimum), self.maximum)
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self.latency_factor = latency_factor
+        self.on_change = on_change
+        self.clock = clock
+
+        self.in_flight = 0
+        self.peak_limit = self.limit
+        self.changes: List[Dict[str, Any]] = []
+
+        self._latencies = deque(maxlen=latency_window)
+        self._best_p95 = None
+        self._healthy_streak = 0
+        self._cooldown = 0
+        self._condition = threading.Condition()
+
+    # ------------------------------------------------------------------
+    # Slots
+    # ------------------------------------------------------------------
+
+    def try_acquire(self) -> bool:
+        """Takes a slot if one is free under the current limit."""
+        with self._condition:
+            if self.in_flight < self.limit:
+                self.in_flight += 1
+                return True
+            return False
+
+    def acquire(self) -> None:
+        """Blocks the calling thread until a slot is free."""
+        with self._condition:
+            while self.in_flight >= self.limit:
+                self._condition.wait()
+            self.in_flight += 1
+
+    async def acquire_async(self, poll_interval: float = 0.01) -> None:
+        """Async counterpart of acquire()."""
+        while not self.try_acquire():
+            await asyncio.sleep(poll_interval)
+
+    def release(self) -> None:
+        with self._condition:
+            self.in_flight = max(0, self.in_flight - 1)
+            self._condition.notify()
+
+    # ------------------------------------------------------------------
+    # Feedback
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _percentile(values, pct: float) -> float:
+        ordered = sorted(values)
+        index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def record_response(self, status_code: Optional[int], latency: float) -> None:
+        """
+        Feeds one HTTP attempt to the controller.
+
+        Args:
+            status_code: HTTP status, or None for a timeout
+            latency: Seconds spent on the attempt
+        """
+        with self._condition:
+            if self._cooldown > 0:
+                self._cooldown -= 1
+
+            if status_code is None:
+                self._decrease("timeout", "timeout")
+                return
+            if status_code == 429:
+                self._decrease("HTTP 429", "HTTP 429")
+                return
+            if status_code >= 500:
+                self._decrease("HTTP 5xx", f"HTTP {status_code}")
+                return
+            if status_code >= 400:
+                return
+
+            self._latencies.append(latency)
+            if len(self._latencies) == self._latencies.maxlen:
+                p95 = self._percentile(self._latencies, 95)
+                if self._best_p95 is None or p95 < self._best_p95:
+                    self._best_p95 = p95
+                elif p95 > self._best_p95 * self.latency_factor:
+                    detail = f"p95 latency {p95:.2f}s > {self.latency_factor}x {self._best_p95:.2f}s"
+                    if self._decrease("p95 latency", detail):
+                        self._latencies.clear()
+                    return
+
+            self._healthy_streak += 1
+            if self._healthy_streak >= self.limit:
+                self._healthy_streak = 0
+                self._set_limit(self.limit + self.increase, "healthy", "healthy")
+
+    def _decrease(self, kind: str, reason: str) -> bool:
+        self._healthy_streak = 0
+        if self._cooldown > 0:
+            return False
+        changed = self._set_limit(int(self.limit * self.decrease_factor), kind, reason)
+        self._cooldown = self.limit
+        return changed
+
+    def _set_limit(self, new_limit: int, kind: str, reason: str) -> bool:
+        new_limit = min(max(new_limit, self.minimum), self.maximum)
+        if new_limit == self.limit:
+            return False
+
+        old_limit = self.limit
+        self.limit = new_limit
+        self.peak_limit = max(self.peak_limit, new_limit)
+        self.changes.append({
+            'time': self.clock(), 'from': old_limit, 'to': new_limit, 'kind': kind, 'reason': reason
+        })
+        self._condition.notify_all()
+
+        if self.on_change is not None:
+            self.on_change(old_limit, new_limit, reason)
+        return True
+
+    def summary(self) -> Dict[str, Any]:
+        """Final state for the run report."""
+        increases = sum(1 for c in self.changes if c['to'] > c['from'])
+        reasons: Dict[str, int] = {}
+        for change in self.changes:
+            if change['to'] < change['from']:
+                reasons[change['kind']] = reasons.get(change['kind'], 0) + 1
+
+        return {
+            'current': self.limit,
+            'peak': self.peak_limit,
+            'increases': increases,
+            'decreases': len(self.changes) - increases,
+            'decrease_reasons': reasons
+        }
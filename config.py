@@ -19,10 +19,52 @@ ENV_DIR = ".venv_analyse"
 # Limits and configurations
 MAX_TOKENS = 31000
 MAX_WORKERS = 5
+ADAPTIVE_MAX_WORKERS = 64
 
 # API Configuration
 API_URL = "https://api.mistral.ai/v1/chat/completions"
 MODEL = "pixtral-large-latest"
+CONNECT_TIMEOUT = 10.0
+READ_TIMEOUT = 60.0
+
+# Indicative API prices in USD per million tokens (input, output), used by --plan.
+# Check the provider's current price list before budgeting a job.
+MODEL_PRICING = {
+    "pixtral-large-latest": (2.0, 6.0),
+    "mistral-large-latest": (2.0, 6.0),
+    "mistral-medium-latest": (0.4, 2.0),
+    "mistral-small-latest": (0.1, 0.3),
+    "codestral-latest": (0.3, 0.9),
+    "open-mistral-nemo": (0.15, 0.15),
+    "ministral-8b-latest": (0.1, 0.1),
+    "ministral-3b-latest": (0.04, 0.04)
+}
+
+# --plan assumptions when no previous run is available
+PLAN_COMPLETION_TOKENS = 800
+PLAN_LATENCY_S = 10.0
+
+# --virtual server model (see benchmark.MockMistralServer): base latency
+# distribution plus time per prompt and per completion token
+VIRTUAL_LATENCY = 'lognormal:1.0:0.4'
+VIRTUAL_MS_PER_PROMPT_TOKEN = 0.02
+VIRTUAL_MS_PER_COMPLETION_TOKEN = 15.0
+
+# Rate limits (None = disabled, fixed --delay between requests is used instead)
+RATE_LIMIT_RPM = None
+RATE_LIMIT_TPM = None
+# Seconds of quota the rate limiter may send at once (providers often enforce quotas per second)
+RATE_LIMIT_BURST_S = 1.0
+
+# Response cache (stored in the results directory unless --cache-file is given)
+CACHE_FILE = "response_cache.sqlite"
+CACHE_TTL_DAYS = 30
+CACHE_MAX_MB = 500
+
+# Log file (written by a background thread, rotated past LOG_MAX_MB)
+LOG_LEVEL = "INFO"
+LOG_MAX_MB = 10
+LOG_BACKUPS = 3
 
 # Python Dependencies
 DEPENDANCES = ["requests", "tqdm", "tiktoken", "mistletoe", "anthropic", "python-dotenv"]
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Event Log Module
+Structured JSONL event stream with conversation and attempt ids
+"""
+
+import json
+import time
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Any
+
+from execution_engine import EngineObserver
+
+
+class EventLog(EngineObserver):
+    """
+    Writes one JSON object per line for every step of a conversation.
+
+    Every event carries the run id, a sequence number, a wall clock
+    timestamp and `t`, the seconds since the log was opened. Conversations
+    are identified by their stable task id and attempts by
+    "<task id>#<attempt>", so the stream can be grouped with jq, pandas or
+    DuckDB to get tail latency, retry amplification or cost per file.
+
+    Events:
+        run_started   run parameters
+        queued        one per conversation handed to the engine
+        started       an attempt was handed to a worker
+        retry         the attempt failed with a retryable error (reason, wait)
+        completed     an attempt finished (latency, queue wait, usage, error)
+        written       the final result reached the outputs
+        run_finished  totals
+    """
+
+    def __init__(self, path: str, run_id: str, flush_every: int = 100):
+        self.path = Path(path)
+        self.run_id = run_id
+        self.flush_every = max(1, flush_every)
+        self.count = 0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, 'a', encoding='utf-8')
+        self._origin = time.monotonic()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def path_for(directory: str, run_id: str) -> Path:
+        return Path(directory) / f"run_{run_id}.events.jsonl"
+
+    @staticmethod
+    def attempt_id(task_id: str, attempt: int) -> str:
+        return f"{task_id}#{attempt}"
+
+    def emit(self, event: str, **fields) -> None:
+        with self._lock:
+            if self._file.closed:
+                return
+            self.count += 1
+            record = {
+                'event': event,
+                'run_id': self.run_id,
+                'seq': self.count,
+                'ts': datetime.now().isoformat(timespec='milliseconds'),
+                't': round(time.monotonic() - self._origin, 4),
+                **fields
+            }
+            self._file.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+            if self.count % self.flush_every == 0:
+                self._file.flush()
+
+    # ----- Pipeline events -----
+
+    def queued(self, conversations: List[Dict[str, Any]]) -> None:
+        for conv in conversations:
+            self.emit('queued', task_id=conv.get('_task_id', ''),
+                      conversation_id=conv.get('conversation_id', ''),
+                      title=conv.get('title', conv.get('titre', '')), part=conv.get('partie', '1/1'),
+                      source_file=conv.get('_source_file', 'unknown'), messages=len(conv.get('messages', [])))
+
+    def written(self, result: Dict[str, Any], outputs: List[str]) -> None:
+        self.emit('written', task_id=result.get('_task_id', ''), success=bool(result.get('success')),
+                  outputs=outputs)
+
+    # ----- EngineObserver -----
+
+    def request_started(self, conv: Dict[str, Any], attempt: int) -> None:
+        task_id = conv.get('_task_id', '')
+        self.emit('started', task_id=task_id, attempt_id=self.attempt_id(task_id, attempt), attempt=attempt)
+
+    def retry_scheduled(self, conv: Dict[str, Any], attempt: int, delay: float, error: str) -> None:
+        task_id = conv.get('_task_id', '')
+        self.emit('retry', task_id=task_id, attempt_id=self.attempt_id(task_id, attempt), attempt=attempt,
+                  reason=error, wait=round(delay, 3))
+
+    def request_completed(
+        self,
+        conv: Dict[str, Any],
+        attempt: int,
+        result: Dict[str, Any],
+        timing: Dict[str, float],
+        final: bool
+    ) -> None:
+        task_id = conv.get('_task_id', '')
+        self.emit(
+            'completed',
+            task_id=task_id,
+            attempt_id=self.attempt_id(task_id, attempt),
+            attempt=attempt,
+            final=final,
+            success=bool(result.get('success')),
+            cached=bool(result.get('cached')),
+            model=result.get('model_used', ''),
+            source_file=result.get('_source_file', conv.get('_source_file', 'unknown')),
+            latency=round(timing.get('latency', 0.0), 4),
+            queue_wait=round(timing.get('wait', 0.0), 4),
+            usage=result.get('tokens_used') or {},
+            error=result.get('error') or None
+        )
+
+    def close(self) -> None:
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
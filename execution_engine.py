@@ -0,0 +1,427 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Execution Engine Module
+Dispatches conversations to the API with a thread pool or an asyncio loop
+"""
+
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, List, Any, Callable, Optional, Tuple
+
+from rate_limiter import RateLimiter
+from concurrency import AdaptiveConcurrency
+from retry_queue import RetryPolicy, DeferredRetryQueue, CircuitBreaker
+from response_cache import ResponseCache
+from prompt_executor import (
+    PromptExecutor, AsyncPromptExecutor,
+    process_conversation_with_prompt, process_conversation_with_prompt_async
+)
+
+# A unit of work: (conversation, attempt number starting at 1)
+WorkItem = Tuple[Dict[str, Any], int]
+
+
+def titre_conversation(conv: Dict[str, Any]) -> str:
+    return conv.get('titre', conv.get('title', 'Untitled'))
+
+
+class EngineObserver:
+    """
+    Hook interface to watch the engines request by request.
+
+    Called from the dispatching thread (thread engine) or from the event
+    loop (async engine), so implementations must be quick and must not
+    block. The base class ignores every event.
+    """
+
+    def request_started(self, conv: Dict[str, Any], attempt: int) -> None:
+        """An attempt was handed to a worker."""
+
+    def retry_scheduled(self, conv: Dict[str, Any], attempt: int, delay: float, error: str) -> None:
+        """Attempt `attempt` failed with a retryable error and was re-queued for `delay` seconds."""
+
+    def request_completed(
+        self,
+        conv: Dict[str, Any],
+        attempt: int,
+        result: Dict[str, Any],
+        timing: Dict[str, float],
+        final: bool
+    ) -> None:
+        """
+        One attempt finished.
+
+        Args:
+            conv: Conversation that was sent
+            attempt: Attempt number, starting at 1
+            result: Result dict of the attempt
+            timing: Seconds spent in 'prepare', 'wait' (dispatch queue,
+                concurrency slot and pacing) and 'latency' (API call)
+            final: False when the attempt failed and was re-queued
+        """
+
+
+class ObserverGroup(EngineObserver):
+    """Forwards every event to several observers (None entries are skipped)."""
+
+    def __init__(self, observers: List[Optional[EngineObserver]]):
+        self.observers = [o for o in observers if o is not None]
+
+    def request_started(self, conv: Dict[str, Any], attempt: int) -> None:
+        for observer in self.observers:
+            observer.request_started(conv, attempt)
+
+    def retry_scheduled(self, conv: Dict[str, Any], attempt: int, delay: float, error: str) -> None:
+        for observer in self.observers:
+            observer.retry_scheduled(conv, attempt, delay, error)
+
+    def request_completed(self, conv, attempt, result, timing, final) -> None:
+        for observer in self.observers:
+            observer.request_completed(conv, attempt, result, timing, final)
+
+
+def signaler_exception(
+    source: "WorkSource",
+    item: WorkItem,
+    e: Exception,
+    on_error: Callable[[str, Exception], None],
+    observer: Optional[EngineObserver]
+) -> None:
+    """
+    Reports an attempt whose worker raised: to on_error, and as a final
+    failure to the observer. The circuit breaker records it as a failed
+    outcome, otherwise a raising half-open probe would hold dispatch forever.
+    """
+    if source.circuit_breaker is not None:
+        source.circuit_breaker.record(False)
+    on_error(titre_conversation(item[0]), e)
+    if observer is not None:
+        observer.request_completed(
+            item[0], item[1], {'success': False, 'error': f"{type(e).__name__}: {e}"}, {}, True
+        )
+
+
+def terminer_tentative(
+    source: "WorkSource",
+    item: WorkItem,
+    result: Dict[str, Any],
+    dispatched: float,
+    started: float,
+    observer: Optional[EngineObserver]
+) -> bool:
+    """Removes the transient timing, reports the attempt and returns True when it is final."""
+    timing = result.pop('_timing', None) or {}
+    final = source.complete(item, result)
+    if observer is not None:
+        timing['wait'] = timing.get('wait', 0.0) + started - dispatched
+        observer.request_completed(item[0], item[1], result, timing, final)
+    return final
+
+
+class WorkSource:
+    """
+    Feeds the engines with fresh conversations and deferred retries.
+
+    Retries whose back-off has expired go first. While the circuit breaker
+    is open nothing is handed out, so dispatch pauses globally while the
+    requests already in flight complete.
+    """
+
+    def __init__(
+        self,
+        conversations: List[Dict[str, Any]],
+        retry_policy: RetryPolicy,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        on_retry: Optional[Callable[[str, int, float, str], None]] = None,
+        observer: Optional[EngineObserver] = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.retry_policy = retry_policy
+        self.circuit_breaker = circuit_breaker
+        self.on_retry = on_retry
+        self.observer = observer
+        self.retry_queue = DeferredRetryQueue(clock)
+        self.retries = 0
+
+        self._fresh = iter(conversations)
+        self._lookahead: Optional[WorkItem] = None
+        self._exhausted = False
+
+    def _peek_fresh(self) -> Optional[WorkItem]:
+        if self._lookahead is None and not self._exhausted:
+            conv = next(self._fresh, None)
+            if conv is None:
+                self._exhausted = True
+            else:
+                self._lookahead = (conv, 1)
+        return self._lookahead
+
+    def next_item(self) -> Tuple[Optional[WorkItem], Optional[float]]:
+        """
+        Returns (item, None) when something can be dispatched now, otherwise
+        (None, seconds to wait). (None, None) means nothing is left apart
+        from the requests already in flight.
+        """
+        retry_ready = self.retry_queue.next_ready_in() == 0
+        if not retry_ready and self._peek_fresh() is None:
+            return None, self.retry_queue.next_ready_in()
+
+        if self.circuit_breaker is not None and not self.circuit_breaker.allow():
+            return None, max(0.05, self.circuit_breaker.wait_time())
+
+        if retry_ready:
+            item = self.retry_queue.pop_ready()
+            if item is not None:
+                return item, None
+
+        item, self._lookahead = self._peek_fresh(), None
+        return item, None
+
+    def complete(self, item: WorkItem, result: Dict[str, Any]) -> bool:
+        """
+        Handles the result of one attempt.
+
+        Returns:
+            bool: True if the result is final, False if it was re-queued
+        """
+        retry = result.pop('_retry', None)
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.record(retry is None)
+
+        if retry is None:
+            return True
+
+        conv, attempt = item
+        if self.retry_policy.can_retry(attempt):
+            delay = self.retry_policy.delay(attempt, retry.get('retry_after'))
+            self.retry_queue.push((conv, attempt + 1), delay)
+            self.retries += 1
+            if self.on_retry is not None:
+                self.on_retry(titre_conversation(conv), attempt, delay, result.get('error', ''))
+            if self.observer is not None:
+                self.observer.retry_scheduled(conv, attempt, delay, result.get('error', ''))
+            return False
+
+        if attempt > 1:
+            result['error'] = f"{result.get('error', '')} (after {attempt} attempts)"
+        return True
+
+
+def run_thread_engine(
+    conversations: List[Dict[str, Any]],
+    prompt_template: str,
+    executor: Optional[PromptExecutor],
+    workers: int,
+    on_result: Callable[[Dict[str, Any]], None],
+    on_error: Callable[[str, Exception], None],
+    simulate: bool = False,
+    delay: float = 0.5,
+    rate_limiter: Optional[RateLimiter] = None,
+    concurrency: Optional[AdaptiveConcurrency] = None,
+    retry_policy: Optional[RetryPolicy] = None,
+    circuit_breaker: Optional[CircuitBreaker] = None,
+    on_retry: Optional[Callable[[str, int, float, str], None]] = None,
+    cache: Optional[ResponseCache] = None,
+    observer: Optional[EngineObserver] = None
+) -> None:
+    """
+    Processes conversations with one blocking API call per worker thread.
+
+    Retryable failures (429, 5xx, timeouts) are not slept on inside the
+    worker: they go to a deferred retry queue and the thread picks up fresh
+    work in the meantime.
+
+    Args:
+        conversations: Conversations ready to process (with 'messages')
+        prompt_template: Prompt template
+        executor: Sync executor (None in simulation mode)
+        workers: Number of worker threads
+        on_result: Called with each final result dict, from the calling thread
+        on_error: Called with (title, exception) when a worker raises
+        simulate: Simulation mode (no API call)
+        delay: Delay before each request (ignored when rate_limiter is set)
+        rate_limiter: Shared requests/tokens per minute limiter
+        concurrency: Adaptive in-flight limit; the pool is then sized to its maximum
+        retry_policy: Back-off policy for deferred retries (default: 3 attempts)
+        circuit_breaker: Pauses dispatch when the error rate spikes
+        on_retry: Called with (title, failed attempt, delay, error) when a retry is scheduled
+        cache: Response cache consulted before each API call
+        observer: Receives the timing of every attempt
+    """
+    source = WorkSource(conversations, retry_policy or RetryPolicy(), circuit_breaker, on_retry, observer)
+
+    if executor is not None:
+        executor.rate_limiter = rate_limiter
+        executor.cache = cache
+        executor.defer_retries = True
+        if concurrency is not None:
+            executor.response_callback = concurrency.record_response
+
+    def traiter(*args) -> Tuple[Dict[str, Any], float]:
+        # Returns the result and the time the attempt actually started
+        if concurrency is None:
+            started = time.monotonic()
+            return process_conversation_with_prompt(*args), started
+        concurrency.acquire()
+        started = time.monotonic()
+        try:
+            return process_conversation_with_prompt(*args), started
+        finally:
+            concurrency.release()
+
+    pool_size = concurrency.maximum if concurrency is not None else max(1, workers)
+
+    with ThreadPoolExecutor(max_workers=pool_size) as pool:
+        in_flight = {}
+
+        while True:
+            wait_hint = None
+            while len(in_flight) < pool_size:
+                item, wait_hint = source.next_item()
+                if item is None:
+                    break
+                conv = item[0]
+                dispatched = time.monotonic()
+                if observer is not None:
+                    observer.request_started(conv, item[1])
+                future = pool.submit(
+                    traiter,
+                    conv,
+                    conv.get('messages', []),
+                    prompt_template,
+                    executor,
+                    simulate,
+                    delay,
+                    rate_limiter
+                )
+                in_flight[future] = (item, dispatched)
+
+            if not in_flight:
+                if wait_hint is None:
+                    break
+                time.sleep(wait_hint)
+                continue
+
+            done, _ = wait(in_flight, timeout=wait_hint, return_when=FIRST_COMPLETED)
+            for future in done:
+                item, dispatched = in_flight.pop(future)
+                try:
+                    result, started = future.result()
+                except Exception as e:
+                    signaler_exception(source, item, e, on_error, observer)
+                    continue
+                if terminer_tentative(source, item, result, dispatched, started, observer):
+                    on_result(result)
+
+
+def run_async_engine(
+    conversations: List[Dict[str, Any]],
+    prompt_template: str,
+    executor_config: Optional[Dict[str, Any]],
+    workers: int,
+    on_result: Callable[[Dict[str, Any]], None],
+    on_error: Callable[[str, Exception], None],
+    simulate: bool = False,
+    delay: float = 0.5,
+    rate_limiter: Optional[RateLimiter] = None,
+    concurrency: Optional[AdaptiveConcurrency] = None,
+    retry_policy: Optional[RetryPolicy] = None,
+    circuit_breaker: Optional[CircuitBreaker] = None,
+    on_retry: Optional[Callable[[str, int, float, str], None]] = None,
+    cache: Optional[ResponseCache] = None,
+    observer: Optional[EngineObserver] = None
+) -> None:
+    """
+    Processes conversations from a single thread with an asyncio event loop.
+
+    Same callbacks, result dicts and deferred retries as run_thread_engine;
+    up to `workers` requests are in flight at once (or the adaptive limit
+    when `concurrency` is given).
+
+    Args:
+        executor_config: AsyncPromptExecutor keyword arguments (None in simulation mode)
+    """
+    source = WorkSource(conversations, retry_policy or RetryPolicy(), circuit_breaker, on_retry, observer)
+    asyncio.run(_run_async(
+        source, prompt_template, executor_config, workers,
+        on_result, on_error, simulate, delay, rate_limiter, concurrency, cache, observer
+    ))
+
+
+async def _run_async(
+    source: WorkSource,
+    prompt_template: str,
+    executor_config: Optional[Dict[str, Any]],
+    workers: int,
+    on_result: Callable[[Dict[str, Any]], None],
+    on_error: Callable[[str, Exception], None],
+    simulate: bool,
+    delay: float,
+    rate_limiter: Optional[RateLimiter],
+    concurrency: Optional[AdaptiveConcurrency],
+    cache: Optional[ResponseCache],
+    observer: Optional[EngineObserver]
+) -> None:
+    nb_workers = concurrency.maximum if concurrency is not None else max(1, workers)
+
+    executor = None
+    if executor_config is not None:
+        executor = AsyncPromptExecutor(**{'pool_size': nb_workers, **executor_config})
+        executor.rate_limiter = rate_limiter
+        executor.cache = cache
+        executor.defer_retries = True
+        if concurrency is not None:
+            executor.response_callback = concurrency.record_response
+        await executor.open()
+
+    # Fixed pool of worker coroutines sharing one work source: no task per conversation
+    etat = {'in_flight': 0}
+
+    async def worker() -> None:
+        while True:
+            item, wait_hint = source.next_item()
+            if item is None:
+                if wait_hint is None and etat['in_flight'] == 0:
+                    return
+                await asyncio.sleep(wait_hint if wait_hint is not None else 0.05)
+                continue
+
+            conv = item[0]
+            etat['in_flight'] += 1
+            dispatched = time.monotonic()
+            if observer is not None:
+                observer.request_started(conv, item[1])
+            if concurrency is not None:
+                await concurrency.acquire_async()
+            started = time.monotonic()
+            try:
+                result = await process_conversation_with_prompt_async(
+                    conv,
+                    conv.get('messages', []),
+                    prompt_template,
+                    executor,
+                    simulate,
+                    delay,
+                    rate_limiter
+                )
+            except Exception as e:
+                signaler_exception(source, item, e, on_error, observer)
+                continue
+            finally:
+                etat['in_flight'] -= 1
+                if concurrency is not None:
+                    concurrency.release()
+
+            # No await between the in-flight decrement and the re-queue below,
+            # so an idle worker cannot exit while a retry is being scheduled
+            if terminer_tentative(source, item, result, dispatched, started, observer):
+                on_result(result)
+
+    try:
+        await asyncio.gather(*(worker() for _ in range(nb_workers)))
+    finally:
+        if executor is not None:
+            await executor.close()
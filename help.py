@@ -50,17 +50,80 @@ export MISTRAL_API_KEY='your_api_key'
 ## DATA SOURCES
   --fichier, -F FILE  JSON file(s) (supports *.json)
   --recursive         Recursive search in subfolders
+  --no-merge          Keep every snapshot of overlapping exports
 
 ## EXECUTION OPTIONS
   --model, -m MODEL   Mistral model (default: {MODEL})
+  --api-url URL       Chat completions endpoint (default: Mistral API)
   --workers, -w N     Parallel workers (default: {MAX_WORKERS})
+  --adaptive          AIMD concurrency from --workers up to --max-workers (default: 64)
+  --max-retries N     Attempts per conversation on 429/5xx/timeout (default: 3)
+  --no-circuit-breaker  Keep dispatching when the error rate spikes
+  --rpm N / --tpm N   Requests/tokens per minute quota (replaces --delay)
+  --rate-burst S      Seconds of quota sent at once (default: 1)
+  --engine ENGINE     threads (default) or async (aiohttp, -w = in-flight requests)
+  --connect-timeout S Connection timeout in seconds (default: 10)
+  --read-timeout S    Read timeout in seconds (default: 60)
+  --cache-mode MODE   Response cache: read-write (default), read-only, refresh, off
+  --cache-file PATH   Cache database (default: <target-results>/response_cache.sqlite)
+  --cache-ttl DAYS    Cached response lifetime, 0 = never expires (default: 30)
+  --cache-max-mb N    Evict least recently used responses above N MB (default: 500)
   --simulate          Simulation mode (no API call)
+  --resume RUN_ID     Resume a run from its journal (<target-results>/runs/)
+  --retry-failed      With --resume: only redo the conversations that failed
+                      Stage timings and latencies: runs/run_<id>.metrics.json
+  --events [FILE]     JSONL event stream: queued, started, retry, completed, written
+                      (default: <target-results>/runs/run_<id>.events.jsonl)
+  --profile [MODE]    Per-stage profile in <target-logs>/profiles/: full (cProfile .pstats +
+                      tracemalloc peaks and top allocations) or sample (stack sampling, low overhead)
+  --metrics-port N    Prometheus /metrics endpoint during the run (--metrics-host, default 127.0.0.1)
+  --metrics-textfile F  Prometheus textfile, refreshed every --metrics-interval s (default: 15)
+  --chunk-tokens N    Split conversations above N tokens into as many parts as needed
+                      (default: 31000, in two halves)
+
+## AUTOTUNE
+  --autotune          Sweep workers, delay and chunk budget on a sample, within --rpm/--tpm
+  --autotune-sample N Conversations per trial (default: 30)
+  --autotune-mock     Tune against a local mock server enforcing --rpm/--tpm
+  --autotune-workers / --autotune-delays / --autotune-chunks  Candidate lists (1,2,4,8,...)
+  --autotune-save F   Save the recommended settings as a tuning profile
+  --tuning-profile F  Apply a saved profile (options given on the command line win)
+
+## PLAN
+  --plan              Requests, tokens, cost per model and duration of a run, no API call
+  --plan-completion N Answer tokens per request, also for --virtual (default: last run, else 800)
+  --plan-latency S    Seconds per request (default: last run, else 10)
+
+## VIRTUAL CLOCK
+  --virtual           Replay the run (workers, --rpm/--tpm, --adaptive, retries) on a virtual
+                      clock against a simulated API: projected timeline in seconds, no API call
+  --virtual-latency D Base latency distribution (default: lognormal:1.0:0.4)
+  --virtual-quota-rpm N / --virtual-quota-tpm N  Provider quota (default: --rpm / --tpm)
+  --virtual-5xx RATE  Share of requests failing with a 503 (default: 0)
+  --virtual-seed N    Seed of the simulated latencies and errors (default: 42)
+  --virtual-interval S  Virtual seconds between timeline points (default: 60)
+  --virtual-report F  Save the report and the full timeline as JSON
 
 ## FILE ORGANIZATION ⭐ NEW
   --target-logs DIR   Logs folder (default: ./)
+  --log-level LEVEL   DEBUG, INFO, WARNING or ERROR (default: INFO)
+  --log-max-mb N      Rotate the log file past N MB, keeping 3 backups (default: 10)
   --target-results    Results folder (default: ./)
-  --format FORMAT     csv, json, txt, markdown (default: csv)
+  --format FORMAT     csv, json, jsonl, txt, markdown, sqlite, parquet (default: csv)
+                      Several at once: --format csv,jsonl,markdown
+  --compress gzip|zstd Compress text formats while writing (.gz / .zst)
+  --rotate-rows N     New shard every N results (results_0001.jsonl, ... + manifest)
+  --rotate-mb N       New shard when the current one reaches N MB
+  --export SOURCE     Render --format from a run id, journal .jsonl or .sqlite store (no API call)
+  --export-run ID     With a .sqlite store: export only this run
   --output, -o FILE   Custom output filename
+  --results-store DB  SQLite store shared by every run (indexed, full-text search)
+
+## SEARCH
+  --query TEXT        Full-text search in --results-store responses ("" = filters only)
+  --query-prompt NAME / --query-model MODEL
+  --query-since DATE / --query-until DATE (YYYY-MM-DD)
+  --query-limit N     Maximum number of hits (default: 20)
 
 ## QUICK EXAMPLES
 
@@ -172,8 +235,9 @@ def afficher_aide_avancee_integree() -> None:
 
 ## File organization
   --target-logs DIR   Logs folder (auto-created if missing)
+  --log-level LEVEL   Lowest level logged / --log-max-mb N: log rotation size
   --target-results    Results folder (auto-created if missing)
-  --format FORMAT     csv | json | txt | markdown
+  --format FORMAT     csv | json | jsonl | txt | markdown | sqlite | parquet (comma-separated list)
   --output, -o FILE   Custom output filename
 
 ═══════════════════════════════════════════════════════════════════════════════
@@ -482,7 +546,7 @@ v3.0.0 (2025-10-26) - MAJOR REFACTORING
   ★ --help-adv: complete advanced help from help_advanced.txt
   ★ --target-logs: custom folder for logs
   ★ --target-results: custom folder for results
-  ★ --format: csv, json, txt, markdown
+  ★ --format: csv, json, jsonl, txt, markdown, sqlite, parquet
   ★ Automatic duplicate detection and elimination
   ★ Variables in prompts: {{{{CONVERSATION_TEXT}}}}, {{{{TITLE}}}}, etc.
   ★ SYSTEM/USER prompt support with ---SYSTEM--- / ---USER---
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Log Writer Module
+Queue-backed background log writer with batching, level filtering and rotation
+"""
+
+import os
+import sys
+import time
+import queue
+import atexit
+import signal
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+LOG_LEVELS = {'DEBUG': 10, 'INFO': 20, 'WARNING': 30, 'ERROR': 40}
+
+_STOP = object()
+
+
+class BackgroundLogWriter:
+    """
+    Writes log lines from a single background thread.
+
+    Callers only format the line and put it on a queue, so logging never
+    blocks a worker on file I/O. The writer thread keeps one handle open,
+    writes whatever is queued in one call and flushes every `batch_size`
+    lines or `interval` seconds. When the file grows past `max_bytes` it is
+    rotated to `<file>.1` ... `<file>.<backups>`.
+
+    The queue is drained by close(), which is registered with atexit and
+    called by the SIGTERM/SIGHUP handlers installed with install_signal_handlers().
+    """
+
+    def __init__(
+        self,
+        path: str,
+        level: str = 'INFO',
+        batch_size: int = 200,
+        interval: float = 1.0,
+        max_bytes: Optional[int] = None,
+        backups: int = 3
+    ):
+        if level.upper() not in LOG_LEVELS:
+            raise ValueError(f"Unknown log level: {level}")
+
+        self.path = Path(path)
+        self.level = level.upper()
+        self.threshold = LOG_LEVELS[self.level]
+        self.batch_size = max(1, batch_size)
+        self.interval = interval
+        self.max_bytes = max_bytes
+        self.backups = max(0, backups)
+
+        self.written = 0
+        self.rotations = 0
+        self.errors = 0
+
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._file = None
+        self._closed = False
+        self._close_lock = threading.Lock()
+
+    def start(self) -> "BackgroundLogWriter":
+        """Starts the writer thread and registers the exit hook."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+        return self
+
+    def enabled_for(self, niveau: str) -> bool:
+        return LOG_LEVELS.get(niveau.upper(), LOG_LEVELS['INFO']) >= self.threshold
+
+    def write(self, message: str, niveau: str = "INFO") -> None:
+        """Queues one line. Never blocks on I/O."""
+        if self._closed or not self.enabled_for(niveau):
+            return
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self._queue.put_nowait(f"[{timestamp}] [{niveau}] {message}\n")
+
+    def flush(self, timeout: Optional[float] = 5.0) -> bool:
+        """Waits until every line queued so far is on disk."""
+        if self._closed or self._thread is None:
+            return True
+        done = threading.Event()
+        self._queue.put_nowait(done)
+        return done.wait(timeout)
+
+    def close(self, timeout: Optional[float] = 5.0) -> None:
+        """Drains the queue and closes the file. Safe to call several times."""
+        with self._close_lock:
+            if self._closed:
+                return
+            self._closed = True
+        if self._thread is not None:
+            self._queue.put_nowait(_STOP)
+            self._thread.join(timeout)
+        try:
+            atexit.unregister(self.close)
+        except Exception:
+            pass
+
+    def _run(self) -> None:
+        last_flush = time.monotonic()
+        unflushed = 0
+
+        while True:
+            try:
+                item = self._queue.get(timeout=self.interval)
+            except queue.Empty:
+                item = None
+
+            lines = []
+            waiters = []
+            stop = False
+            while item is not None:
+                if item is _STOP:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    lines.append(item)
+                if stop or len(lines) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    item = None
+
+            if lines:
+                self._write_lines(lines)
+                unflushed += len(lines)
+
+            if unflushed and (stop or waiters or unflushed >= self.batch_size
+                              or time.monotonic() - last_flush >= self.interval):
+                self._flush_file()
+                unflushed = 0
+                last_flush = time.monotonic()
+
+            for waiter in waiters:
+                waiter.set()
+
+            if stop:
+                break
+
+        if self._file is not None:
+            try:
+                self._file.close()
+            except OSError:
+                pass
+            self._file = None
+
+    def _write_lines(self, lines) -> None:
+        try:
+            if self._file is None:
+                self._file = open(self.path, 'a', encoding='utf-8')
+            self._file.write(''.join(lines))
+            self.written += len(lines)
+            if self.max_bytes and self._file.tell() >= self.max_bytes:
+                self._rotate()
+        except Exception as e:
+            self._report_error(e)
+
+    def _flush_file(self) -> None:
+        try:
+            if self._file is not None:
+                self._file.flush()
+        except Exception as e:
+            self._report_error(e)
+
+    def _rotate(self) -> None:
+        self._file.close()
+        self._file = None
+        if self.backups:
+            for index in range(self.backups - 1, 0, -1):
+                source = Path(f"{self.path}.{index}")
+                if source.exists():
+                    os.replace(source, f"{self.path}.{index + 1}")
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            self.path.unlink()
+        self.rotations += 1
+
+    def _report_error(self, e: Exception) -> None:
+        # Reported once: a broken log file must not flood the console
+        self.errors += 1
+        if self.errors == 1:
+            print(f"⚠️ Log error: {e}")
+
+
+def install_signal_handlers(writer: BackgroundLogWriter) -> None:
+    """
+    Drains `writer` before the process dies on SIGTERM or SIGHUP.
+
+    A handler that was already installed is still called afterwards;
+    otherwise the process exits with the usual 128 + signal status, which
+    also runs the other atexit and finally clean-ups. Ignored signals (SIGHUP
+    under nohup) are left ignored, so the run survives them as before.
+    SIGINT already ends in KeyboardInterrupt and the atexit hook.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        return
+
+    for name in ('SIGTERM', 'SIGHUP'):
+        signum = getattr(signal, name, None)
+        if signum is None:
+            continue
+        previous = signal.getsignal(signum)
+        if previous is not signal.SIG_DFL and not callable(previous):
+            # SIG_IGN, or a handler not installed from Python
+            continue
+
+        def handler(received, frame, previous=previous):
+            writer.write(f"Signal {signal.Signals(received).name} received, stopping", "WARNING")
+            writer.close()
+            if callable(previous):
+                previous(received, frame)
+            else:
+                sys.exit(128 + received)
+
+        signal.signal(signum, handler)
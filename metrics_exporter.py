@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Metrics Exporter Module
+Prometheus text-format metrics over HTTP (/metrics) or a textfile-collector file
+"""
+
+import os
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Tuple
+
+from execution_engine import EngineObserver
+
+PREFIX = "prompt_executor"
+LATENCY_BUCKETS = [0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0]
+
+
+def classe_erreur(error: str) -> str:
+    """Coarse error class of a failed result, used as a metric label."""
+    if not error:
+        return "unknown"
+    match = re.match(r"HTTP (\d{3})", error)
+    if match:
+        code = int(match.group(1))
+        if code == 429:
+            return "rate_limited"
+        return "server_error" if code >= 500 else "client_error"
+    if error.startswith("Timeout"):
+        return "timeout"
+    if error.startswith("No messages"):
+        return "no_messages"
+    if "Connection" in error:
+        return "connection"
+    return "other"
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+class PrometheusExporter(EngineObserver):
+    """
+    Live counters of a run in the Prometheus text exposition format.
+
+    Fed by the execution engine through the EngineObserver hook (the same
+    attempts that RunMetrics records), plus the response cache statistics
+    when a cache is given. Serve it with serve() for a pull-based /metrics
+    endpoint, or write_textfile() / start_textfile() for node_exporter's
+    textfile collector.
+    """
+
+    def __init__(self, run_id: str = "", total: int = 0, cache=None, model: str = "unknown"):
+        self.run_id = run_id
+        self.total = total
+        self.cache = cache
+        # Failed attempts carry no model name: they are labelled with the configured one
+        self.model = model
+
+        self.in_flight = 0
+        self.finished = 0
+        self.retries = 0
+        self.outcomes: Dict[Tuple[str, str], int] = {}
+        self.failures: Dict[Tuple[str, str], int] = {}
+        self.tokens: Dict[Tuple[str, str], int] = {}
+        self.cached = 0
+        # model -> [bucket counts..., +Inf count], sum
+        self.latency: Dict[str, Tuple[List[int], float]] = {}
+
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._textfile: Optional[Path] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ----- EngineObserver -----
+
+    def request_started(self, conv: Dict[str, Any], attempt: int) -> None:
+        with self._lock:
+            self.in_flight += 1
+
+    def request_completed(
+        self,
+        conv: Dict[str, Any],
+        attempt: int,
+        result: Dict[str, Any],
+        timing: Dict[str, float],
+        final: bool
+    ) -> None:
+        model = result.get('model_used') or self.model
+        success = bool(result.get('success'))
+        tokens = result.get('tokens_used') or {}
+
+        with self._lock:
+            self.in_flight = max(0, self.in_flight - 1)
+            if final:
+                self.finished += 1
+                key = (model, 'success' if success else 'failed')
+                self.outcomes[key] = self.outcomes.get(key, 0) + 1
+            else:
+                self.retries += 1
+            if not success:
+                key = (model, classe_erreur(result.get('error', '')))
+                self.failures[key] = self.failures.get(key, 0) + 1
+
+            if result.get('cached'):
+                # Usage of the original call: no token went to the API this time
+                self.cached += 1
+                return
+
+            for kind in ('prompt', 'completion'):
+                count = int(tokens.get(f'{kind}_tokens', 0) or 0)
+                if count:
+                    self.tokens[(model, kind)] = self.tokens.get((model, kind), 0) + count
+
+            if 'latency' in timing:
+                buckets, total = self.latency.get(model, ([0] * (len(LATENCY_BUCKETS) + 1), 0.0))
+                for index, bound in enumerate(LATENCY_BUCKETS):
+                    if timing['latency'] <= bound:
+                        buckets[index] += 1
+                buckets[-1] += 1
+                self.latency[model] = (buckets, total + timing['latency'])
+
+    # ----- Rendering -----
+
+    def render(self) -> str:
+        """Current metrics in the Prometheus text format."""
+        lines: List[str] = []
+
+        def metric(name: str, kind: str, help_text: str, samples: List[Tuple[str, float]]) -> None:
+            lines.append(f"# HELP {PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {PREFIX}_{name} {kind}")
+            for suffix, value in samples:
+                lines.append(f"{PREFIX}_{name}{suffix} {value}")
+
+        with self._lock:
+            queue_depth = max(0, self.total - self.finished - self.in_flight)
+            metric("run_info", "gauge", "Run being processed.", [(_labels(run_id=self.run_id), 1)])
+            metric("tasks", "gauge", "Conversations to process in this run.", [("", self.total)])
+            metric("requests_in_flight", "gauge", "Attempts handed to a worker and not finished.",
+                   [("", self.in_flight)])
+            metric("queue_depth", "gauge", "Conversations waiting for dispatch, retries included.",
+                   [("", queue_depth)])
+            metric("requests_total", "counter", "Final results by model and outcome.",
+                   [(_labels(model=m, outcome=o), n) for (m, o), n in sorted(self.outcomes.items())])
+            metric("failures_total", "counter", "Failed attempts by model and error class.",
+                   [(_labels(model=m, error_class=c), n) for (m, c), n in sorted(self.failures.items())])
+            metric("retries_total", "counter", "Attempts re-queued for a deferred retry.", [("", self.retries)])
+            metric("tokens_total", "counter", "Tokens reported by the API, by model and type.",
+                   [(_labels(model=m, type=k), n) for (m, k), n in sorted(self.tokens.items())])
+
+            samples = []
+            for model, (buckets, total) in sorted(self.latency.items()):
+                for bound, count in zip(LATENCY_BUCKETS, buckets):
+                    samples.append((f"_bucket{_labels(model=model, le=bound)}", count))
+                samples.append((f"_bucket{_labels(model=model, le='+Inf')}", buckets[-1]))
+                samples.append((f"_sum{_labels(model=model)}", round(total, 6)))
+                samples.append((f"_count{_labels(model=model)}", buckets[-1]))
+            metric("request_latency_seconds", "histogram", "API call latency by model (cache hits excluded).",
+                   samples)
+            cached = self.cached
+
+        if self.cache is not None:
+            stats = self.cache.stats()
+            hits, misses = stats['hits'], stats['misses']
+        else:
+            hits, misses = cached, 0
+        lookups = hits + misses
+        metric("cache_hits_total", "counter", "Responses served from the response cache.", [("", hits)])
+        metric("cache_misses_total", "counter", "Response cache lookups that missed.", [("", misses)])
+        metric("cache_hit_ratio", "gauge", "Cache hits / lookups.",
+               [("", round(hits / lookups, 4) if lookups else 0.0)])
+
+        return "\n".join(lines) + "\n"
+
+    # ----- Outputs -----
+
+    def serve(self, host: str = "127.0.0.1", port: int = 9464) -> Tuple[str, int]:
+        """Starts a background HTTP server exposing /metrics. Returns the bound address."""
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = exporter.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True).start()
+        return self._server.server_address[:2]
+
+    def write_textfile(self, path: str) -> None:
+        """Writes the metrics atomically (the textfile collector must never read a partial file)."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.render())
+        os.replace(tmp_path, path)
+
+    def start_textfile(self, path: str, interval: float = 15.0) -> None:
+        """Refreshes the textfile every `interval` seconds from a background thread."""
+        self._textfile = Path(path)
+        self.write_textfile(path)
+
+        def refresh() -> None:
+            while not self._stop.wait(interval):
+                try:
+                    self.write_textfile(path)
+                except OSError as e:
+                    print(f"⚠️  Metrics textfile error: {e}")
+
+        self._thread = threading.Thread(target=refresh, name="metrics-textfile", daemon=True)
+        self._thread.start()
+
+    def close(self) -> None:
+        """Writes the final textfile and stops the HTTP server."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._textfile is not None:
+            self.write_textfile(str(self._textfile))
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
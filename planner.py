@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Planner Module
+Dry-run estimates of a job: requests, tokens, cost and wall time (--plan)
+"""
+
+import json
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Tuple
+
+
+def build_plan(
+    conversations: List[Dict[str, Any]],
+    template_tokens: int,
+    completion_tokens: int
+) -> Dict[str, Any]:
+    """
+    Totals of the conversations that would be sent, per format and per file.
+
+    Args:
+        conversations: Conversations after splitting and filtering (one request each)
+        template_tokens: Tokens added by the prompt template to every request
+        completion_tokens: Expected answer tokens per request
+
+    Returns:
+        dict: {'formats': {...}, 'files': {...}, 'totals': {...}, 'template_tokens', 'completion_tokens'}
+    """
+    def ligne_vide() -> Dict[str, int]:
+        return {'conversations': 0, 'requests': 0, 'split_parts': 0, 'messages': 0, 'prompt_tokens': 0}
+
+    formats: Dict[str, Dict[str, int]] = {}
+    fichiers: Dict[str, Dict[str, Any]] = {}
+    totaux = ligne_vide()
+
+    for conv in conversations:
+        partie = conv.get('partie', '1/1')
+        tokens = (conv.get('token_count') or 0) + template_tokens
+        fichier = fichiers.setdefault(conv.get('_source_file', 'unknown'),
+                                      {'format': conv.get('_format', 'unknown'), **ligne_vide()})
+        for ligne in (formats.setdefault(conv.get('_format', 'unknown'), ligne_vide()), fichier, totaux):
+            # A split conversation counts once, on its first part
+            ligne['conversations'] += partie.startswith('1/')
+            ligne['requests'] += 1
+            ligne['split_parts'] += partie != '1/1'
+            ligne['messages'] += len(conv.get('messages', []))
+            ligne['prompt_tokens'] += tokens
+
+    totaux['completion_tokens'] = totaux['requests'] * completion_tokens
+    return {
+        'formats': formats,
+        'files': fichiers,
+        'totals': totaux,
+        'template_tokens': template_tokens,
+        'completion_tokens': completion_tokens
+    }
+
+
+def projected_costs(
+    prompt_tokens: int,
+    completion_tokens: int,
+    pricing: Dict[str, Tuple[float, float]]
+) -> List[Dict[str, Any]]:
+    """Cost of the job for every priced model (USD, prices per million tokens), cheapest first."""
+    couts = []
+    for model, (prix_entree, prix_sortie) in pricing.items():
+        entree = prompt_tokens / 1_000_000 * prix_entree
+        sortie = completion_tokens / 1_000_000 * prix_sortie
+        couts.append({'model': model, 'input': round(entree, 4), 'output': round(sortie, 4),
+                      'total': round(entree + sortie, 4)})
+    return sorted(couts, key=lambda c: c['total'])
+
+
+def estimate_duration(
+    requests: int,
+    prompt_tokens: int,
+    reserved_tokens: int,
+    workers: int,
+    latency: float,
+    delay: float = 0.0,
+    rpm: Optional[float] = None,
+    tpm: Optional[float] = None
+) -> Dict[str, Any]:
+    """
+    Wall time of the dispatch stage, bounded by concurrency and by the quotas.
+
+    Without quotas each worker sleeps `delay` before each request; with
+    quotas the shared rate limiter replaces the delay and the tokens bucket
+    is charged the prompt estimate plus `reserved_tokens` (max_tokens) per
+    request, as the limiter does.
+
+    Returns:
+        dict: {'seconds', 'bound' (the limiting factor), 'bounds': {name: seconds}}
+    """
+    limite = bool(rpm or tpm)
+    bornes = {'concurrency': requests * (latency + (0.0 if limite else delay)) / max(1, workers)}
+    if rpm:
+        bornes['rpm'] = requests / rpm * 60.0
+    if tpm:
+        bornes['tpm'] = (prompt_tokens + requests * reserved_tokens) / tpm * 60.0
+    borne = max(bornes, key=bornes.get)
+    return {'seconds': round(bornes[borne], 1), 'bound': borne,
+            'bounds': {nom: round(valeur, 1) for nom, valeur in bornes.items()}}
+
+
+def previous_run_stats(runs_dir: str) -> Optional[Dict[str, Any]]:
+    """
+    Median latency and answer tokens per request of the latest run metrics
+    in `runs_dir` (None when there is no usable run).
+
+    Simulated runs (--simulate, or answers from the 'simulated' model) and
+    runs without any completion token are skipped: their latency and answer
+    size say nothing about the API.
+    """
+    fichiers = sorted(Path(runs_dir).glob("run_*.metrics.json"), key=lambda p: p.stat().st_mtime)
+    for chemin in reversed(fichiers):
+        try:
+            with open(chemin, 'r', encoding='utf-8') as f:
+                resume = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if resume.get('simulated'):
+            continue
+        appels = [a for a in resume.get('attempts', []) if a.get('success') and not a.get('cached')]
+        if not appels or not resume.get('latency', {}).get('p50'):
+            continue
+        if any(a.get('model') == 'simulated' for a in appels):
+            continue
+        completion = round(sum(a.get('completion_tokens', 0) for a in appels) / len(appels))
+        if completion <= 0:
+            continue
+        return {
+            'run_id': resume.get('run_id', chemin.stem),
+            'latency': resume['latency']['p50'],
+            'completion_tokens': completion
+        }
+    return None
+
+
+def _usd(montant: float) -> str:
+    return f"${montant:,.2f}" if montant >= 1 else f"${montant:.4f}"
+
+
+def format_plan(
+    plan: Dict[str, Any],
+    costs: List[Dict[str, Any]],
+    duration: Dict[str, Any],
+    model: str,
+    max_files: int = 20
+) -> List[str]:
+    """Console report of a plan."""
+    from progress import format_duree
+
+    totaux = plan['totals']
+    lignes = ["📐 Plan (no API call)", "", "   Per format:"]
+    for nom, ligne in sorted(plan['formats'].items()):
+        lignes.append(f"     {nom:<10} {ligne['conversations']:>7,} conv  {ligne['requests']:>7,} requests  "
+                      f"({ligne['split_parts']:,} split parts)  {ligne['prompt_tokens']:>12,} prompt tokens")
+
+    fichiers = sorted(plan['files'].items(), key=lambda item: item[1]['prompt_tokens'], reverse=True)
+    lignes.append("")
+    lignes.append(f"   Per file ({len(fichiers)}, largest first):")
+    for nom, ligne in fichiers[:max_files]:
+        lignes.append(f"     {nom[:40]:<40} {ligne['format']:<8} {ligne['conversations']:>6,} conv  "
+                      f"{ligne['requests']:>6,} req  {ligne['prompt_tokens']:>11,} tok")
+    if len(fichiers) > max_files:
+        lignes.append(f"     ... {len(fichiers) - max_files} more file(s)")
+
+    lignes.append("")
+    lignes.append(f"   Requests after splitting: {totaux['requests']:,} "
+                  f"({totaux['conversations']:,} conversations, {totaux['split_parts']:,} split parts)")
+    lignes.append(f"   Prompt tokens: {totaux['prompt_tokens']:,} "
+                  f"(template: {plan['template_tokens']:,} per request)")
+    lignes.append(f"   Completion tokens (est.): {totaux['completion_tokens']:,} "
+                  f"({plan['completion_tokens']:,} per request)")
+
+    lignes.append("")
+    lignes.append("   Projected cost (USD, indicative prices):")
+    for cout in costs:
+        marque = "👉" if cout['model'] == model else "  "
+        lignes.append(f"   {marque} {cout['model']:<24} {_usd(cout['total']):>11}  "
+                      f"(in {_usd(cout['input'])} + out {_usd(cout['output'])})")
+    if not any(cout['model'] == model for cout in costs):
+        lignes.append(f"   ⚠️  No price for {model} (MODEL_PRICING in config.py)")
+
+    lignes.append("")
+    bornes = ", ".join(f"{nom} {format_duree(valeur)}" for nom, valeur in duration['bounds'].items())
+    lignes.append(f"   Estimated duration: {format_duree(duration['seconds'])} "
+                  f"(bound by {duration['bound']}; {bornes})")
+    return lignes
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Profiler Module
+Per-stage cProfile / tracemalloc profiling, or low-overhead stack sampling
+"""
+
+import os
+import sys
+import json
+import time
+import cProfile
+import threading
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Any, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+PROFILE_MODES = ['full', 'sample']
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident memory of the process so far, in MB (None where unavailable)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # KB on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+class StageProfiler:
+    """
+    Profiles the pipeline stage by stage.
+
+    full    Each stage runs under its own cProfile.Profile (dumped as
+            .pstats) and tracemalloc: the peak of traced memory during the
+            stage and the allocation sites that grew the most between its
+            start and end snapshots. cProfile only sees the thread that runs
+            the stage, so with the thread engine the dispatch profile shows
+            the dispatcher; the async engine runs in that thread.
+    sample  A background thread records the stacks of every thread every
+            `interval` seconds and attributes them to the current stage
+            (collapsed stacks, ready for flamegraph tools). Cheap enough for
+            production runs; memory is reported as the process peak RSS.
+    """
+
+    def __init__(self, mode: str = 'full', top: int = 10, interval: float = 0.01):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode: {mode}")
+
+        self.mode = mode
+        self.top = top
+        self.interval = interval
+        self.stages: Dict[str, Dict[str, Any]] = {}
+
+        self._profiles: Dict[str, cProfile.Profile] = {}
+        self._samples: Dict[str, Counter] = {}
+        self._current: Optional[str] = None
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+
+        if mode == 'full':
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(10)
+        else:
+            self._sampler = threading.Thread(target=self._sample, name="profiler-sampler", daemon=True)
+            self._sampler.start()
+
+    @contextmanager
+    def stage(self, name: str):
+        debut = time.perf_counter()
+        self._current = name
+        if self.mode == 'full':
+            avant = self._snapshot()
+            tracemalloc.reset_peak()
+            profile = self._profiles.setdefault(name, cProfile.Profile())
+            profile.enable()
+        try:
+            yield
+        finally:
+            stats = self.stages.setdefault(name, {'seconds': 0.0})
+            if self.mode == 'full':
+                profile.disable()
+                _, peak = tracemalloc.get_traced_memory()
+                apres = self._snapshot()
+                stats['peak_traced_mb'] = round(max(stats.get('peak_traced_mb', 0.0), peak / (1024 * 1024)), 2)
+                stats['top_allocations'] = [
+                    {
+                        'site': f"{diff.traceback[0].filename}:{diff.traceback[0].lineno}",
+                        'size_kb': round(diff.size_diff / 1024, 1),
+                        'count': diff.count_diff
+                    }
+                    for diff in apres.compare_to(avant, 'lineno')[:self.top]
+                    if diff.size_diff > 0
+                ]
+            stats['seconds'] = round(stats['seconds'] + time.perf_counter() - debut, 3)
+            stats['peak_rss_mb'] = peak_rss_mb()
+            self._current = None
+
+    @staticmethod
+    def _snapshot() -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__)
+        ))
+
+    def _sample(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            stage = self._current
+            if stage is None:
+                continue
+            counter = self._samples.setdefault(stage, Counter())
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                pile = []
+                while frame is not None:
+                    code = frame.f_code
+                    pile.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                counter[";".join(reversed(pile))] += 1
+
+    def close(self) -> None:
+        """Stops sampling / allocation tracing."""
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+            self._sampler = None
+        if self.mode == 'full' and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def save(self, directory: str, run_id: str) -> List[Path]:
+        """
+        Writes the profiles of every stage and a JSON summary.
+
+        Returns:
+            list: Written files (summary first)
+        """
+        self.close()
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        fichiers = []
+
+        for index, name in enumerate(self.stages, 1):
+            if name in self._profiles:
+                chemin = directory / f"profile_{run_id}_{index:02d}_{name}.pstats"
+                self._profiles[name].dump_stats(str(chemin))
+                self.stages[name]['pstats'] = chemin.name
+                fichiers.append(chemin)
+            if self._samples.get(name):
+                chemin = directory / f"profile_{run_id}_{index:02d}_{name}.folded"
+                with open(chemin, 'w', encoding='utf-8') as f:
+                    for pile, count in self._samples[name].most_common():
+                        f.write(f"{pile} {count}\n")
+                self.stages[name]['samples'] = sum(self._samples[name].values())
+                self.stages[name]['folded'] = chemin.name
+                fichiers.append(chemin)
+
+        resume = directory / f"profile_{run_id}.json"
+        with open(resume, 'w', encoding='utf-8') as f:
+            json.dump({'run_id': run_id, 'mode': self.mode, 'stages': self.stages}, f, ensure_ascii=False, indent=2)
+        return [resume] + fichiers
+
+    def summary_lines(self, sites: int = 3) -> List[str]:
+        """Console lines: memory per stage and its main allocation sites."""
+        lines = []
+        for name, stats in self.stages.items():
+            memoire = (f"peak traced {stats['peak_traced_mb']} MB" if 'peak_traced_mb' in stats
+                       else f"{stats.get('samples', 0)} samples")
+            if stats.get('peak_rss_mb') is not None:
+                memoire += f", RSS {stats['peak_rss_mb']} MB"
+            lines.append(f"   {name}: {stats['seconds']:.2f}s, {memoire}")
+            for allocation in stats.get('top_allocations', [])[:sites]:
+                lines.append(f"      +{allocation['size_kb']} KB  {allocation['site']}")
+        return lines
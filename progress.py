@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Progress Module
+Token-weighted progress bar and ETA fed by the execution engine
+"""
+
+import time
+import threading
+from collections import deque
+from typing import Dict, List, Any, Callable, Optional
+
+from execution_engine import EngineObserver
+
+
+def format_duree(secondes: Optional[float]) -> str:
+    """'1h02m', '3m05s', '12s' or '?' for an unknown duration."""
+    if secondes is None:
+        return "?"
+    secondes = int(secondes)
+    if secondes >= 3600:
+        return f"{secondes // 3600}h{secondes % 3600 // 60:02d}m"
+    if secondes >= 60:
+        return f"{secondes // 60}m{secondes % 60:02d}s"
+    return f"{secondes}s"
+
+
+class TokenProgress(EngineObserver):
+    """
+    Progress measured in estimated prompt tokens instead of conversations.
+
+    A 30k-token part and a 200-token chat do not take the same time, so the
+    bar advances by each conversation's 'token_count' (computed when it was
+    split) when its final result arrives. The rate used for the ETA is the
+    number of tokens completed over the last `window` seconds. The postfix
+    shows conversations done, requests in flight and conversations waiting
+    for a deferred retry.
+
+    With a tqdm class the bar is drawn by tqdm (unit 'tok'); without it a
+    line is printed every `print_every` conversations.
+    """
+
+    def __init__(
+        self,
+        conversations: List[Dict[str, Any]],
+        tqdm_class=None,
+        window: float = 60.0,
+        print_every: int = 10,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.conversations = len(conversations)
+        self.total_tokens = sum(max(1, conv.get('token_count') or 0) for conv in conversations)
+        self.window = window
+        self.print_every = print_every
+        self.clock = clock
+
+        self.done = 0
+        self.done_tokens = 0
+        self.in_flight = 0
+        self.retry_waiting = 0
+
+        self._started = clock()
+        self._recent: deque = deque()
+        self._lock = threading.Lock()
+        self._bar = None
+        if tqdm_class is not None:
+            self._bar = tqdm_class(total=self.total_tokens, desc="Analysis", unit="tok",
+                                   unit_scale=True, smoothing=0.1)
+
+    # ----- EngineObserver -----
+
+    def request_started(self, conv: Dict[str, Any], attempt: int) -> None:
+        with self._lock:
+            self.in_flight += 1
+            if attempt > 1:
+                self.retry_waiting = max(0, self.retry_waiting - 1)
+        self._render(0)
+
+    def retry_scheduled(self, conv: Dict[str, Any], attempt: int, delay: float, error: str) -> None:
+        with self._lock:
+            self.retry_waiting += 1
+
+    def request_completed(
+        self,
+        conv: Dict[str, Any],
+        attempt: int,
+        result: Dict[str, Any],
+        timing: Dict[str, float],
+        final: bool
+    ) -> None:
+        tokens = max(1, conv.get('token_count') or 0) if final else 0
+        with self._lock:
+            self.in_flight = max(0, self.in_flight - 1)
+            if final:
+                self.done += 1
+                self.done_tokens += tokens
+                self._recent.append((self.clock(), tokens))
+        self._render(tokens)
+
+    # ----- Rate and ETA -----
+
+    def rate(self) -> float:
+        """Tokens per second over the last `window` seconds (whole run at the start)."""
+        now = self.clock()
+        with self._lock:
+            while self._recent and self._recent[0][0] < now - self.window:
+                self._recent.popleft()
+            recent = sum(tokens for _, tokens in self._recent)
+        span = min(self.window, now - self._started)
+        return recent / span if span > 0 else 0.0
+
+    def eta(self) -> Optional[float]:
+        rate = self.rate()
+        if rate <= 0:
+            return None
+        return max(0, self.total_tokens - self.done_tokens) / rate
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            'conversations': self.conversations,
+            'done': self.done,
+            'total_tokens': self.total_tokens,
+            'done_tokens': self.done_tokens,
+            'in_flight': self.in_flight,
+            'retry_waiting': self.retry_waiting,
+            'tokens_per_s': round(self.rate(), 1),
+            'eta': self.eta()
+        }
+
+    def _render(self, tokens: int) -> None:
+        etat = f"{self.done}/{self.conversations} conv, {self.in_flight} in flight"
+        if self.retry_waiting:
+            etat += f", {self.retry_waiting} awaiting retry"
+
+        if self._bar is not None:
+            self._bar.set_postfix_str(etat, refresh=False)
+            if tokens:
+                self._bar.update(tokens)
+            return
+
+        if tokens and (self.done % self.print_every == 0 or self.done == self.conversations):
+            pourcentage = self.done_tokens / self.total_tokens * 100 if self.total_tokens else 100.0
+            print(f"   Progress: {pourcentage:.0f}% of {self.total_tokens:,} tokens ({etat}), "
+                  f"{self.rate():.0f} tok/s, ETA {format_duree(self.eta())}")
+
+    def close(self) -> None:
+        if self._bar is not None:
+            self._bar.close()
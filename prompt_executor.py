@@ -7,11 +7,25 @@ Handles loading, formatting and execution of prompts via Mistral API
 """
 
 import os
+import re
 import time
 import random
+import asyncio
 import requests
-from typing import Dict, List, Any, Optional
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+from typing import Dict, List, Any, Optional, Tuple
 from pathlib import Path
+from functools import lru_cache
+
+
+# Completion budget sent with each request (also reserved in the rate limiter)
+DEFAULT_MAX_TOKENS = 16000
 
 
 def ensure_directory(directory: str) -> Path:
@@ -30,11 +44,38 @@ def ensure_directory(directory: str) -> Path:
 
 
 class PromptLoader:
-    """Loads and manages prompt files."""
+    """
+    Loads and manages prompt files.
+
+    Each file read is kept with its compiled template and reloaded only
+    when its modification time or size changes.
+    """
 
     def __init__(self, prompt_dir: str = "prompts"):
         self.prompt_dir = Path(prompt_dir)
         self.prompt_dir.mkdir(exist_ok=True)
+        # path -> ((mtime_ns, size), text, CompiledTemplate)
+        self._cache: Dict[str, tuple] = {}
+
+    def _read(self, path: Path) -> Tuple[str, "CompiledTemplate"]:
+        """Text and compiled template of a prompt file (cached until the file changes)."""
+        stat = path.stat()
+        signature = (stat.st_mtime_ns, stat.st_size)
+        cached = self._cache.get(str(path))
+        if cached is not None and cached[0] == signature:
+            return cached[1], cached[2]
+
+        with open(path, 'r', encoding='utf-8') as f:
+            text = f.read()
+        compiled = compile_template(text)
+        self._cache[str(path)] = (signature, text, compiled)
+        return text, compiled
+
+    def _prompt_path(self, prompt_name: str) -> Path:
+        # Automatically add prefix if missing
+        if not prompt_name.startswith("prompt_"):
+            prompt_name = f"prompt_{prompt_name}"
+        return self.prompt_dir / f"{prompt_name}.txt"
 
     def list_prompts(self) -> List[str]:
         """Lists all available prompts."""
@@ -50,56 +91,102 @@ class PromptLoader:
 
     def load_prompt(self, prompt_name: str) -> Optional[str]:
         """Loads a prompt file."""
-        # Automatically add prefix if missing
-        if not prompt_name.startswith("prompt_"):
-            prompt_name = f"prompt_{prompt_name}"
+        prompt_path = self._prompt_path(prompt_name)
+
+        if not prompt_path.exists():
+            return None
+
+        try:
+            return self._read(prompt_path)[0]
+        except Exception as e:
+            print(f"❌ Error reading prompt {prompt_path.stem}: {e}")
+            return None
 
-        prompt_path = self.prompt_dir / f"{prompt_name}.txt"
+    def load_template(self, prompt_name: str) -> Optional["CompiledTemplate"]:
+        """Loads a prompt file as a compiled template."""
+        prompt_path = self._prompt_path(prompt_name)
 
         if not prompt_path.exists():
             return None
 
         try:
-            with open(prompt_path, 'r', encoding='utf-8') as f:
-                return f.read()
+            return self._read(prompt_path)[1]
         except Exception as e:
-            print(f"❌ Error reading prompt {prompt_name}: {e}")
+            print(f"❌ Error reading prompt {prompt_path.stem}: {e}")
             return None
 
     def load_prompt_from_file(self, file_path: str) -> Optional[str]:
         """Loads a prompt from a file path."""
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return f.read()
+            return self._read(Path(file_path))[0]
         except Exception as e:
             print(f"❌ Error reading {file_path}: {e}")
             return None
 
 
-class PromptFormatter:
-    """Formats prompts with conversation variables."""
+class CompiledTemplate:
+    """
+    Prompt template parsed once into literal segments and placeholders.
+
+    Available variables:
+    - {CONVERSATION_TEXT}: Complete text
+    - {TITLE}: Title
+    - {MESSAGE_COUNT}: Number of messages
+    - {TOKEN_COUNT}: Number of tokens
+    - {FORMAT}: Source format
+    - {FILE}: Source file
+
+    The SYSTEM/USER split is resolved on the template itself, so rendering
+    a conversation is one join per part, and text coming from the
+    conversation is never substituted again nor taken for a marker. The
+    token cost of the template is counted once.
+
+    Syntax of the split:
+    ---SYSTEM---
+    System instructions
+    ---USER---
+    User prompt
+    """
 
-    @staticmethod
-    def format_prompt(
-        template: str,
-        conversation: Dict[str, Any],
-        messages: List[str]
-    ) -> str:
-        """
-        Replaces variables in the prompt template.
-
-        Available variables:
-        - {CONVERSATION_TEXT}: Complete text
-        - {TITLE}: Title
-        - {MESSAGE_COUNT}: Number of messages
-        - {TOKEN_COUNT}: Number of tokens
-        - {FORMAT}: Source format
-        - {FILE}: Source file
-        """
-        conversation_text = "\n\n".join(messages)
+    VARIABLES = ('CONVERSATION_TEXT', 'TITLE', 'MESSAGE_COUNT', 'TOKEN_COUNT', 'FORMAT', 'FILE')
+    _PLACEHOLDER = re.compile(r"\{(" + "|".join(VARIABLES) + r")\}")
+
+    def __init__(self, template: str):
+        from utils import compter_tokens
+
+        self.template = template
+        self.token_cost = compter_tokens(template)
+        self._whole = self._parse(template)
+
+        system_part, user_part = None, template
+        if '---SYSTEM---' in template:
+            after = template.split('---SYSTEM---', 1)[1]
+            if '---USER---' in after:
+                system_part, user_part = after.split('---USER---', 1)
+        self._system = self._parse(system_part) if system_part is not None else None
+        self._user = self._parse(user_part)
+
+    @classmethod
+    def _parse(cls, text: str) -> Tuple[List[Optional[str]], List[Tuple[int, str]]]:
+        """Literal segments (None where a placeholder goes) and the (index, name) of each placeholder."""
+        segments: List[Optional[str]] = []
+        slots: List[Tuple[int, str]] = []
+        position = 0
+        for match in cls._PLACEHOLDER.finditer(text):
+            if match.start() > position:
+                segments.append(text[position:match.start()])
+            slots.append((len(segments), match.group(1)))
+            segments.append(None)
+            position = match.end()
+        if position < len(text):
+            segments.append(text[position:])
+        return segments, slots
 
-        variables = {
-            'CONVERSATION_TEXT': conversation_text,
+    @staticmethod
+    def variables(conversation: Dict[str, Any], messages: List[str]) -> Dict[str, str]:
+        """Values of the template variables for one conversation."""
+        return {
+            'CONVERSATION_TEXT': "\n\n".join(messages),
             'TITLE': conversation.get('title', 'Untitled'),
             'MESSAGE_COUNT': str(len(messages)),
             'TOKEN_COUNT': str(conversation.get('token_count', 0)),
@@ -107,12 +194,46 @@ class PromptFormatter:
             'FILE': conversation.get('_source_file', 'unknown')
         }
 
-        # Variable replacement
-        formatted = template
-        for key, value in variables.items():
-            formatted = formatted.replace(f"{{{key}}}", value)
+    @staticmethod
+    def _join(parsed, values: Dict[str, str]) -> str:
+        segments, slots = parsed
+        if not slots:
+            return "".join(segments)
+        segments = list(segments)
+        for index, name in slots:
+            segments[index] = values[name]
+        return "".join(segments)
+
+    def format(self, conversation: Dict[str, Any], messages: List[str]) -> str:
+        """The whole template with its variables replaced (markers kept)."""
+        return self._join(self._whole, self.variables(conversation, messages))
+
+    def render(self, conversation: Dict[str, Any], messages: List[str]) -> Tuple[Optional[str], str]:
+        """
+        Renders the (system prompt or None, user prompt) of a conversation, stripped.
+        """
+        values = self.variables(conversation, messages)
+        system_prompt = self._join(self._system, values).strip() if self._system is not None else None
+        return system_prompt, self._join(self._user, values).strip()
+
+
+@lru_cache(maxsize=32)
+def compile_template(template: str) -> CompiledTemplate:
+    """Compiled form of a template (compiled once per distinct template)."""
+    return CompiledTemplate(template)
 
-        return formatted
+
+class PromptFormatter:
+    """Formats prompts with conversation variables (see CompiledTemplate)."""
+
+    @staticmethod
+    def format_prompt(
+        template: str,
+        conversation: Dict[str, Any],
+        messages: List[str]
+    ) -> str:
+        """Replaces the variables of the prompt template in a single pass."""
+        return compile_template(template).format(conversation, messages)
 
     @staticmethod
     def parse_system_user(prompt: str) -> tuple:
@@ -127,37 +248,251 @@ class PromptFormatter:
         """
         if '---SYSTEM---' in prompt and '---USER---' in prompt:
             parts = prompt.split('---SYSTEM---', 1)[1]
-            system_part, user_part = parts.split('---USER---', 1)
-            return system_part.strip(), user_part.strip()
+            if '---USER---' in parts:
+                system_part, user_part = parts.split('---USER---', 1)
+                return system_part.strip(), user_part.strip()
 
         # Default: everything is user prompt
         return None, prompt.strip()
 
 
+def build_chat_payload(
+    model: str,
+    prompt: str,
+    system_prompt: Optional[str] = None,
+    temperature: float = 0.7,
+    max_tokens: int = DEFAULT_MAX_TOKENS
+) -> Dict[str, Any]:
+    """Builds the chat completion request body."""
+    messages = []
+
+    # Add system prompt if present
+    if system_prompt:
+        messages.append({
+            "role": "system",
+            "content": system_prompt
+        })
+
+    # Add user prompt
+    messages.append({
+        "role": "user",
+        "content": prompt
+    })
+
+    return {
+        "model": model,
+        "messages": messages,
+        "temperature": temperature,
+        "max_tokens": max_tokens
+    }
+
+
+def parse_chat_response(model: str, result: Dict[str, Any]) -> Dict[str, Any]:
+    """Converts an API JSON body into an executor result."""
+    return {
+        'success': True,
+        'response': result["choices"][0]["message"]["content"],
+        'model': model,
+        'tokens_used': result.get('usage', {})
+    }
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parses a Retry-After header (delay in seconds or HTTP date) into seconds."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        from email.utils import parsedate_to_datetime
+        from datetime import datetime, timezone
+        retry_at = parsedate_to_datetime(value)
+        if retry_at.tzinfo is None:
+            retry_at = retry_at.replace(tzinfo=timezone.utc)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+def failure_result(
+    error: str,
+    retryable: bool = False,
+    status_code: Optional[int] = None,
+    retry_after: Optional[float] = None
+) -> Dict[str, Any]:
+    """Executor result for a failed call; retryable ones carry the server hint."""
+    result = {
+        'success': False,
+        'error': error
+    }
+    if retryable:
+        result.update({'retryable': True, 'status_code': status_code, 'retry_after': retry_after})
+    return result
+
+
+def cache_key(
+    model: str,
+    prompt: str,
+    system_prompt: Optional[str],
+    temperature: float,
+    max_tokens: int
+) -> str:
+    """Response cache key of a request (see response_cache.ResponseCache)."""
+    from response_cache import ResponseCache
+    return ResponseCache.make_key(model, system_prompt, prompt, temperature, max_tokens)
+
+
+def lookup_cached_response(cache, key: str) -> Optional[Dict[str, Any]]:
+    """Returns a cached executor result flagged 'cached', or None."""
+    if cache is None:
+        return None
+    result = cache.get(key)
+    if result is None:
+        return None
+    return {**result, 'cached': True}
+
+
+def report_response(callback, status_code: Optional[int], started: float) -> None:
+    """Forwards one HTTP attempt (status, latency) to an optional listener."""
+    if callback is not None:
+        callback(status_code, time.monotonic() - started)
+
+
 class PromptExecutor:
-    """Executes prompts via API."""
+    """
+    Executes prompts via API.
+
+    Owns a pooled HTTP session so that consecutive calls reuse keep-alive
+    connections instead of paying a new TCP + TLS handshake each time.
+    Call close() (or use as a context manager) when done.
+    """
+
+    max_retries = 3
 
     def __init__(
         self,
         api_key: str,
         api_url: str = "https://api.mistral.ai/v1/chat/completions",
-        model: str = "pixtral-large-latest"
+        model: str = "pixtral-large-latest",
+        pool_size: int = 5,
+        connect_timeout: float = 10.0,
+        read_timeout: float = 60.0,
+        connection_retries: int = 3
     ):
         self.api_key = api_key
         self.api_url = api_url
         self.model = model
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = self._create_session(pool_size, connection_retries)
+        self.rate_limiter = None
+        # Optional response_cache.ResponseCache consulted before each API call
+        self.cache = None
+        # Called with (status_code or None on timeout, latency) after each HTTP attempt
+        self.response_callback = None
+        # When True, a retryable failure is returned at once (marked 'retryable')
+        # so that the engine can re-queue it instead of sleeping in the worker
+        self.defer_retries = False
+
+    def _create_session(self, pool_size: int, connection_retries: int) -> requests.Session:
+        """
+        Creates the pooled keep-alive session.
+
+        The adapter only retries connection-level failures; HTTP 429/5xx
+        handling stays in execute_prompt.
+        """
+        retry = Retry(
+            total=connection_retries,
+            connect=connection_retries,
+            read=0,
+            status=0,
+            status_forcelist=(),
+            respect_retry_after_header=False,
+            raise_on_status=False,
+            backoff_factor=0.5,
+            allowed_methods=None
+        )
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=max(1, pool_size),
+            max_retries=retry
+        )
+
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update({
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        })
+        return session
+
+    def close(self) -> None:
+        """Closes the pooled session and its connections."""
+        if self.session is not None:
+            self.session.close()
+            self.session = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @staticmethod
+    def retry_delay(
+        status_code: Optional[int],
+        attempt: int,
+        retry_after: Optional[float] = None
+    ) -> Optional[float]:
+        """
+        Returns how long to wait before retrying, or None if not retryable.
+
+        The server's Retry-After wins when present. Otherwise 429 backs off
+        5/10/20 s, 5xx and timeouts (status_code None) back off 2/4/6 s.
+        """
+        if status_code is not None and status_code != 429 and status_code < 500:
+            return None
+        if retry_after is not None:
+            return retry_after
+        if status_code is None:
+            return (attempt + 1) * 2
+        if status_code == 429:
+            return 5 * (2 ** attempt)
+        if status_code >= 500:
+            return (attempt + 1) * 2
+        return None
+
+    def cached_response(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: int = DEFAULT_MAX_TOKENS
+    ) -> Optional[Dict[str, Any]]:
+        """Returns the cached result of this request, or None (no cache or miss)."""
+        if self.cache is None:
+            return None
+        key = cache_key(self.model, prompt, system_prompt, temperature, max_tokens)
+        return lookup_cached_response(self.cache, key)
 
     def execute_prompt(
         self,
         prompt: str,
         system_prompt: Optional[str] = None,
         temperature: float = 0.7,
-        max_tokens: int = 16000,
-        simulate: bool = False
+        max_tokens: int = DEFAULT_MAX_TOKENS,
+        simulate: bool = False,
+        check_cache: bool = True
     ) -> Dict[str, Any]:
         """
         Executes a prompt via API.
 
+        With a response cache attached, a hit is returned without any API
+        call (flagged 'cached') and successful responses are stored.
+        check_cache=False skips the lookup when the caller already did it.
+
         Returns:
             {
                 'success': bool,
@@ -173,100 +508,357 @@ class PromptExecutor:
                 'simulate': True
             }
 
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
-
-        messages = []
+        key = None
+        if self.cache is not None:
+            key = cache_key(self.model, prompt, system_prompt, temperature, max_tokens)
+            cached = lookup_cached_response(self.cache, key) if check_cache else None
+            if cached is not None:
+                return cached
 
-        # Add system prompt if present
-        if system_prompt:
-            messages.append({
-                "role": "system",
-                "content": system_prompt
-            })
+        payload = build_chat_payload(self.model, prompt, system_prompt, temperature, max_tokens)
+        attempts = 1 if self.defer_retries else self.max_retries
 
-        # Add user prompt
-        messages.append({
-            "role": "user",
-            "content": prompt
-        })
-
-        payload = {
-            "model": self.model,
-            "messages": messages,
-            "temperature": temperature,
-            "max_tokens": max_tokens
-        }
-
-        max_retries = 3
-        for attempt in range(max_retries):
+        for attempt in range(attempts):
+            started = time.monotonic()
             try:
-                response = requests.post(
+                response = self.session.post(
                     self.api_url,
-                    headers=headers,
                     json=payload,
-                    timeout=60
+                    timeout=self.timeout
                 )
+                report_response(self.response_callback, response.status_code, started)
                 response.raise_for_status()
-
-                result = response.json()
-                content = result["choices"][0]["message"]["content"]
-
-                return {
-                    'success': True,
-                    'response': content,
-                    'model': self.model,
-                    'tokens_used': result.get('usage', {})
-                }
+                result = parse_chat_response(self.model, response.json())
+                if key is not None:
+                    self.cache.put(key, result)
+                return result
 
             except requests.exceptions.HTTPError as e:
-                status_code = e.response.status_code if e.response else "Unknown"
+                status_code = e.response.status_code if e.response is not None else None
+                retry_after = None
+                if e.response is not None:
+                    retry_after = parse_retry_after(e.response.headers.get('Retry-After'))
+                wait_time = self.retry_delay(status_code, attempt, retry_after) if status_code else None
+
+                if status_code == 429 and wait_time is not None and self.rate_limiter is not None:
+                    # Shared back-off: every worker waits, not only this one
+                    self.rate_limiter.pause(wait_time)
 
-                if attempt < max_retries - 1 and (status_code == 429 or status_code >= 500):
-                    wait_time = 5 * (2 ** attempt) if status_code == 429 else (attempt + 1) * 2
+                if attempt < attempts - 1 and wait_time is not None:
                     time.sleep(wait_time)
                     continue
 
-                return {
-                    'success': False,
-                    'error': f"HTTP {status_code}: {str(e)}"
-                }
+                return failure_result(f"HTTP {status_code or 'Unknown'}: {str(e)}",
+                                      wait_time is not None, status_code, retry_after)
 
             except requests.exceptions.Timeout:
-                if attempt < max_retries - 1:
-                    time.sleep((attempt + 1) * 2)
+                report_response(self.response_callback, None, started)
+                if attempt < attempts - 1:
+                    time.sleep(self.retry_delay(None, attempt))
                     continue
 
+                return failure_result("Timeout" if self.defer_retries else "Timeout after multiple attempts",
+                                      True)
+
+            except Exception as e:
                 return {
                     'success': False,
-                    'error': "Timeout after multiple attempts"
+                    'error': f"{type(e).__name__}: {str(e)}"
                 }
 
+        return {
+            'success': False,
+            'error': "Failed after all retries"
+        }
+
+
+class AsyncPromptExecutor:
+    """
+    Executes prompts via API from an asyncio event loop.
+
+    Same request body, retry policy and result shape as PromptExecutor, but
+    built on aiohttp so that hundreds of requests can be in flight from a
+    single thread. Must be opened inside the running loop (async with).
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        api_url: str = "https://api.mistral.ai/v1/chat/completions",
+        model: str = "pixtral-large-latest",
+        pool_size: int = 100,
+        connect_timeout: float = 10.0,
+        read_timeout: float = 60.0
+    ):
+        if aiohttp is None:
+            raise ImportError("aiohttp is required for the async engine (pip install aiohttp)")
+
+        self.api_key = api_key
+        self.api_url = api_url
+        self.model = model
+        self.max_retries = PromptExecutor.max_retries
+        self.pool_size = max(1, pool_size)
+        self.timeout = aiohttp.ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout)
+        self.session = None
+        self.rate_limiter = None
+        self.cache = None
+        self.response_callback = None
+        self.defer_retries = False
+
+    async def open(self) -> None:
+        """Creates the pooled keep-alive client session."""
+        if self.session is None:
+            connector = aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=60)
+            self.session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=self.timeout,
+                headers={
+                    "Authorization": f"Bearer {self.api_key}",
+                    "Content-Type": "application/json"
+                }
+            )
+
+    async def close(self) -> None:
+        """Closes the client session and its connections."""
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    def cached_response(self, *args, **kwargs) -> Optional[Dict[str, Any]]:
+        """Same as PromptExecutor.cached_response (the SQLite lookup is not awaited)."""
+        return PromptExecutor.cached_response(self, *args, **kwargs)
+
+    async def execute_prompt(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: int = DEFAULT_MAX_TOKENS,
+        simulate: bool = False,
+        check_cache: bool = True
+    ) -> Dict[str, Any]:
+        """Async counterpart of PromptExecutor.execute_prompt."""
+        if simulate:
+            await asyncio.sleep(random.uniform(0.1, 0.3))
+            return {
+                'success': True,
+                'response': '[SIMULATION] Simulated model response',
+                'simulate': True
+            }
+
+        key = None
+        if self.cache is not None:
+            key = cache_key(self.model, prompt, system_prompt, temperature, max_tokens)
+            cached = lookup_cached_response(self.cache, key) if check_cache else None
+            if cached is not None:
+                return cached
+
+        payload = build_chat_payload(self.model, prompt, system_prompt, temperature, max_tokens)
+        attempts = 1 if self.defer_retries else self.max_retries
+
+        for attempt in range(attempts):
+            started = time.monotonic()
+            try:
+                async with self.session.post(self.api_url, json=payload) as response:
+                    report_response(self.response_callback, response.status, started)
+                    if response.status < 400:
+                        result = parse_chat_response(self.model, await response.json(content_type=None))
+                        if key is not None:
+                            self.cache.put(key, result)
+                        return result
+
+                    status_code = response.status
+                    reason = response.reason
+                    retry_after = parse_retry_after(response.headers.get('Retry-After'))
+
+            except asyncio.TimeoutError:
+                report_response(self.response_callback, None, started)
+                if attempt < attempts - 1:
+                    await asyncio.sleep(PromptExecutor.retry_delay(None, attempt))
+                    continue
+
+                return failure_result("Timeout" if self.defer_retries else "Timeout after multiple attempts",
+                                      True)
+
             except Exception as e:
                 return {
                     'success': False,
                     'error': f"{type(e).__name__}: {str(e)}"
                 }
 
+            # Error status: the connection is released before any back-off
+            wait_time = PromptExecutor.retry_delay(status_code, attempt, retry_after)
+
+            if status_code == 429 and wait_time is not None and self.rate_limiter is not None:
+                self.rate_limiter.pause(wait_time)
+
+            if attempt < attempts - 1 and wait_time is not None:
+                await asyncio.sleep(wait_time)
+                continue
+
+            return failure_result(f"HTTP {status_code}: {reason}", wait_time is not None,
+                                  status_code, retry_after)
+
         return {
             'success': False,
             'error': "Failed after all retries"
         }
 
 
+def template_token_cost(prompt_template: str) -> int:
+    """Tokens added by the template itself around the conversation text."""
+    return compile_template(prompt_template).token_cost
+
+
+def conversation_base_result(conversation: Dict[str, Any]) -> Dict[str, Any]:
+    """Conversation metadata copied into every result of this conversation."""
+    titre = conversation.get("title", "Untitled")
+    return {
+        "_task_id": conversation.get("_task_id", ""),
+        "conversation_id": conversation.get("conversation_id", ""),
+        "titre_original": conversation.get("titre_original", titre),
+        "titre": titre,
+        "partie": conversation.get("partie", "1/1"),
+        "_source_file": conversation.get("_source_file", "unknown"),
+        "_format": conversation.get("_format", "unknown")
+    }
+
+
+def prepare_conversation_request(
+    conversation: Dict[str, Any],
+    messages: List[str],
+    prompt_template: str
+) -> Dict[str, Any]:
+    """
+    Builds everything needed to send one conversation to the API.
+
+    Returns:
+        {
+            'base_result': dict (metadata copied into the final result),
+            'token_count': int,
+            'prompt_tokens': int (estimated tokens of the rendered prompt),
+            'system_prompt': str or None,
+            'user_prompt': str
+        }
+    """
+    base_result = conversation_base_result(conversation)
+
+    if not messages:
+        return {'base_result': base_result, 'token_count': 0, 'prompt_tokens': 0,
+                'system_prompt': None, 'user_prompt': ''}
+
+    # Calculate tokens (already counted when the conversation was split)
+    conversation_text = "\n".join(messages)
+    token_count = conversation.get('token_count')
+    if token_count is None:
+        from utils import compter_tokens
+        token_count = compter_tokens(conversation_text)
+
+    # Add token_count to conversation for formatter
+    conversation['token_count'] = token_count
+
+    # Render the precompiled template (SYSTEM/USER split resolved at compile time)
+    compiled = compile_template(prompt_template)
+    system_prompt, user_prompt = compiled.render(conversation, messages)
+
+    return {
+        'base_result': base_result,
+        'token_count': token_count,
+        'prompt_tokens': token_count + compiled.token_cost,
+        'system_prompt': system_prompt,
+        'user_prompt': user_prompt
+    }
+
+
+def simulated_result(titre: str) -> Dict[str, Any]:
+    """Result returned in --simulate mode, no API call is made."""
+    return {
+        'success': True,
+        'response': f'[SIMULATION] Security analysis of "{titre}" completed successfully.\n\nThis is a simulated response. No API call was made.',
+        'model': 'simulated',
+        'tokens_used': {}
+    }
+
+
+def build_conversation_result(
+    base_result: Dict[str, Any],
+    result: Dict[str, Any],
+    token_count: int
+) -> Dict[str, Any]:
+    """
+    Merges conversation metadata and an executor result into the final result dict.
+
+    A retryable failure also carries a transient '_retry' entry (status code
+    and Retry-After) that the execution engine removes before the result is
+    reported.
+    """
+    final = {
+        **base_result,
+        "success": result['success'],
+        "response": result.get('response', ''),
+        "error": result.get('error', ''),
+        "token_count": token_count,
+        "model_used": result.get('model', ''),
+        "tokens_used": result.get('tokens_used', {}),
+        "cached": result.get('cached', False)
+    }
+    if result.get('retryable'):
+        final['_retry'] = {
+            'status_code': result.get('status_code'),
+            'retry_after': result.get('retry_after')
+        }
+    return final
+
+
+def attach_timing(
+    result: Dict[str, Any],
+    prepare: float = 0.0,
+    wait: float = 0.0,
+    latency: float = 0.0
+) -> Dict[str, Any]:
+    """
+    Adds the transient '_timing' entry (seconds spent preparing the prompt,
+    waiting on pacing and in the API call) that the execution engine hands
+    to its observer and removes before the result is reported.
+    """
+    result['_timing'] = {'prepare': prepare, 'wait': wait, 'latency': latency}
+    return result
+
+
+def no_messages_result(base_result: Dict[str, Any]) -> Dict[str, Any]:
+    """Result for a conversation without any message."""
+    return {
+        **base_result,
+        "success": False,
+        "response": "",
+        "error": "No messages",
+        "token_count": 0
+    }
+
+
 def process_conversation_with_prompt(
     conversation: Dict[str, Any],
     messages: List[str],
     prompt_template: str,
     executor: PromptExecutor,
     simulate: bool = False,
-    delay: float = 0.5
+    delay: float = 0.5,
+    rate_limiter=None
 ) -> Dict[str, Any]:
     """
     Processes a conversation with a custom prompt.
 
+    With a rate_limiter, the fixed delay is replaced by a wait on the shared
+    requests/tokens buckets (estimated prompt tokens + max_tokens). Responses
+    found in the executor's cache are returned without waiting.
+
     Returns:
         {
             'conversation_id': str,
@@ -278,72 +870,92 @@ def process_conversation_with_prompt(
             'partie': str
         }
     """
-    titre = conversation.get("title", "Untitled")
-
-    base_result = {
-        "conversation_id": conversation.get("conversation_id", ""),
-        "titre_original": conversation.get("titre_original", titre),
-        "titre": titre,
-        "partie": conversation.get("partie", "1/1"),
-        "_source_file": conversation.get("_source_file", "unknown"),
-        "_format": conversation.get("_format", "unknown")
-    }
+    debut = time.monotonic()
+    request = prepare_conversation_request(conversation, messages, prompt_template)
+    base_result = request['base_result']
+    prepare = time.monotonic() - debut
 
     if not messages:
-        return {
-            **base_result,
-            "success": False,
-            "response": "",
-            "error": "No messages",
-            "token_count": 0
-        }
-
-    # Calculate tokens
-    from utils import compter_tokens
-    conversation_text = "\n".join(messages)
-    token_count = compter_tokens(conversation_text)
-
-    # Add token_count to conversation for formatter
-    conversation['token_count'] = token_count
+        return attach_timing(no_messages_result(base_result), prepare)
 
-    # Format prompt
-    formatter = PromptFormatter()
-    formatted_prompt = formatter.format_prompt(prompt_template, conversation, messages)
-
-    # Separate system/user if present
-    system_prompt, user_prompt = formatter.parse_system_user(formatted_prompt)
+    # A cache hit skips both the pacing and the API call
+    cached = None if simulate else executor.cached_response(
+        request['user_prompt'], system_prompt=request['system_prompt']
+    )
+    if cached is not None:
+        return attach_timing(build_conversation_result(base_result, cached, request['token_count']), prepare)
 
     # Delay between requests
+    debut_attente = time.monotonic()
     if not simulate:
-        time.sleep(delay)
+        if rate_limiter is not None:
+            rate_limiter.acquire(request['prompt_tokens'] + DEFAULT_MAX_TOKENS)
+        else:
+            time.sleep(delay)
+    debut_appel = time.monotonic()
 
     # Execute prompt - FIX FOR SIMULATE MODE
     if simulate:
         # En mode simulation, on crée directement un résultat simulé
         time.sleep(random.uniform(0.05, 0.15))  # Petit délai pour réalisme
-        result = {
-            'success': True,
-            'response': f'[SIMULATION] Security analysis of "{titre}" completed successfully.\n\nThis is a simulated response. No API call was made.',
-            'model': 'simulated',
-            'tokens_used': {}
-        }
+        result = simulated_result(base_result['titre'])
     else:
         # En mode normal, on utilise l'executor
         result = executor.execute_prompt(
-            user_prompt,
-            system_prompt=system_prompt,
-            simulate=False
+            request['user_prompt'],
+            system_prompt=request['system_prompt'],
+            simulate=False,
+            check_cache=False
         )
 
-    return {
-        **base_result,
-        "success": result['success'],
-        "response": result.get('response', ''),
-        "error": result.get('error', ''),
-        "token_count": token_count,
-        "model_used": result.get('model', ''),
-        "tokens_used": result.get('tokens_used', {})
-    }
+    return attach_timing(
+        build_conversation_result(base_result, result, request['token_count']),
+        prepare, debut_appel - debut_attente, time.monotonic() - debut_appel
+    )
+
+
+async def process_conversation_with_prompt_async(
+    conversation: Dict[str, Any],
+    messages: List[str],
+    prompt_template: str,
+    executor: Optional[AsyncPromptExecutor],
+    simulate: bool = False,
+    delay: float = 0.5,
+    rate_limiter=None
+) -> Dict[str, Any]:
+    """Async counterpart of process_conversation_with_prompt, same result dict."""
+    debut = time.monotonic()
+    request = prepare_conversation_request(conversation, messages, prompt_template)
+    base_result = request['base_result']
+    prepare = time.monotonic() - debut
+
+    if not messages:
+        return attach_timing(no_messages_result(base_result), prepare)
+
+    debut_attente = debut_appel = time.monotonic()
+    if simulate:
+        await asyncio.sleep(random.uniform(0.05, 0.15))
+        result = simulated_result(base_result['titre'])
+    else:
+        result = executor.cached_response(request['user_prompt'], system_prompt=request['system_prompt'])
+        if result is not None:
+            return attach_timing(build_conversation_result(base_result, result, request['token_count']), prepare)
+        if rate_limiter is not None:
+            await rate_limiter.acquire_async(request['prompt_tokens'] + DEFAULT_MAX_TOKENS)
+        else:
+            await asyncio.sleep(delay)
+        debut_appel = time.monotonic()
+        result = await executor.execute_prompt(
+            request['user_prompt'],
+            system_prompt=request['system_prompt'],
+            simulate=False,
+            check_cache=False
+        )
+
+    return attach_timing(
+        build_conversation_result(base_result, result, request['token_count']),
+        prepare, debut_appel - debut_attente, time.monotonic() - debut_appel
+    )
 
 
 # ============================================
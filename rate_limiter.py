@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Rate Limiting Module
+Shared token buckets for requests-per-minute and tokens-per-minute quotas
+"""
+
+import time
+import asyncio
+import threading
+from typing import Callable, Optional
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at `capacity` units per minute.
+
+    The bucket holds `burst` seconds of quota (at least one unit), so a run
+    starts at the quota rate instead of sending a whole minute of quota at
+    once, which providers enforcing the quota per second would reject.
+
+    Reservations may drive the level below zero: the caller then waits until
+    the debt has been refilled. This keeps requests in FIFO order without a
+    polling loop and lets a single request larger than the bucket through
+    after a proportional wait.
+    """
+
+    def __init__(self, capacity: float, clock: Callable[[], float] = time.monotonic, burst: float = 1.0):
+        self.capacity = float(capacity)
+        self.rate = self.capacity / 60.0
+        self.burst = max(1.0, self.rate * burst)
+        self.clock = clock
+        self.level = self.burst
+        self.updated = clock()
+
+    def _refill(self, now: float) -> None:
+        if now > self.updated:
+            self.level = min(self.burst, self.level + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def reserve(self, amount: float, now: Optional[float] = None) -> float:
+        """
+        Takes `amount` units from the bucket.
+
+        Returns:
+            float: Seconds to wait before the reservation is covered (0 if available)
+        """
+        now = self.clock() if now is None else now
+        self._refill(now)
+        self.level -= amount
+        if self.level >= 0:
+            return 0.0
+        return -self.level / self.rate
+
+    def drain(self, seconds: float, now: Optional[float] = None) -> None:
+        """Empties the bucket so that nothing is available for `seconds`."""
+        now = self.clock() if now is None else now
+        self._refill(now)
+        self.level = min(self.level, -seconds * self.rate)
+
+
+class RateLimiter:
+    """
+    Shared rate limiter with separate requests and tokens per minute buckets.
+
+    One instance is shared by all workers (threads or coroutines). Workers
+    only wait when a bucket is empty, so a run can sit right at quota.
+    `burst` is the number of seconds of quota that may go out at once.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+        burst: float = 1.0
+    ):
+        self.clock = clock
+        self.requests = TokenBucket(requests_per_minute, clock, burst) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute, clock, burst) if tokens_per_minute else None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.requests is not None or self.tokens is not None
+
+    def reserve(self, tokens: float) -> float:
+        """
+        Reserves one request and `tokens` tokens.
+
+        Returns:
+            float: Seconds the caller must wait before sending
+        """
+        with self._lock:
+            now = self.clock()
+            wait = 0.0
+            if self.requests is not None:
+                wait = max(wait, self.requests.reserve(1, now))
+            if self.tokens is not None:
+                wait = max(wait, self.tokens.reserve(tokens, now))
+            return wait
+
+    def acquire(self, tokens: float) -> float:
+        """Blocks the calling thread until the request fits in the quota. Returns the wait."""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, tokens: float) -> float:
+        """Async counterpart of acquire()."""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def pause(self, seconds: float) -> None:
+        """
+        Pauses every worker for `seconds` (e.g. after a 429).
+
+        Both buckets are drained, so the next reservations wait instead of
+        each thread backing off on its own.
+        """
+        with self._lock:
+            now = self.clock()
+            for bucket in (self.requests, self.tokens):
+                if bucket is not None:
+                    bucket.drain(seconds, now)
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Response Cache Module
+Content-addressed SQLite cache of API responses
+"""
+
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+CACHE_MODES = ['read-write', 'read-only', 'refresh', 'off']
+
+
+class ResponseCache:
+    """
+    Caches successful API responses on disk.
+
+    Entries are keyed by a hash of everything that determines the answer:
+    model, system prompt, user prompt, temperature and max_tokens. Re-running
+    a job after a crash, with another --format or with a single prompt tweak
+    only pays for the requests that actually changed.
+
+    Modes:
+        read-write  Use cached responses and store new ones (default)
+        read-only   Use cached responses, never write (not even the schema:
+                    the file may be read-only, a missing file is an empty cache)
+        refresh     Ignore cached responses, overwrite them with new ones
+        off         No cache at all
+    """
+
+    def __init__(
+        self,
+        path: str,
+        mode: str = 'read-write',
+        ttl: Optional[float] = None,
+        max_size_mb: Optional[float] = None,
+        eviction_interval: int = 500
+    ):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown cache mode: {mode}")
+
+        self.path = Path(path)
+        self.mode = mode
+        self.ttl = ttl
+        self.max_bytes = int(max_size_mb * 1024 * 1024) if max_size_mb else None
+        self.eviction_interval = eviction_interval
+
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+
+        self._lock = threading.Lock()
+        self._conn = None
+        if mode == 'read-only':
+            self._conn = self._connect_read_only()
+        elif mode != 'off':
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    model TEXT,
+                    result TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_accessed ON responses(accessed_at)")
+            self._conn.commit()
+            self.evict()
+
+    def _connect_read_only(self) -> Optional[sqlite3.Connection]:
+        """Connection that cannot write the file, or None when there is no cache to read."""
+        if not self.path.is_file():
+            return None
+        uri = self.path.resolve().as_uri()
+        # A WAL file in a read-only directory cannot get its -shm index: read it as immutable then
+        options = ["mode=ro", "mode=ro&immutable=1"]
+        while True:
+            conn = sqlite3.connect(f"{uri}?{options.pop(0)}", uri=True, check_same_thread=False)
+            try:
+                conn.execute("SELECT 1 FROM responses LIMIT 1").fetchall()
+                return conn
+            except sqlite3.OperationalError as e:
+                conn.close()
+                if "no such table" in str(e):
+                    return None
+                if not options:
+                    raise
+
+    @property
+    def readable(self) -> bool:
+        return self.mode in ('read-write', 'read-only')
+
+    @property
+    def writable(self) -> bool:
+        return self.mode in ('read-write', 'refresh')
+
+    @staticmethod
+    def make_key(
+        model: str,
+        system_prompt: Optional[str],
+        user_prompt: str,
+        temperature: float,
+        max_tokens: int
+    ) -> str:
+        """Content address of a request."""
+        material = json.dumps(
+            [model, system_prompt or '', user_prompt, float(temperature), int(max_tokens)],
+            ensure_ascii=False
+        )
+        return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Returns the cached executor result for `key`, or None."""
+        if not self.readable:
+            return None
+
+        now = time.time()
+        with self._lock:
+            if self._conn is None:
+                self.misses += 1
+                return None
+            row = self._conn.execute(
+                "SELECT result, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None or (self.ttl and row[1] < now - self.ttl):
+                self.misses += 1
+                return None
+
+            if self.writable:
+                # LRU bookkeeping, committed at once so no write transaction stays open
+                self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+                self._conn.commit()
+            self.hits += 1
+
+        return json.loads(row[0])
+
+    def put(self, key: str, result: Dict[str, Any]) -> None:
+        """Stores a successful executor result."""
+        if not self.writable or not result.get('success'):
+            return
+
+        data = json.dumps(result, ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, result, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, result.get('model', ''), data, len(data), now, now)
+            )
+            self._conn.commit()
+            self.writes += 1
+            evict_now = self.writes % self.eviction_interval == 0
+
+        if evict_now:
+            self.evict()
+
+    def evict(self) -> int:
+        """
+        Drops expired entries, then the least recently used ones until the
+        cache fits in max_size_mb. Returns the number of entries removed.
+        """
+        if self._conn is None or self.mode == 'read-only':
+            return 0
+
+        removed = 0
+        with self._lock:
+            if self.ttl:
+                cursor = self._conn.execute(
+                    "DELETE FROM responses WHERE created_at < ?", (time.time() - self.ttl,)
+                )
+                removed += cursor.rowcount
+
+            if self.max_bytes:
+                total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+                if total > self.max_bytes:
+                    # Free down to 90% so that eviction does not run on every write
+                    to_free = total - int(self.max_bytes * 0.9)
+                    freed = 0
+                    victims = []
+                    for key, size in self._conn.execute(
+                        "SELECT key, size FROM responses ORDER BY accessed_at"
+                    ):
+                        victims.append((key,))
+                        freed += size
+                        if freed >= to_free:
+                            break
+                    self._conn.executemany("DELETE FROM responses WHERE key = ?", victims)
+                    removed += len(victims)
+
+            self._conn.commit()
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        return {'mode': self.mode, 'hits': self.hits, 'misses': self.misses, 'writes': self.writes}
+
+    def close(self) -> None:
+        if self._conn is not None:
+            with self._lock:
+                self._conn.commit()
+                self._conn.close()
+            self._conn = None
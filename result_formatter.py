@@ -3,20 +3,861 @@
 
 """
 Results Formatting Module
-Handles output in different formats (CSV, JSON, TXT, Markdown)
+Handles output in different formats (CSV, JSON, JSONL, TXT, Markdown, SQLite, Parquet)
 """
 
 import csv
+import gzip
 import json
 import os
+import time
+import shutil
+import sqlite3
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Optional
 from pathlib import Path
 
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# File suffix added by each streaming compression
+COMPRESSION_SUFFIXES = {
+    'gzip': '.gz',
+    'zstd': '.zst'
+}
+
+
+def open_text_output(path, mode: str = 'w', compression: Optional[str] = None, newline: Optional[str] = None):
+    """
+    Opens a text file, optionally through a streaming gzip/zstd compressor.
+
+    Args:
+        path: File path
+        mode: 'w', 'a' or 'r'
+        compression: None, 'gzip' or 'zstd' (needs the zstandard package)
+        newline: Passed to the text layer (CSV needs '')
+    """
+    if compression is None:
+        return open(path, mode, encoding='utf-8', newline=newline)
+    if compression == 'gzip':
+        return gzip.open(path, mode + 't', compresslevel=6, encoding='utf-8', newline=newline)
+    if compression == 'zstd':
+        if zstandard is None:
+            raise ImportError("zstandard is required for zstd compression (pip install zstandard)")
+        if mode == 'r':
+            return zstandard.open(path, 'rt', encoding='utf-8', newline=newline)
+        return zstandard.open(path, mode + 't', cctx=zstandard.ZstdCompressor(level=3),
+                              encoding='utf-8', newline=newline)
+    raise ValueError(f"Unknown compression: {compression}")
+
+
+CSV_FIELDNAMES = [
+    "conversation_id",
+    "titre_original",
+    "titre",
+    "partie",
+    "response",
+    "success",
+    "error",
+    "token_count"
+]
+
+CSV_METADATA_FIELDNAMES = [
+    "fichier_source",
+    "format",
+    "model_used"
+]
+
+
+def markdown_anchor(titre: str) -> str:
+    """GitHub-style anchor of a Markdown heading."""
+    anchor = titre.lower().replace(' ', '-')
+    return ''.join(c for c in anchor if c.isalnum() or c == '-')
+
+
+class StreamWriter:
+    """
+    Base class of the streaming result writers.
+
+    A writer is opened before dispatch and receives each result as soon as
+    it is final, so memory does not grow with the number of results and the
+    output file can be read while the run is still going. close() finalizes
+    the file and returns True on success, like the save_* methods.
+    """
+
+    name = "Output"
+    extension = ""
+    # Text formats can be written through a streaming compressor
+    compressible = True
+
+    def __init__(self, output_file: str, compression: Optional[str] = None):
+        self.output_file = Path(output_file)
+        self.compression = compression
+        self.count = 0
+        self.failed = False
+        self._file = None
+
+    def open(self) -> 'StreamWriter':
+        try:
+            self._open()
+        except Exception as e:
+            self._fail(e)
+        return self
+
+    def write(self, result: Dict[str, Any]) -> None:
+        """Writes one result (errors are reported once and make close() return False)."""
+        if self.failed or self._file is None:
+            return
+        try:
+            self._write(result)
+            self._flush()
+            self.count += 1
+        except Exception as e:
+            self._fail(e)
+
+    def close(self) -> bool:
+        if self._file is not None and not self.failed:
+            try:
+                self._finish()
+            except Exception as e:
+                self._fail(e)
+        if self._file is not None:
+            self._release()
+        return not self.failed
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def size_on_disk(self) -> int:
+        """Bytes written so far (compressed size, approximate while the compressor buffers)."""
+        return os.path.getsize(self.output_file) if self.output_file.exists() else 0
+
+    def _fail(self, error: Exception) -> None:
+        if not self.failed:
+            print(f"❌ {self.name} save error: {error}")
+        self.failed = True
+
+    def _open(self) -> None:
+        self._file = open_text_output(self.output_file, 'w', self.compression)
+
+    def _write(self, result: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def _finish(self) -> None:
+        pass
+
+    def _flush(self) -> None:
+        # A compressed stream is only flushed at close: a flush per row ruins the ratio
+        if self.compression is None:
+            self._file.flush()
+
+    def _release(self) -> None:
+        if not self._file.closed:
+            self._file.close()
+
+
+class CsvStreamWriter(StreamWriter):
+    """Writes one CSV row per result."""
+
+    name = "CSV"
+    extension = ".csv"
+
+    def __init__(self, output_file: str, include_metadata: bool = True, compression: Optional[str] = None):
+        super().__init__(output_file, compression)
+        self.fieldnames = CSV_FIELDNAMES + (CSV_METADATA_FIELDNAMES if include_metadata else [])
+        self._writer = None
+
+    def _open(self) -> None:
+        self._file = open_text_output(self.output_file, 'w', self.compression, newline='')
+        self._writer = csv.DictWriter(self._file, fieldnames=self.fieldnames, extrasaction='ignore')
+        self._writer.writeheader()
+
+    def _write(self, result: Dict[str, Any]) -> None:
+        row = dict(result)
+        row.setdefault('fichier_source', result.get('_source_file', 'unknown'))
+        row.setdefault('format', result.get('_format', 'unknown'))
+        self._writer.writerow(row)
+
+
+class JsonStreamWriter(StreamWriter):
+    """Writes a JSON array element by element (same layout as json.dump)."""
+
+    name = "JSON"
+    extension = ".json"
+
+    def __init__(self, output_file: str, pretty: bool = True, compression: Optional[str] = None):
+        super().__init__(output_file, compression)
+        self.pretty = pretty
+
+    def _write(self, result: Dict[str, Any]) -> None:
+        prefix = "[" if self.count == 0 else ","
+        if self.pretty:
+            element = json.dumps(result, indent=2, ensure_ascii=False).replace("\n", "\n  ")
+            self._file.write(f"{prefix}\n  {element}")
+        else:
+            separator = "" if self.count == 0 else " "
+            self._file.write(f"{prefix}{separator}{json.dumps(result, ensure_ascii=False)}")
+
+    def _finish(self) -> None:
+        if self.count == 0:
+            self._file.write("[]")
+        else:
+            self._file.write("\n]" if self.pretty else "]")
+
+
+class JsonlStreamWriter(StreamWriter):
+    """
+    Writes one JSON object per line.
+
+    Appendable: with append=True an existing file is extended, and a file
+    cut short by a crash stays valid up to its last complete line.
+    """
+
+    name = "JSONL"
+    extension = ".jsonl"
+
+    def __init__(self, output_file: str, append: bool = False, compression: Optional[str] = None):
+        super().__init__(output_file, compression)
+        self.append = append
+
+    def _open(self) -> None:
+        self._file = open_text_output(self.output_file, 'a' if self.append else 'w', self.compression)
+
+    def _write(self, result: Dict[str, Any]) -> None:
+        self._file.write(json.dumps(result, ensure_ascii=False) + "\n")
+
+
+class AssembledStreamWriter(StreamWriter):
+    """
+    Writer whose header depends on every result (counts, table of contents).
+
+    Bodies are streamed to '<output>.part' and a small index is kept in
+    memory; close() writes the header from the index, then copies the body
+    after it in chunks and removes the part file.
+    """
+
+    def __init__(self, output_file: str, compression: Optional[str] = None):
+        super().__init__(output_file, compression)
+        self.part_file = Path(f"{output_file}.part")
+        self.index: List[tuple] = []
+
+    def _open(self) -> None:
+        self._file = open_text_output(self.part_file, 'w', self.compression)
+
+    def size_on_disk(self) -> int:
+        if self.part_file.exists():
+            return os.path.getsize(self.part_file)
+        return super().size_on_disk()
+
+    def _write(self, result: Dict[str, Any]) -> None:
+        titre = result.get('titre', 'Untitled')
+        success = result.get('success', False)
+        self.index.append((titre, success))
+        self._write_body(len(self.index), titre, success, result)
+
+    def _finish(self) -> None:
+        self._file.close()
+        with open_text_output(self.output_file, 'w', self.compression) as f:
+            self._write_header(f)
+            with open_text_output(self.part_file, 'r', self.compression) as body:
+                shutil.copyfileobj(body, f)
+        os.unlink(self.part_file)
+
+    def _write_body(self, idx: int, titre: str, success: bool, result: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def _write_header(self, f) -> None:
+        raise NotImplementedError
+
+
+class TxtStreamWriter(AssembledStreamWriter):
+    """Simple text report, one block per result."""
+
+    name = "TXT"
+    extension = ".txt"
+
+    def __init__(
+        self,
+        output_file: str,
+        separator: str = "\n" + "="*80 + "\n",
+        compression: Optional[str] = None
+    ):
+        super().__init__(output_file, compression)
+        self.separator = separator
+
+    def _write_body(self, idx: int, titre: str, success: bool, result: Dict[str, Any]) -> None:
+        f = self._file
+        f.write(f"[{idx}] {titre}\n")
+        f.write(f"{'─' * 80}\n")
+
+        if success:
+            f.write(f"{result.get('response', '')}\n")
+        else:
+            f.write(f"❌ ERROR: {result.get('error', '')}\n")
+
+        f.write(self.separator)
+
+    def _write_header(self, f) -> None:
+        f.write("╔" + "═" * 78 + "╗\n")
+        f.write("║" + " " * 20 + "ANALYSIS RESULTS" + " " * 42 + "║\n")
+        f.write("╚" + "═" * 78 + "╝\n\n")
+
+        f.write(f"Date: {datetime.now().strftime('%m/%d/%Y at %H:%M:%S')}\n")
+        f.write(f"Number of conversations: {len(self.index)}\n")
+        f.write(f"{'─' * 80}\n\n")
+
+
+class MarkdownStreamWriter(AssembledStreamWriter):
+    """Markdown report; statistics and table of contents are written last."""
+
+    name = "Markdown"
+    extension = ".md"
+
+    def __init__(self, output_file: str, include_toc: bool = True, compression: Optional[str] = None):
+        super().__init__(output_file, compression)
+        self.include_toc = include_toc
+
+    def _write_body(self, idx: int, titre: str, success: bool, result: Dict[str, Any]) -> None:
+        f = self._file
+        f.write(f"## {idx}. {titre}\n\n")
+
+        # Metadata
+        f.write(f"**Source**: {result.get('_source_file', 'unknown')}  \n")
+        f.write(f"**Format**: {result.get('_format', 'unknown').upper()}  \n")
+        f.write(f"**Tokens**: {result.get('token_count', 0):,}  \n")
+        f.write(f"**Status**: {'✅ Success' if success else '❌ Error'}  \n\n")
+
+        # Content
+        if success:
+            f.write(f"{result.get('response', '')}\n\n")
+        else:
+            f.write(f"**Error**: {result.get('error', '')}\n\n")
+
+        f.write("---\n\n")
+
+    def _write_header(self, f) -> None:
+        f.write("# Conversation Analysis Results\n\n")
+        f.write(f"**Date**: {datetime.now().strftime('%m/%d/%Y at %H:%M:%S')}  \n")
+        f.write(f"**Number of conversations**: {len(self.index)}  \n\n")
+
+        # Quick statistics
+        success_count = sum(1 for _, success in self.index if success)
+        error_count = len(self.index) - success_count
+
+        f.write("## 📊 Statistics\n\n")
+        f.write(f"- ✅ Success: {success_count}\n")
+        f.write(f"- ❌ Errors: {error_count}\n\n")
+        f.write("---\n\n")
+
+        # Table of contents
+        if self.include_toc:
+            f.write("## 📑 Table of Contents\n\n")
+            for idx, (titre, _) in enumerate(self.index, 1):
+                f.write(f"{idx}. [{titre}](#{markdown_anchor(titre)})\n")
+            f.write("\n---\n\n")
+
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY,
+    run_id TEXT,
+    task_id TEXT,
+    conversation_id TEXT,
+    titre_original TEXT,
+    titre TEXT,
+    partie TEXT,
+    source_file TEXT,
+    source_format TEXT,
+    prompt TEXT,
+    prompt_hash TEXT,
+    model TEXT,
+    success INTEGER,
+    cached INTEGER,
+    response TEXT,
+    error TEXT,
+    token_count INTEGER,
+    prompt_tokens INTEGER,
+    completion_tokens INTEGER,
+    total_tokens INTEGER,
+    created_at TEXT,
+    UNIQUE (run_id, task_id)
+);
+CREATE INDEX IF NOT EXISTS idx_results_conversation ON results(conversation_id);
+CREATE INDEX IF NOT EXISTS idx_results_prompt ON results(prompt, created_at);
+CREATE INDEX IF NOT EXISTS idx_results_model ON results(model);
+CREATE INDEX IF NOT EXISTS idx_results_run ON results(run_id);
+CREATE INDEX IF NOT EXISTS idx_results_created ON results(created_at);
+CREATE VIRTUAL TABLE IF NOT EXISTS results_fts USING fts5(
+    response, titre, content='results', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS results_fts_insert AFTER INSERT ON results BEGIN
+    INSERT INTO results_fts(rowid, response, titre) VALUES (new.id, new.response, new.titre);
+END;
+CREATE TRIGGER IF NOT EXISTS results_fts_update AFTER UPDATE ON results BEGIN
+    INSERT INTO results_fts(results_fts, rowid, response, titre) VALUES ('delete', old.id, old.response, old.titre);
+    INSERT INTO results_fts(rowid, response, titre) VALUES (new.id, new.response, new.titre);
+END;
+CREATE TRIGGER IF NOT EXISTS results_fts_delete AFTER DELETE ON results BEGIN
+    INSERT INTO results_fts(results_fts, rowid, response, titre) VALUES ('delete', old.id, old.response, old.titre);
+END;
+"""
+
+SQLITE_COLUMNS = [
+    "run_id", "task_id", "conversation_id", "titre_original", "titre", "partie",
+    "source_file", "source_format", "prompt", "prompt_hash", "model", "success", "cached",
+    "response", "error", "token_count", "prompt_tokens", "completion_tokens", "total_tokens",
+    "created_at"
+]
+
+
+class SqliteStreamWriter(StreamWriter):
+    """
+    Results store: one SQLite database that can hold many runs.
+
+    Rows are indexed on conversation id, prompt, model and run, and the
+    responses (and titles) go to an FTS5 index for query_results_store().
+    Rows are inserted in batches, one transaction per `batch_size` results
+    or `interval` seconds; committed batches are readable mid-run. A task
+    written twice in the same run (--resume) replaces its previous row.
+    """
+
+    name = "SQLite"
+    extension = ".sqlite"
+    compressible = False
+
+    def __init__(
+        self,
+        output_file: str,
+        run_id: str = "",
+        prompt: str = "",
+        prompt_hash: str = "",
+        model: str = "",
+        batch_size: int = 50,
+        interval: float = 2.0
+    ):
+        super().__init__(output_file)
+        self.run_id = run_id
+        self.prompt = prompt
+        self.prompt_hash = prompt_hash
+        self.model = model
+        self.batch_size = max(1, batch_size)
+        self.interval = interval
+        self._pending: List[tuple] = []
+        self._last_commit = time.monotonic()
+
+    def _open(self) -> None:
+        self._file = sqlite3.connect(str(self.output_file))
+        self._file.execute("PRAGMA journal_mode=WAL")
+        self._file.executescript(SQLITE_SCHEMA)
+        self._file.commit()
+
+    def _write(self, result: Dict[str, Any]) -> None:
+        usage = result.get('tokens_used') or {}
+        self._pending.append((
+            self.run_id,
+            result.get('_task_id') or None,
+            result.get('conversation_id', ''),
+            result.get('titre_original', result.get('titre', '')),
+            result.get('titre', 'Untitled'),
+            result.get('partie', ''),
+            result.get('_source_file', 'unknown'),
+            result.get('_format', 'unknown'),
+            self.prompt,
+            self.prompt_hash,
+            result.get('model_used') or self.model,
+            int(bool(result.get('success', False))),
+            int(bool(result.get('cached', False))),
+            result.get('response', ''),
+            result.get('error', ''),
+            result.get('token_count', 0),
+            usage.get('prompt_tokens'),
+            usage.get('completion_tokens'),
+            usage.get('total_tokens'),
+            datetime.now().isoformat(timespec='seconds')
+        ))
+
+    def _flush(self) -> None:
+        if len(self._pending) >= self.batch_size or time.monotonic() - self._last_commit >= self.interval:
+            self._commit()
+
+    def _commit(self) -> None:
+        if self._pending:
+            updates = ", ".join(f"{c} = excluded.{c}" for c in SQLITE_COLUMNS[2:])
+            with self._file:
+                self._file.executemany(
+                    f"INSERT INTO results ({', '.join(SQLITE_COLUMNS)}) "
+                    f"VALUES ({', '.join('?' * len(SQLITE_COLUMNS))}) "
+                    f"ON CONFLICT (run_id, task_id) DO UPDATE SET {updates}",
+                    self._pending
+                )
+            self._pending = []
+        self._last_commit = time.monotonic()
+
+    def _finish(self) -> None:
+        self._commit()
+
+    def _release(self) -> None:
+        self._file.close()
+
+
+class ParquetStreamWriter(StreamWriter):
+    """
+    Columnar output (requires pyarrow).
+
+    Results are buffered and written as one row group every
+    `row_group_size` rows, so memory is bounded by a row group. Columns are
+    typed (booleans, int64 token counts, the tokens_used fields flattened)
+    and compressed, so dataframe tools can load only the columns they need.
+    """
+
+    name = "Parquet"
+    extension = ".parquet"
+    # Compressed internally, per column chunk
+    compressible = False
+
+    def __init__(
+        self,
+        output_file: str,
+        run_id: str = "",
+        row_group_size: int = 1000,
+        compression: str = "zstd"
+    ):
+        super().__init__(output_file)
+        if pa is None:
+            raise ImportError("pyarrow is required for --format parquet (pip install pyarrow)")
+        self.run_id = run_id
+        self.row_group_size = max(1, row_group_size)
+        self.compression = compression
+        self.schema = pa.schema([
+            ("run_id", pa.string()),
+            ("task_id", pa.string()),
+            ("conversation_id", pa.string()),
+            ("titre_original", pa.string()),
+            ("titre", pa.string()),
+            ("partie", pa.string()),
+            ("source_file", pa.string()),
+            ("source_format", pa.string()),
+            ("model", pa.string()),
+            ("success", pa.bool_()),
+            ("cached", pa.bool_()),
+            ("response", pa.string()),
+            ("error", pa.string()),
+            ("token_count", pa.int64()),
+            ("prompt_tokens", pa.int64()),
+            ("completion_tokens", pa.int64()),
+            ("total_tokens", pa.int64())
+        ])
+        self._columns = {name: [] for name in self.schema.names}
+
+    def _open(self) -> None:
+        self._file = pq.ParquetWriter(str(self.output_file), self.schema, compression=self.compression)
+
+    def _write(self, result: Dict[str, Any]) -> None:
+        usage = result.get('tokens_used') or {}
+        row = {
+            "run_id": self.run_id,
+            "task_id": result.get('_task_id', ''),
+            "conversation_id": result.get('conversation_id', ''),
+            "titre_original": result.get('titre_original', result.get('titre', '')),
+            "titre": result.get('titre', 'Untitled'),
+            "partie": result.get('partie', ''),
+            "source_file": result.get('_source_file', 'unknown'),
+            "source_format": result.get('_format', 'unknown'),
+            "model": result.get('model_used', ''),
+            "success": bool(result.get('success', False)),
+            "cached": bool(result.get('cached', False)),
+            "response": result.get('response', ''),
+            "error": result.get('error', ''),
+            "token_count": result.get('token_count', 0),
+            "prompt_tokens": usage.get('prompt_tokens'),
+            "completion_tokens": usage.get('completion_tokens'),
+            "total_tokens": usage.get('total_tokens')
+        }
+        for name, value in row.items():
+            self._columns[name].append(value)
+
+    def _flush(self) -> None:
+        if len(self._columns["titre"]) >= self.row_group_size:
+            self._write_row_group()
+
+    def _write_row_group(self) -> None:
+        if self._columns["titre"]:
+            self._file.write_table(pa.Table.from_pydict(self._columns, schema=self.schema))
+            self._columns = {name: [] for name in self.schema.names}
+
+    def _finish(self) -> None:
+        self._write_row_group()
+
+    def _release(self) -> None:
+        self._file.close()
+
+
+def query_results_store(
+    db_path: str,
+    text: str = "",
+    prompt: Optional[str] = None,
+    model: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    limit: int = 20
+) -> List[Dict[str, Any]]:
+    """
+    Searches a results store.
+
+    Args:
+        db_path: SQLite results store (--format sqlite or --results-store)
+        text: FTS5 query on responses and titles ("" = filters only)
+        prompt: Prompt name
+        model: Model name
+        since: First date (YYYY-MM-DD), inclusive
+        until: Last date (YYYY-MM-DD), inclusive
+        limit: Maximum number of hits
+
+    Returns:
+        List[Dict]: Matching rows, best matches first (newest first without text),
+        with a 'snippet' of the response
+    """
+    conditions, params = [], []
+    if prompt:
+        conditions.append("r.prompt = ?")
+        params.append(prompt)
+    if model:
+        conditions.append("r.model = ?")
+        params.append(model)
+    if since:
+        conditions.append("r.created_at >= ?")
+        params.append(since)
+    if until:
+        conditions.append("r.created_at <= ?")
+        params.append(f"{until}T23:59:59" if len(until) == 10 else until)
+
+    if text:
+        sql = ("SELECT r.*, snippet(results_fts, 0, '[', ']', '…', 16) AS snippet "
+               "FROM results_fts JOIN results r ON r.id = results_fts.rowid "
+               "WHERE results_fts MATCH ?")
+        params.insert(0, text)
+        order = "ORDER BY results_fts.rank"
+    else:
+        sql = "SELECT r.*, substr(r.response, 1, 120) AS snippet FROM results r WHERE 1"
+        order = "ORDER BY r.created_at DESC"
+
+    for condition in conditions:
+        sql += f" AND {condition}"
+    sql += f" {order} LIMIT ?"
+    params.append(limit)
+
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    conn.row_factory = sqlite3.Row
+    try:
+        return [dict(row) for row in conn.execute(sql, params)]
+    finally:
+        conn.close()
+
+
+def iter_results_store(db_path: str, run_id: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Reads results back from a SQLite results store, in insertion order.
+
+    Rows are converted back to the result dicts produced by the engines
+    (tokens_used rebuilt from the token columns), ready for any writer.
+    """
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    conn.row_factory = sqlite3.Row
+    try:
+        sql = "SELECT * FROM results"
+        params: tuple = ()
+        if run_id:
+            sql += " WHERE run_id = ?"
+            params = (run_id,)
+        for row in conn.execute(sql + " ORDER BY id", params):
+            usage = {k: row[k] for k in ("prompt_tokens", "completion_tokens", "total_tokens")
+                     if row[k] is not None}
+            yield {
+                "_task_id": row["task_id"] or "",
+                "conversation_id": row["conversation_id"],
+                "titre_original": row["titre_original"],
+                "titre": row["titre"],
+                "partie": row["partie"],
+                "_source_file": row["source_file"],
+                "_format": row["source_format"],
+                "success": bool(row["success"]),
+                "response": row["response"],
+                "error": row["error"],
+                "token_count": row["token_count"],
+                "model_used": row["model"],
+                "tokens_used": usage,
+                "cached": bool(row["cached"])
+            }
+    finally:
+        conn.close()
+
+
+STREAM_WRITERS = {
+    'csv': CsvStreamWriter,
+    'json': JsonStreamWriter,
+    'jsonl': JsonlStreamWriter,
+    'txt': TxtStreamWriter,
+    'markdown': MarkdownStreamWriter,
+    'sqlite': SqliteStreamWriter,
+    'parquet': ParquetStreamWriter
+}
+
+
+def open_stream_writer(format_name: str, output_file: str, **options) -> StreamWriter:
+    """Creates and opens the streaming writer of `format_name`."""
+    if format_name not in STREAM_WRITERS:
+        raise ValueError(f"Unknown output format: {format_name}")
+    return STREAM_WRITERS[format_name](output_file, **options).open()
+
+
+class RotatingStreamWriter:
+    """
+    Splits the output of one format into numbered shards.
+
+    Shards are named '<base>_0001<ext>[.gz|.zst]', '<base>_0002...' and a
+    new one starts once the current shard holds `max_rows` results or
+    reaches `max_bytes` on disk. Each shard is a complete file of its
+    format (CSV header, JSON array, Markdown TOC...), so consumers can
+    process shards in parallel. The shard list is kept in
+    '<base><ext>.manifest.json', rewritten after every shard.
+    """
+
+    def __init__(
+        self,
+        format_name: str,
+        output_base: str,
+        max_rows: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        compression: Optional[str] = None,
+        **options
+    ):
+        if format_name not in STREAM_WRITERS:
+            raise ValueError(f"Unknown output format: {format_name}")
+        writer_class = STREAM_WRITERS[format_name]
+
+        self.format_name = format_name
+        self.name = writer_class.name
+        self.output_base = output_base
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.compression = compression
+        self.options = {**options, 'compression': compression} if compression else options
+        self.suffix = writer_class.extension + COMPRESSION_SUFFIXES.get(compression, '')
+        self.output_file = Path(f"{output_base}{writer_class.extension}.manifest.json")
+
+        self.shards: List[Dict[str, Any]] = []
+        self.count = 0
+        self.failed = False
+        self._current: Optional[StreamWriter] = None
+
+    def open(self) -> 'RotatingStreamWriter':
+        self._next_shard()
+        return self
+
+    def _next_shard(self) -> None:
+        if self._current is not None:
+            self._close_shard()
+        path = f"{self.output_base}_{len(self.shards) + 1:04d}{self.suffix}"
+        self._current = open_stream_writer(self.format_name, path, **self.options)
+        self.failed = self.failed or self._current.failed
+
+    def _close_shard(self) -> None:
+        shard = self._current
+        self._current = None
+        if not shard.close():
+            self.failed = True
+        self.shards.append({
+            'file': shard.output_file.name,
+            'rows': shard.count,
+            'bytes': shard.size_on_disk()
+        })
+        self._write_manifest(complete=False)
+
+    def _write_manifest(self, complete: bool) -> None:
+        manifest = {
+            'format': self.format_name,
+            'compression': self.compression,
+            'complete': complete,
+            'total_rows': sum(shard['rows'] for shard in self.shards),
+            'updated': datetime.now().isoformat(timespec='seconds'),
+            'shards': self.shards
+        }
+        temp_file = Path(f"{self.output_file}.tmp")
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2, ensure_ascii=False)
+        os.replace(temp_file, self.output_file)
+
+    def _shard_full(self) -> bool:
+        if self.max_rows and self._current.count >= self.max_rows:
+            return True
+        return bool(self.max_bytes) and self._current.size_on_disk() >= self.max_bytes
+
+    def write(self, result: Dict[str, Any]) -> None:
+        if self._current is None or self.failed:
+            return
+        if self._current.count > 0 and self._shard_full():
+            self._next_shard()
+        self._current.write(result)
+        if self._current.failed:
+            self.failed = True
+        else:
+            self.count += 1
+
+    def close(self) -> bool:
+        if self._current is not None:
+            self._close_shard()
+            self._write_manifest(complete=True)
+        return not self.failed
+
+
+class MultiStreamWriter:
+    """Feeds one result stream to several writers in a single pass."""
+
+    def __init__(self, writers: List[StreamWriter]):
+        self.writers = writers
+
+    @property
+    def count(self) -> int:
+        return max((w.count for w in self.writers), default=0)
+
+    def write(self, result: Dict[str, Any]) -> None:
+        for writer in self.writers:
+            writer.write(result)
+
+    def close(self) -> bool:
+        """Closes every writer; True if all of them succeeded."""
+        results = [writer.close() for writer in self.writers]
+        return all(results)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
 
 class ResultFormatter:
     """Formats and saves results in different formats."""
 
+    @staticmethod
+    def _save(writer: StreamWriter, results: List[Dict[str, Any]]) -> bool:
+        with writer:
+            for result in results:
+                writer.write(result)
+        return not writer.failed
+
     @staticmethod
     def save_csv(
         results: List[Dict[str, Any]],
@@ -34,47 +875,7 @@ class ResultFormatter:
         Returns:
             bool: True if success, False otherwise
         """
-        try:
-            with open(output_file, 'w', encoding='utf-8', newline='') as f:
-                fieldnames = [
-                    "conversation_id",
-                    "titre_original",
-                    "titre",
-                    "partie",
-                    "response",
-                    "success",
-                    "error",
-                    "token_count"
-                ]
-
-                if include_metadata:
-                    fieldnames.extend([
-                        "fichier_source",
-                        "format",
-                        "model_used"
-                    ])
-
-                writer = csv.DictWriter(
-                    f,
-                    fieldnames=fieldnames,
-                    extrasaction='ignore'
-                )
-                writer.writeheader()
-
-                # Prepare data
-                for r in results:
-                    if 'fichier_source' not in r:
-                        r['fichier_source'] = r.get('_source_file', 'unknown')
-                    if 'format' not in r:
-                        r['format'] = r.get('_format', 'unknown')
-
-                writer.writerows(results)
-
-            return True
-
-        except Exception as e:
-            print(f"❌ CSV save error: {e}")
-            return False
+        return ResultFormatter._save(CsvStreamWriter(output_file, include_metadata), results)
 
     @staticmethod
     def save_json(
@@ -93,18 +894,26 @@ class ResultFormatter:
         Returns:
             bool: True if success, False otherwise
         """
-        try:
-            with open(output_file, 'w', encoding='utf-8') as f:
-                if pretty:
-                    json.dump(results, f, indent=2, ensure_ascii=False)
-                else:
-                    json.dump(results, f, ensure_ascii=False)
+        return ResultFormatter._save(JsonStreamWriter(output_file, pretty), results)
 
-            return True
+    @staticmethod
+    def save_jsonl(
+        results: List[Dict[str, Any]],
+        output_file: str,
+        append: bool = False
+    ) -> bool:
+        """
+        Saves results in JSON Lines format (one object per line).
 
-        except Exception as e:
-            print(f"❌ JSON save error: {e}")
-            return False
+        Args:
+            results: List of results
+            output_file: Output file path
+            append: Extend an existing file instead of replacing it
+
+        Returns:
+            bool: True if success, False otherwise
+        """
+        return ResultFormatter._save(JsonlStreamWriter(output_file, append), results)
 
     @staticmethod
     def save_txt(
@@ -123,39 +932,7 @@ class ResultFormatter:
         Returns:
             bool: True if success, False otherwise
         """
-        try:
-            with open(output_file, 'w', encoding='utf-8') as f:
-                # Header
-                f.write("╔" + "═" * 78 + "╗\n")
-                f.write("║" + " " * 20 + "ANALYSIS RESULTS" + " " * 42 + "║\n")
-                f.write("╚" + "═" * 78 + "╝\n\n")
-
-                f.write(f"Date: {datetime.now().strftime('%m/%d/%Y at %H:%M:%S')}\n")
-                f.write(f"Number of conversations: {len(results)}\n")
-                f.write(f"{'─' * 80}\n\n")
-
-                # Results
-                for idx, result in enumerate(results, 1):
-                    titre = result.get('titre', 'Untitled')
-                    success = result.get('success', False)
-                    response = result.get('response', '')
-                    error = result.get('error', '')
-
-                    f.write(f"[{idx}] {titre}\n")
-                    f.write(f"{'─' * 80}\n")
-
-                    if success:
-                        f.write(f"{response}\n")
-                    else:
-                        f.write(f"❌ ERROR: {error}\n")
-
-                    f.write(separator)
-
-            return True
-
-        except Exception as e:
-            print(f"❌ TXT save error: {e}")
-            return False
+        return ResultFormatter._save(TxtStreamWriter(output_file, separator), results)
 
     @staticmethod
     def save_markdown(
@@ -174,60 +951,4 @@ class ResultFormatter:
         Returns:
             bool: True if success, False otherwise
         """
-        try:
-            with open(output_file, 'w', encoding='utf-8') as f:
-                # Header
-                f.write("# Conversation Analysis Results\n\n")
-                f.write(f"**Date**: {datetime.now().strftime('%m/%d/%Y at %H:%M:%S')}  \n")
-                f.write(f"**Number of conversations**: {len(results)}  \n\n")
-
-                # Quick statistics
-                success_count = sum(1 for r in results if r.get('success', False))
-                error_count = len(results) - success_count
-
-                f.write("## 📊 Statistics\n\n")
-                f.write(f"- ✅ Success: {success_count}\n")
-                f.write(f"- ❌ Errors: {error_count}\n\n")
-                f.write("---\n\n")
-
-                # Table of contents
-                if include_toc:
-                    f.write("## 📑 Table of Contents\n\n")
-                    for idx, result in enumerate(results, 1):
-                        titre = result.get('titre', 'Untitled')
-                        anchor = titre.lower().replace(' ', '-')
-                        anchor = ''.join(c for c in anchor if c.isalnum() or c == '-')
-                        f.write(f"{idx}. [{titre}](#{anchor})\n")
-                    f.write("\n---\n\n")
-
-                # Detailed results
-                for idx, result in enumerate(results, 1):
-                    titre = result.get('titre', 'Untitled')
-                    success = result.get('success', False)
-                    response = result.get('response', '')
-                    error = result.get('error', '')
-                    token_count = result.get('token_count', 0)
-                    source_file = result.get('_source_file', 'unknown')
-                    format_type = result.get('_format', 'unknown')
-
-                    f.write(f"## {idx}. {titre}\n\n")
-
-                    # Metadata
-                    f.write(f"**Source**: {source_file}  \n")
-                    f.write(f"**Format**: {format_type.upper()}  \n")
-                    f.write(f"**Tokens**: {token_count:,}  \n")
-                    f.write(f"**Status**: {'✅ Success' if success else '❌ Error'}  \n\n")
-
-                    # Content
-                    if success:
-                        f.write(f"{response}\n\n")
-                    else:
-                        f.write(f"**Error**: {error}\n\n")
-
-                    f.write("---\n\n")
-
-            return True
-
-        except Exception as e:
-            print(f"❌ Markdown save error: {e}")
-            return False
+        return ResultFormatter._save(MarkdownStreamWriter(output_file, include_toc), results)
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Deferred Retry Module
+Retry policy, deferred retry queue and circuit breaker shared by the engines
+"""
+
+import time
+import heapq
+import random
+import itertools
+import threading
+from collections import deque
+from typing import Any, Callable, List, Optional
+
+
+class RetryPolicy:
+    """
+    Jittered exponential backoff that honors the server's Retry-After.
+
+    Without Retry-After, attempt n waits between half and all of
+    min(cap, base * 2**(n-1)) seconds ("equal jitter"), so retries from many
+    conversations do not hit the API at the same instant.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 3,
+        base_delay: float = 2.0,
+        max_delay: float = 60.0,
+        rng: Optional[random.Random] = None
+    ):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.rng = rng or random.Random()
+
+    def can_retry(self, attempt: int) -> bool:
+        """True if a request that just failed on `attempt` (1-based) may be retried."""
+        return attempt < self.max_attempts
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Seconds to wait before the next attempt."""
+        if retry_after is not None and retry_after >= 0:
+            # Small jitter on top so that every deferred request does not fire together
+            return retry_after + self.rng.uniform(0, min(1.0, retry_after * 0.1 + 0.1))
+        backoff = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        return backoff / 2 + self.rng.uniform(0, backoff / 2)
+
+
+class DeferredRetryQueue:
+    """Thread-safe min-heap of items that become ready at a given time."""
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self.clock = clock
+        self._heap: List[tuple] = []
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._heap)
+
+    def push(self, item: Any, delay: float) -> None:
+        with self._lock:
+            heapq.heappush(self._heap, (self.clock() + delay, next(self._counter), item))
+
+    def pop_ready(self) -> Optional[Any]:
+        """Returns the oldest item whose delay has expired, or None."""
+        with self._lock:
+            if self._heap and self._heap[0][0] <= self.clock():
+                return heapq.heappop(self._heap)[2]
+            return None
+
+    def next_ready_in(self) -> Optional[float]:
+        """Seconds until the next item is ready (0 if one is ready, None if empty)."""
+        with self._lock:
+            if not self._heap:
+                return None
+            return max(0.0, self._heap[0][0] - self.clock())
+
+
+class CircuitBreaker:
+    """
+    Pauses dispatch globally when the error rate spikes.
+
+    Outcomes of the last `window` attempts are tracked. When at least
+    `min_samples` are known and the share of retryable errors reaches
+    `threshold`, the breaker opens for `cooldown` seconds. It then lets a
+    single probe through (half-open): a success closes it, a failure opens
+    it again.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.5,
+        window: int = 20,
+        min_samples: int = 10,
+        cooldown: float = 30.0,
+        on_change: Optional[Callable[[str, str], None]] = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.threshold = threshold
+        self.min_samples = min_samples
+        self.cooldown = cooldown
+        self.on_change = on_change
+        self.clock = clock
+
+        self.state = 'closed'
+        self.opened_count = 0
+        self._outcomes = deque(maxlen=window)
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def _set_state(self, state: str, reason: str) -> None:
+        self.state = state
+        if self.on_change is not None:
+            self.on_change(state, reason)
+
+    def wait_time(self) -> float:
+        """Seconds until dispatch may resume (0 if a request may be sent now)."""
+        with self._lock:
+            if self.state == 'closed':
+                return 0.0
+            if self.state == 'open':
+                remaining = self._opened_at + self.cooldown - self.clock()
+                if remaining > 0:
+                    return remaining
+                self._set_state('half-open', "cooldown elapsed, probing")
+            # Half-open: only one probe at a time
+            return 0.0 if not self._probe_in_flight else self.cooldown / 10
+
+    def allow(self) -> bool:
+        """Claims the right to dispatch one request."""
+        if self.wait_time() > 0:
+            return False
+        with self._lock:
+            if self.state == 'half-open':
+                if self._probe_in_flight:
+                    return False
+                self._probe_in_flight = True
+            return True
+
+    def record(self, success: bool) -> None:
+        """Feeds the outcome of one attempt (False = retryable error)."""
+        with self._lock:
+            if self.state == 'half-open':
+                self._probe_in_flight = False
+                if success:
+                    self._outcomes.clear()
+                    self._set_state('closed', "probe succeeded")
+                else:
+                    self._open("probe failed")
+                return
+
+            self._outcomes.append(success)
+            if self.state == 'closed' and len(self._outcomes) >= self.min_samples:
+                error_rate = self._outcomes.count(False) / len(self._outcomes)
+                if error_rate >= self.threshold:
+                    self._open(f"error rate {error_rate:.0%} over last {len(self._outcomes)} attempts")
+
+    def _open(self, reason: str) -> None:
+        self._opened_at = self.clock()
+        self.opened_count += 1
+        self._outcomes.clear()
+        self._set_state('open', reason)
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Run Journal Module
+Write-ahead JSONL journal of results, used to resume interrupted runs
+"""
+
+import os
+import json
+import time
+import random
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, Optional, Tuple
+
+
+class RunJournal:
+    """
+    Append-only journal of the results of one run.
+
+    Each final result is appended as soon as it is known and the file is
+    fsynced every `batch_size` records or `interval` seconds, so a crash or
+    a Ctrl-C loses at most one batch. Results are keyed by their stable
+    '_task_id'; when a task appears several times (retry-failed, resume)
+    the last record wins.
+
+    File layout (one JSON object per line):
+        {"type": "run", "run_id": ..., ...}       header, once per (re)start
+        {"type": "result", "_task_id": ..., ...}  one per final result
+    """
+
+    def __init__(
+        self,
+        path: str,
+        run_id: str,
+        batch_size: int = 20,
+        interval: float = 2.0
+    ):
+        self.path = Path(path)
+        self.run_id = run_id
+        self.batch_size = max(1, batch_size)
+        self.interval = interval
+        self.written = 0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, 'a', encoding='utf-8')
+        self._pending = 0
+        self._last_sync = time.monotonic()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def new_run_id() -> str:
+        """Sortable, human readable run id (timestamp + random suffix)."""
+        return f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{random.randrange(16 ** 4):04x}"
+
+    @staticmethod
+    def path_for(directory: str, run_id: str) -> Path:
+        return Path(directory) / f"run_{run_id}.jsonl"
+
+    def write_header(self, **metadata) -> None:
+        """Records the (re)start of the run with its parameters."""
+        self._write({'type': 'run', 'run_id': self.run_id,
+                     'started': datetime.now().isoformat(timespec='seconds'), **metadata})
+        self.sync()
+
+    def append(self, result: Dict[str, Any]) -> None:
+        """Appends one final result."""
+        self._write({'type': 'result', **result})
+        self.written += 1
+
+    def _write(self, record: Dict[str, Any]) -> None:
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._pending += 1
+            due = (self._pending >= self.batch_size
+                   or time.monotonic() - self._last_sync >= self.interval)
+        if due:
+            self.sync()
+
+    def sync(self) -> None:
+        """Flushes pending records to disk."""
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._pending = 0
+            self._last_sync = time.monotonic()
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self.sync()
+            with self._lock:
+                self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @staticmethod
+    def load(path: str) -> Tuple[Optional[Dict[str, Any]], Dict[str, Dict[str, Any]]]:
+        """
+        Reads a journal back.
+
+        A truncated last line (crash during a write) is ignored.
+
+        Returns:
+            tuple: (first header or None, {task_id: latest result})
+        """
+        header = None
+        results: Dict[str, Dict[str, Any]] = {}
+
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                kind = record.pop('type', None)
+                if kind == 'run':
+                    header = header or record
+                elif kind == 'result' and record.get('_task_id'):
+                    # Re-insert so that dict order follows the latest record
+                    results.pop(record['_task_id'], None)
+                    results[record['_task_id']] = record
+
+        return header, results
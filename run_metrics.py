@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Run Metrics Module
+Per-stage timings and per-request latency, queue wait and token statistics
+"""
+
+import json
+import time
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Any, Callable
+
+from execution_engine import EngineObserver
+
+STAGES = ['discovery', 'load', 'dedup', 'extraction', 'splitting', 'dispatch', 'save']
+
+
+def percentile(values: List[float], p: float) -> float:
+    """Linear-interpolated percentile of `values` (0 for an empty list)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * p / 100.0
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def distribution(values: List[float]) -> Dict[str, float]:
+    """p50/p95/p99, mean and max of a list of durations, rounded to the millisecond."""
+    return {
+        'count': len(values),
+        'p50': round(percentile(values, 50), 3),
+        'p95': round(percentile(values, 95), 3),
+        'p99': round(percentile(values, 99), 3),
+        'mean': round(sum(values) / len(values), 3) if values else 0.0,
+        'max': round(max(values), 3) if values else 0.0
+    }
+
+
+class RunMetrics(EngineObserver):
+    """
+    Collects the timings of one run.
+
+    Stages are timed with the stage() context manager; a stage entered
+    several times (extraction and splitting run once per conversation)
+    accumulates. Requests are reported by the execution engine through the
+    EngineObserver hook, one record per attempt, so retried attempts keep
+    their own latency. With a profiler (profiler.StageProfiler), every
+    stage also runs under it. `simulated` marks a run whose answers were
+    not produced by the API (--simulate, --virtual).
+    """
+
+    def __init__(self, run_id: str = "", clock: Callable[[], float] = time.perf_counter, profiler=None,
+                 simulated: bool = False):
+        self.run_id = run_id
+        self.clock = clock
+        self.profiler = profiler
+        self.simulated = simulated
+        self.stages: Dict[str, float] = {}
+        self.attempts: List[Dict[str, Any]] = []
+        self._started = clock()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str):
+        debut = self.clock()
+        try:
+            if self.profiler is not None:
+                with self.profiler.stage(name):
+                    yield
+            else:
+                yield
+        finally:
+            with self._lock:
+                self.stages[name] = self.stages.get(name, 0.0) + self.clock() - debut
+
+    def request_completed(
+        self,
+        conv: Dict[str, Any],
+        attempt: int,
+        result: Dict[str, Any],
+        timing: Dict[str, float],
+        final: bool
+    ) -> None:
+        tokens = result.get('tokens_used') or {}
+        record = {
+            'task_id': result.get('_task_id', conv.get('_task_id', '')),
+            'titre': result.get('titre', ''),
+            'attempt': attempt,
+            'final': final,
+            'success': bool(result.get('success')),
+            'cached': bool(result.get('cached')),
+            'model': result.get('model_used', result.get('model', '')),
+            'queue_wait': round(timing.get('wait', 0.0), 4),
+            'latency': round(timing.get('latency', 0.0), 4),
+            'prompt_tokens': int(tokens.get('prompt_tokens', 0) or 0),
+            'completion_tokens': int(tokens.get('completion_tokens', 0) or 0)
+        }
+        with self._lock:
+            self.attempts.append(record)
+
+    def summary(self) -> Dict[str, Any]:
+        """Aggregated, JSON-ready view of the run."""
+        with self._lock:
+            attempts = list(self.attempts)
+            stages = dict(self.stages)
+
+        finals = [a for a in attempts if a['final']]
+        api_calls = [a for a in attempts if not a['cached']]
+        # Cache hits keep the usage of the original call: it was not sent again
+        prompt_tokens = sum(a['prompt_tokens'] for a in api_calls)
+        completion_tokens = sum(a['completion_tokens'] for a in api_calls)
+        cached_tokens = sum(a['prompt_tokens'] + a['completion_tokens'] for a in attempts if a['cached'])
+        dispatch = stages.get('dispatch', 0.0)
+
+        return {
+            'run_id': self.run_id,
+            'generated': datetime.now().isoformat(timespec='seconds'),
+            'wall_time': round(self.clock() - self._started, 3),
+            'simulated': self.simulated,
+            'stages': {name: round(stages[name], 3) for name in
+                       [s for s in STAGES if s in stages] + [s for s in stages if s not in STAGES]},
+            'requests': {
+                'final': len(finals),
+                'attempts': len(attempts),
+                'success': sum(1 for a in finals if a['success']),
+                'failed': sum(1 for a in finals if not a['success']),
+                'cached': sum(1 for a in finals if a['cached']),
+                'retries': len(attempts) - len(finals)
+            },
+            'latency': distribution([a['latency'] for a in api_calls]),
+            'queue_wait': distribution([a['queue_wait'] for a in api_calls]),
+            'tokens': {
+                'prompt': prompt_tokens,
+                'completion': completion_tokens,
+                'total': prompt_tokens + completion_tokens,
+                'cached': cached_tokens
+            },
+            'throughput': {
+                'requests_per_s': round(len(finals) / dispatch, 3) if dispatch else 0.0,
+                'tokens_per_s': round((prompt_tokens + completion_tokens) / dispatch, 1) if dispatch else 0.0
+            }
+        }
+
+    def save(self, path: str) -> Dict[str, Any]:
+        """Writes the summary and every attempt to `path` (JSON) and returns the summary."""
+        summary = self.summary()
+        with self._lock:
+            attempts = list(self.attempts)
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({**summary, 'attempts': attempts}, f, ensure_ascii=False, indent=2)
+        return summary
+
+    @staticmethod
+    def path_for(directory: str, run_id: str) -> Path:
+        return Path(directory) / f"run_{run_id}.metrics.json"
+
+
+def format_summary(summary: Dict[str, Any]) -> List[str]:
+    """Console lines for the final report."""
+    stages = summary['stages']
+    total = sum(stages.values()) or 1.0
+    lines = ["⏱️  Stages: " + ", ".join(
+        f"{name} {seconds:.2f}s ({seconds / total * 100:.0f}%)" for name, seconds in stages.items()
+    )]
+
+    latency = summary['latency']
+    if latency['count']:
+        wait = summary['queue_wait']
+        lines.append(f"📡 Latency p50/p95/p99: {latency['p50']:.2f}s / {latency['p95']:.2f}s / "
+                     f"{latency['p99']:.2f}s (queue wait p50 {wait['p50']:.2f}s, p95 {wait['p95']:.2f}s)")
+
+    throughput = summary['throughput']
+    tokens = summary['tokens']
+    lines.append(f"🚄 Throughput: {throughput['requests_per_s']:.2f} req/s, "
+                 f"{throughput['tokens_per_s']:.0f} tokens/s "
+                 f"({tokens['prompt']:,} prompt + {tokens['completion']:,} completion tokens"
+                 + (f", {tokens['cached']:,} more served from cache)" if tokens.get('cached') else ")"))
+    return lines
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Simulation Module
+Discrete-event replay of a run on a virtual clock (--virtual)
+"""
+
+import time
+import heapq
+import itertools
+from collections import deque
+from typing import Dict, List, Any, Callable, Optional
+
+from benchmark import MockMistralServer
+from concurrency import AdaptiveConcurrency
+from execution_engine import EngineObserver, ObserverGroup, WorkSource, terminer_tentative
+from prompt_executor import (
+    PromptExecutor, DEFAULT_MAX_TOKENS, conversation_base_result,
+    build_conversation_result, attach_timing, failure_result
+)
+from rate_limiter import RateLimiter
+from retry_queue import RetryPolicy, CircuitBreaker
+from run_metrics import RunMetrics, distribution
+
+
+class VirtualClock:
+    """Clock that only moves when the simulation advances it (callable like time.monotonic)."""
+
+    def __init__(self, start: float = 0.0):
+        self.now = start
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, when: float) -> None:
+        self.now = max(self.now, when)
+
+
+class VirtualRun:
+    """
+    Replays the thread engine's scheduling on a virtual clock.
+
+    The scheduler pieces are the real ones, built on the virtual clock:
+    WorkSource (deferred retries, circuit breaker), RateLimiter,
+    AdaptiveConcurrency, RetryPolicy and RunMetrics. Only the waits are
+    replaced by events: pacing, concurrency slots and API calls are
+    scheduled on a heap instead of slept, and the API is a
+    MockMistralServer answering through respond() (token-proportional
+    latency, provider quota, 429 with Retry-After, 5xx). A job of tens of
+    thousands of requests therefore runs in seconds.
+
+    A timeline point is recorded every `interval` virtual seconds. The
+    latency of the report covers answered calls only: 429 and 5xx answers
+    come back at once and would drag the percentiles down, so they are
+    reported apart as `error_latency`.
+    """
+
+    def __init__(
+        self,
+        conversations: List[Dict[str, Any]],
+        server: MockMistralServer,
+        clock: VirtualClock,
+        workers: int,
+        template_tokens: int = 0,
+        delay: float = 0.5,
+        rate_limiter: Optional[RateLimiter] = None,
+        concurrency: Optional[AdaptiveConcurrency] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        observer: Optional[EngineObserver] = None,
+        interval: float = 60.0,
+        model: str = 'simulated'
+    ):
+        self.conversations = conversations
+        self.server = server
+        self.clock = clock
+        self.workers = workers
+        self.template_tokens = template_tokens
+        self.delay = delay
+        self.rate_limiter = rate_limiter
+        self.concurrency = concurrency
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.circuit_breaker = circuit_breaker
+        self.interval = interval
+        self.model = model
+
+        self.metrics = RunMetrics(clock=clock, simulated=True)
+        self.observer = ObserverGroup([self.metrics, observer])
+        self.source = WorkSource(conversations, self.retry_policy, circuit_breaker,
+                                 observer=self.observer, clock=clock)
+        self.timeline: List[Dict[str, Any]] = []
+        self.status_counts: Dict[str, int] = {}
+
+        self._events: List[tuple] = []
+        self._sequence = itertools.count()
+        self._pool_size = concurrency.maximum if concurrency is not None else max(1, workers)
+        self._idle = self._pool_size
+        self._waiting_slot = deque()
+        self._wake_at: Optional[float] = None
+        self._final = 0
+        self._next_sample = 0.0
+        self._window = {'requests': 0, 'tokens': 0, 'throttled': 0}
+
+    # ------------------------------------------------------------------
+    # Events
+    # ------------------------------------------------------------------
+
+    def _schedule(self, when: float, action: Callable, *args) -> None:
+        heapq.heappush(self._events, (when, next(self._sequence), action, args))
+
+    def _prompt_tokens(self, conv: Dict[str, Any]) -> int:
+        token_count = conv.get('token_count')
+        if token_count is None:
+            from utils import compter_tokens
+            token_count = conv['token_count'] = compter_tokens("\n".join(conv.get('messages', [])))
+        return token_count + self.template_tokens
+
+    def _dispatch(self) -> None:
+        """Hands work to idle workers, as the engine's dispatch loop does."""
+        while self._idle > 0:
+            item, wait_hint = self.source.next_item()
+            if item is None:
+                if wait_hint is not None:
+                    quand = self.clock() + wait_hint
+                    if self._wake_at is None or quand < self._wake_at:
+                        self._wake_at = quand
+                        self._schedule(quand, self._wake)
+                return
+            self._idle -= 1
+            dispatched = self.clock()
+            self.observer.request_started(item[0], item[1])
+            if self.concurrency is not None and not self.concurrency.try_acquire():
+                self._waiting_slot.append((item, dispatched))
+                continue
+            self._start(item, dispatched)
+
+    def _wake(self) -> None:
+        self._wake_at = None
+        self._dispatch()
+
+    def _start(self, item, dispatched: float) -> None:
+        """The worker holds a concurrency slot: pacing wait, then the API call."""
+        started = self.clock()
+        tokens = self._prompt_tokens(item[0])
+        if self.rate_limiter is not None:
+            attente = self.rate_limiter.reserve(tokens + DEFAULT_MAX_TOKENS)
+        else:
+            attente = self.delay
+        self._schedule(started + attente, self._send, item, dispatched, started, tokens)
+
+    def _send(self, item, dispatched: float, started: float, tokens: int) -> None:
+        status, duree, completion, retry_after = self.server.respond(tokens, DEFAULT_MAX_TOKENS)
+        if status == 200:
+            result = {
+                'success': True,
+                'response': f"[VIRTUAL] {completion} tokens",
+                'model': self.model,
+                'tokens_used': {'prompt_tokens': tokens, 'completion_tokens': completion,
+                                'total_tokens': tokens + completion}
+            }
+        else:
+            result = failure_result(f"HTTP {status}: simulated", True, status, retry_after)
+        self._schedule(self.clock() + duree, self._complete, item, dispatched, started,
+                       self.clock(), status, result)
+
+    def _complete(self, item, dispatched: float, started: float, sent: float, status: int,
+                  result: Dict[str, Any]) -> None:
+        latence = self.clock() - sent
+        if self.concurrency is not None:
+            self.concurrency.record_response(status, latence)
+        if status == 429 and self.rate_limiter is not None:
+            # Shared back-off, as PromptExecutor does
+            self.rate_limiter.pause(PromptExecutor.retry_delay(429, 0, result.get('retry_after')))
+
+        cle = str(status)
+        self.status_counts[cle] = self.status_counts.get(cle, 0) + 1
+        self._window['requests'] += 1
+        self._window['throttled'] += status == 429
+        self._window['tokens'] += sum((result.get('tokens_used') or {}).get(k, 0)
+                                      for k in ('prompt_tokens', 'completion_tokens'))
+
+        if self.concurrency is not None:
+            self.concurrency.release()
+            while self._waiting_slot and self.concurrency.try_acquire():
+                self._start(*self._waiting_slot.popleft())
+        self._idle += 1
+
+        final = build_conversation_result(conversation_base_result(item[0]), result, item[0].get('token_count', 0))
+        attach_timing(final, 0.0, sent - started, latence)
+        if terminer_tentative(self.source, item, final, dispatched, started, self.observer):
+            self._final += 1
+        self._dispatch()
+
+    # ------------------------------------------------------------------
+    # Timeline
+    # ------------------------------------------------------------------
+
+    def _sample_until(self, when: float) -> None:
+        while self._next_sample <= when:
+            self._sample(self._next_sample)
+            self._next_sample += self.interval
+
+    def _sample(self, when: float) -> None:
+        self.timeline.append({
+            'time': round(when, 1),
+            'completed': self._final,
+            'in_flight': self._pool_size - self._idle,
+            'deferred': len(self.source.retry_queue),
+            'limit': self.concurrency.limit if self.concurrency is not None else self._pool_size,
+            'requests': self._window['requests'],
+            'tokens': self._window['tokens'],
+            'throttled': self._window['throttled'],
+            'breaker': self.circuit_breaker.state if self.circuit_breaker is not None else 'closed'
+        })
+        self._window = {'requests': 0, 'tokens': 0, 'throttled': 0}
+
+    # ------------------------------------------------------------------
+    # Run
+    # ------------------------------------------------------------------
+
+    def run(self) -> Dict[str, Any]:
+        """Runs the simulation to the end and returns its report."""
+        debut = time.perf_counter()
+        with self.metrics.stage('dispatch'):
+            self._dispatch()
+            while self._events:
+                quand, _, action, args = heapq.heappop(self._events)
+                self._sample_until(quand)
+                self.clock.advance(quand)
+                action(*args)
+        self._sample(self.clock())
+
+        summary = self.metrics.summary()
+        summary.pop('generated', None)
+        summary.pop('run_id', None)
+        appels = [a for a in self.metrics.attempts if not a['cached']]
+        summary['latency'] = distribution([a['latency'] for a in appels if a['success']])
+        summary['error_latency'] = distribution([a['latency'] for a in appels if not a['success']])
+        return {
+            'virtual_seconds': round(self.clock(), 1),
+            'real_seconds': round(time.perf_counter() - debut, 3),
+            'conversations': len(self.conversations),
+            'statuses': dict(sorted(self.status_counts.items())),
+            'metrics': summary,
+            'concurrency': self.concurrency.summary() if self.concurrency is not None else None,
+            'circuit_breaker_opened': self.circuit_breaker.opened_count if self.circuit_breaker is not None else 0,
+            'server': dict(self.server.stats),
+            'timeline': self.timeline
+        }
+
+
+def format_report(report: Dict[str, Any], max_rows: int = 24) -> List[str]:
+    """Console lines of a simulation report: timeline (at most `max_rows` rows) and totals."""
+    from progress import format_duree
+    from run_metrics import format_summary
+
+    requetes = report['metrics']['requests']
+    lignes = [
+        f"🕰️  Virtual run: {format_duree(report['virtual_seconds'])} projected "
+        f"(simulated in {report['real_seconds']:.1f}s)",
+        f"   {report['conversations']:,} requests: {requetes['success']:,} ok, {requetes['failed']:,} failed, "
+        f"{requetes['retries']:,} retries; HTTP " + ", ".join(
+            f"{statut}: {nombre:,}" for statut, nombre in report['statuses'].items()),
+        ""
+    ]
+
+    points = report['timeline']
+    pas = max(1, -(-len(points) // max_rows))
+    lignes.append(f"   {'time':>9} {'done':>8} {'in flight':>9} {'deferred':>8} {'limit':>5} "
+                  f"{'req':>6} {'tokens':>10} {'429':>5}  breaker")
+    indices = list(range(0, len(points), pas))
+    if indices[-1] != len(points) - 1:
+        indices.append(len(points) - 1)
+    precedent = -1
+    for index in indices:
+        # Window counters are summed over the points folded into this row
+        groupe = points[precedent + 1:index + 1]
+        precedent = index
+        point = points[index]
+        lignes.append(
+            f"   {format_duree(point['time']):>9} {point['completed']:>8,} {point['in_flight']:>9} "
+            f"{point['deferred']:>8} {point['limit']:>5} {sum(p['requests'] for p in groupe):>6,} "
+            f"{sum(p['tokens'] for p in groupe):>10,} {sum(p['throttled'] for p in groupe):>5}  {point['breaker']}"
+        )
+
+    lignes.append("")
+    lignes.extend(f"   {ligne}" for ligne in format_summary(report['metrics'])[1:])
+    erreurs = report['metrics'].get('error_latency') or {}
+    if erreurs.get('count'):
+        lignes.append(f"   ⚠️  {erreurs['count']:,} throttled or failed calls (not in latency): "
+                      f"p50 {erreurs['p50']:.2f}s, max {erreurs['max']:.2f}s")
+    if report['concurrency']:
+        c = report['concurrency']
+        lignes.append(f"   📈 Concurrency: peak {c['peak']}, final {c['current']} "
+                      f"({c['increases']} increases, {c['decreases']} decreases)")
+    if report['circuit_breaker_opened']:
+        lignes.append(f"   🔌 Circuit breaker opened {report['circuit_breaker_opened']} time(s)")
+    return lignes
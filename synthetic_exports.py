@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Synthetic Exports Module
+Deterministic generator of ChatGPT, Claude and LeChat exports for load and memory tests
+
+Usage:
+    python synthetic_exports.py --format chatgpt --conversations 50000 -o bench_data/
+    python synthetic_exports.py --format all --size-mb 2048 --seed 7 -o bench_data/
+"""
+
+import os
+import sys
+import json
+import math
+import random
+import argparse
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Any, Tuple
+
+EXPORT_FORMATS = ['chatgpt', 'claude', 'lechat']
+
+# Fixed epoch so that a given seed always produces the same bytes
+BASE_TIME = 1700000000.0
+
+VOCABULAIRES = {
+    'en': ("the a of to and in is it that for on with as this be are was by not or from at have an "
+           "they which you one all were can there when if will each about how up out them then she "
+           "many some so these would other into has more her two like him see time could no make "
+           "than first been its who now people my made over did down only way find use may water "
+           "long little very after words called just where most know security password server "
+           "network request token model prompt analysis conversation export python function error "
+           "database query encryption certificate firewall vulnerability patch kernel process").split(),
+    'fr': ("le la les un une des de du et ou mais dans sur pour par avec sans est sont a ont été "
+           "être avoir fait faire cette ce ces il elle nous vous ils je tu mon son qui que quand "
+           "comment pourquoi comme plus moins très peu tout autre même aussi donc alors ainsi car "
+           "bien encore déjà ici là sécurité mot passe serveur réseau requête jeton modèle analyse "
+           "conversation fonction erreur base données chiffrement certificat pare-feu correctif").split(),
+    'es': ("el la los las un una de del y o pero en sobre para por con sin es son ha han sido ser "
+           "tener hecho hacer esta este estos él ella nosotros ellos yo tú mi su que cuando cómo "
+           "porque como más menos muy poco todo otro mismo también entonces así bien ya aquí "
+           "seguridad contraseña servidor red solicitud modelo análisis conversación función "
+           "error base datos cifrado certificado cortafuegos parche núcleo proceso").split(),
+    'de': ("der die das ein eine und oder aber in auf für mit ohne ist sind hat haben war sein "
+           "machen diese dieser er sie wir ihr ich du mein sein wer wann wie warum als mehr "
+           "weniger sehr wenig alle andere auch dann also gut schon hier dort sicherheit passwort "
+           "server netzwerk anfrage modell analyse gespräch funktion fehler datenbank verschlüsselung "
+           "zertifikat firewall schwachstelle kern prozess").split(),
+}
+
+
+def analyser_langues(valeur: str) -> List[Tuple[str, float]]:
+    """argparse type of --languages: 'en:0.7,fr:0.3' (weights are normalised)."""
+    langues = []
+    for element in valeur.split(','):
+        nom, _, poids = element.strip().partition(':')
+        if nom not in VOCABULAIRES:
+            raise argparse.ArgumentTypeError(
+                f"unknown language '{nom}' (choose from {', '.join(VOCABULAIRES)})"
+            )
+        try:
+            langues.append((nom, float(poids) if poids else 1.0))
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"invalid weight '{poids}' for {nom}")
+    return langues
+
+
+class SyntheticExportGenerator:
+    """
+    Produces realistic-looking conversations in the three export formats.
+
+    Message counts and lengths follow log-normal distributions (a long tail
+    of very long conversations, like real exports). Each conversation picks
+    one language from the weighted mix. With `branch_factor` > 0, ChatGPT
+    mappings get regenerated assistant answers as sibling branches. A
+    `duplicate_ratio` share of conversations is emitted a second time,
+    unchanged, as the duplicate detection sees in overlapping exports.
+    Everything is drawn from one random.Random(seed),
+    so the same parameters always give the same files.
+    """
+
+    def __init__(
+        self,
+        seed: int = 42,
+        messages_median: float = 12,
+        messages_sigma: float = 0.8,
+        words_median: float = 60,
+        words_sigma: float = 1.0,
+        branch_factor: float = 0.0,
+        duplicate_ratio: float = 0.0,
+        languages: List[Tuple[str, float]] = None
+    ):
+        self.rng = random.Random(seed)
+        self.messages_mu = math.log(max(1.0, messages_median))
+        self.messages_sigma = messages_sigma
+        self.words_mu = math.log(max(1.0, words_median))
+        self.words_sigma = words_sigma
+        self.branch_factor = branch_factor
+        self.duplicate_ratio = duplicate_ratio
+
+        languages = languages or [('en', 1.0)]
+        self.langues = [nom for nom, _ in languages]
+        self.poids = [poids for _, poids in languages]
+        self.index = 0
+
+    # ----- Building blocks -----
+
+    def _uuid(self) -> str:
+        valeur = f"{self.rng.getrandbits(128):032x}"
+        return f"{valeur[:8]}-{valeur[8:12]}-{valeur[12:16]}-{valeur[16:20]}-{valeur[20:]}"
+
+    def _nombre_messages(self) -> int:
+        return max(1, int(self.rng.lognormvariate(self.messages_mu, self.messages_sigma)))
+
+    def _texte(self, vocabulaire: List[str]) -> str:
+        nb_mots = max(1, int(self.rng.lognormvariate(self.words_mu, self.words_sigma)))
+        mots = self.rng.choices(vocabulaire, k=nb_mots)
+        # Sentences of ~12 words
+        for position in range(11, nb_mots, 12):
+            mots[position] += '.'
+        mots[0] = mots[0].capitalize()
+        return ' '.join(mots) + '.'
+
+    def _conversation(self) -> Dict[str, Any]:
+        """Format-neutral conversation: title, timestamps and alternating turns."""
+        self.index += 1
+        langue = self.rng.choices(self.langues, weights=self.poids)[0]
+        vocabulaire = VOCABULAIRES[langue]
+        debut = BASE_TIME + self.index * 3600 + self.rng.random() * 3600
+        tours = []
+        instant = debut
+        for position in range(self._nombre_messages()):
+            instant += self.rng.uniform(5, 120)
+            tours.append({
+                'role': 'user' if position % 2 == 0 else 'assistant',
+                'text': self._texte(vocabulaire),
+                'time': instant
+            })
+        titre = ' '.join(self.rng.choices(vocabulaire, k=self.rng.randint(2, 6))).capitalize()
+        return {'id': self._uuid(), 'title': f"{titre} #{self.index}", 'language': langue,
+                'created': debut, 'updated': instant, 'turns': tours}
+
+    @staticmethod
+    def _iso(timestamp: float) -> str:
+        return datetime.fromtimestamp(timestamp, tz=timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+
+    # ----- Formats -----
+
+    def to_chatgpt(self, conv: Dict[str, Any]) -> Dict[str, Any]:
+        racine = self._uuid()
+        mapping = {racine: {'id': racine, 'message': None, 'parent': None, 'children': []}}
+        parent = racine
+        vocabulaire = VOCABULAIRES[conv['language']]
+
+        def noeud(role: str, texte: str, instant: float, parent_id: str) -> str:
+            node_id = self._uuid()
+            mapping[node_id] = {
+                'id': node_id,
+                'message': {
+                    'id': node_id,
+                    'author': {'role': role},
+                    'create_time': instant,
+                    'content': {'content_type': 'text', 'parts': [texte]}
+                },
+                'parent': parent_id,
+                'children': []
+            }
+            mapping[parent_id]['children'].append(node_id)
+            return node_id
+
+        for tour in conv['turns']:
+            if tour['role'] == 'assistant' and self.branch_factor and self.rng.random() < self.branch_factor:
+                # Regenerated answer left on a side branch
+                noeud('assistant', self._texte(vocabulaire), tour['time'], parent)
+            parent = noeud(tour['role'], tour['text'], tour['time'], parent)
+
+        return {
+            'title': conv['title'],
+            'create_time': round(conv['created'], 3),
+            'update_time': round(conv['updated'], 3),
+            'mapping': mapping,
+            'current_node': parent,
+            'conversation_id': conv['id'],
+            'id': conv['id']
+        }
+
+    def to_claude(self, conv: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            'uuid': conv['id'],
+            'name': conv['title'],
+            'created_at': self._iso(conv['created']),
+            'updated_at': self._iso(conv['updated']),
+            'chat_messages': [
+                {
+                    'uuid': self._uuid(),
+                    'text': tour['text'],
+                    'sender': 'human' if tour['role'] == 'user' else 'assistant',
+                    'created_at': self._iso(tour['time'])
+                }
+                for tour in conv['turns']
+            ]
+        }
+
+    def to_lechat(self, conv: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return [
+            {'role': tour['role'], 'content': tour['text'], 'timestamp': self._iso(tour['time'])}
+            for tour in conv['turns']
+        ]
+
+    def conversations(self, format_name: str):
+        """
+        Endless stream of (name, payload, duplicate) in `format_name`.
+
+        A duplicate is the exact payload of an earlier conversation (same id,
+        same title), as found when overlapping exports are merged. It is
+        queued and re-emitted a few conversations later.
+        """
+        convertir = getattr(self, f"to_{format_name}")
+        en_attente = []
+        while True:
+            if en_attente and self.rng.random() < 0.5:
+                nom, payload = en_attente.pop(0)
+                yield nom, payload, True
+                continue
+            conv = self._conversation()
+            nom = f"synthetic_{self.index:07d}"
+            payload = convertir(conv)
+            yield nom, payload, False
+            if self.duplicate_ratio and self.rng.random() < self.duplicate_ratio:
+                en_attente.append((nom, payload))
+
+
+def generer_export(
+    format_name: str,
+    output_dir: str,
+    conversations: int = 1000,
+    size_mb: float = None,
+    files: int = 1,
+    **options
+) -> Dict[str, Any]:
+    """
+    Writes a synthetic export.
+
+    ChatGPT and Claude exports are JSON arrays written one conversation at
+    a time, so memory stays flat whatever the size; `files` splits them into
+    several exports. LeChat exports hold one conversation per file, and
+    their title comes from the file name: duplicates are written with the
+    same name under an 'overlap' sub-directory.
+    Generation stops after `conversations` conversations (duplicates
+    included), or once `size_mb` MB have been written when it is given.
+
+    Returns:
+        dict: {'format', 'files', 'conversations', 'duplicates', 'bytes'}
+    """
+    generator = SyntheticExportGenerator(**options)
+    dossier = Path(output_dir)
+    dossier.mkdir(parents=True, exist_ok=True)
+    limite = int(size_mb * 1024 * 1024) if size_mb else None
+
+    flux = generator.conversations(format_name)
+    bilan = {'format': format_name, 'files': [], 'conversations': 0, 'duplicates': 0, 'bytes': 0}
+
+    def termine() -> bool:
+        if limite is not None:
+            return bilan['bytes'] >= limite
+        return bilan['conversations'] >= conversations
+
+    if format_name == 'lechat':
+        while not termine():
+            nom, messages, doublon = next(flux)
+            chemin = (dossier / 'overlap' if doublon else dossier) / f"chat-{nom}.json"
+            chemin.parent.mkdir(exist_ok=True)
+            donnees = json.dumps(messages, ensure_ascii=False)
+            with open(chemin, 'w', encoding='utf-8') as f:
+                f.write(donnees)
+            bilan['files'].append(str(chemin))
+            bilan['conversations'] += 1
+            bilan['duplicates'] += doublon
+            bilan['bytes'] += len(donnees.encode('utf-8'))
+        return bilan
+
+    files = max(1, files)
+    par_fichier = None if limite is not None else math.ceil(conversations / files)
+    octets_par_fichier = None if limite is None else limite / files
+
+    for numero in range(1, files + 1):
+        if termine():
+            break
+        chemin = dossier / f"{format_name}_synthetic_{numero:03d}.json"
+        ecrits = 0
+        taille = 0
+        with open(chemin, 'w', encoding='utf-8', buffering=1024 * 1024) as f:
+            f.write('[')
+            while not termine():
+                if par_fichier is not None and ecrits >= par_fichier:
+                    break
+                if octets_par_fichier is not None and taille >= octets_par_fichier and numero < files:
+                    break
+                _, conv, doublon = next(flux)
+                bloc = ('\n' if ecrits == 0 else ',\n') + json.dumps(conv, ensure_ascii=False)
+                f.write(bloc)
+                ecrits += 1
+                bilan['duplicates'] += doublon
+                octets = len(bloc.encode('utf-8'))
+                taille += octets
+                bilan['conversations'] += 1
+                bilan['bytes'] += octets
+            f.write('\n]\n')
+        bilan['files'].append(str(chemin))
+
+    return bilan
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Generates synthetic ChatGPT / Claude / LeChat exports for load and memory tests"
+    )
+    parser.add_argument('--format', choices=EXPORT_FORMATS + ['all'], default='chatgpt')
+    parser.add_argument('--output', '-o', default='synthetic_data', help='Output directory')
+    parser.add_argument('--conversations', '-n', type=int, default=1000,
+                        help='Conversations per format, duplicates included (default: 1000)')
+    parser.add_argument('--size-mb', type=float, help='Generate until N MB per format instead of --conversations')
+    parser.add_argument('--files', type=int, default=1, help='Split ChatGPT/Claude exports into N files')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--messages-median', type=float, default=12, help='Median messages per conversation')
+    parser.add_argument('--messages-sigma', type=float, default=0.8, help='Log-normal spread of the message count')
+    parser.add_argument('--words-median', type=float, default=60, help='Median words per message')
+    parser.add_argument('--words-sigma', type=float, default=1.0, help='Log-normal spread of message length')
+    parser.add_argument('--branch-factor', type=float, default=0.0,
+                        help='ChatGPT: probability that an answer has a regenerated sibling branch')
+    parser.add_argument('--duplicate-ratio', type=float, default=0.0,
+                        help='Share of conversations emitted a second time (overlapping exports)')
+    parser.add_argument('--languages', type=analyser_langues, default=[('en', 1.0)],
+                        help="Language mix, e.g. en:0.6,fr:0.3,de:0.1 (en, fr, es, de)")
+    args = parser.parse_args()
+
+    formats = EXPORT_FORMATS if args.format == 'all' else [args.format]
+    for format_name in formats:
+        dossier = os.path.join(args.output, format_name) if len(formats) > 1 else args.output
+        bilan = generer_export(
+            format_name, dossier,
+            conversations=args.conversations,
+            size_mb=args.size_mb,
+            files=args.files,
+            seed=args.seed,
+            messages_median=args.messages_median,
+            messages_sigma=args.messages_sigma,
+            words_median=args.words_median,
+            words_sigma=args.words_sigma,
+            branch_factor=args.branch_factor,
+            duplicate_ratio=args.duplicate_ratio,
+            languages=args.languages
+        )
+        print(f"✅ {format_name}: {bilan['conversations']:,} conversations ({bilan['duplicates']:,} duplicates), "
+              f"{bilan['bytes'] / (1024 * 1024):,.1f} MB in {len(bilan['files'])} file(s) -> {dossier}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
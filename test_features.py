@@ -196,6 +196,49 @@ Provide a brief summary.
         
         return True
     
+    def start_mock_api(self, throttled_requests: int = 0):
+        """
+        Start a local OpenAI/Mistral-compatible endpoint, returns (server, url).
+        The first `throttled_requests` calls get a 429 with Retry-After: 0.
+        """
+        import threading
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        
+        state = {'throttled': throttled_requests}
+        lock = threading.Lock()
+        
+        class MockHandler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                payload = json.loads(self.rfile.read(length) or b'{}')
+                with lock:
+                    throttle = state['throttled'] > 0
+                    state['throttled'] -= 1
+                if throttle:
+                    self.send_response(429)
+                    self.send_header('Retry-After', '0')
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                body = json.dumps({
+                    "choices": [{"message": {"content": f"mock:{payload.get('model')}"}}],
+                    "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15}
+                }).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, format, *args):
+                pass
+        
+        server = ThreadingHTTPServer(('127.0.0.1', 0), MockHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server, f"http://127.0.0.1:{server.server_address[1]}/v1/chat/completions"
+    
     def cleanup(self):
         """Clean up temporary files."""
         if self.temp_dir and os.path.exists(self.temp_dir):
@@ -386,6 +429,284 @@ Provide a brief summary.
             self.print_fail(f"Prompt loader error: {e}")
             return False
     
+    def test_executor_session(self):
+        """Test pooled session reuse against a local mock endpoint."""
+        self.result.total += 1
+        self.print_test("Test executor pooled session")
+        
+        try:
+            from prompt_executor import PromptExecutor
+        except ImportError as e:
+            self.print_skip(f"Missing dependency: {e}")
+            return False
+        
+        server, url = self.start_mock_api()
+        try:
+            with PromptExecutor(api_key="test", api_url=url, model="mock-model", pool_size=2) as executor:
+                results = [executor.execute_prompt("Hello") for _ in range(3)]
+            
+            if all(r['success'] for r in results) and executor.session is None:
+                self.print_success(f"{len(results)} calls on one session")
+                return True
+            else:
+                self.print_fail(f"Unexpected results: {results}")
+                return False
+        except Exception as e:
+            self.print_fail(f"Executor session error: {e}")
+            return False
+        finally:
+            server.shutdown()
+    
+    def test_async_engine(self):
+        """Test the asyncio engine against a local mock endpoint."""
+        self.result.total += 1
+        self.print_test("Test async engine")
+        
+        try:
+            import aiohttp  # noqa: F401
+            from execution_engine import run_async_engine
+        except ImportError as e:
+            self.print_skip(f"Missing dependency: {e}")
+            return False
+        
+        server, url = self.start_mock_api()
+        try:
+            conversations = [
+                {"title": f"Conv {i}", "messages": [f"Question {i}", f"Answer {i}"]}
+                for i in range(20)
+            ]
+            results, errors = [], []
+            
+            run_async_engine(
+                conversations,
+                "Summarize {TITLE}: {CONVERSATION_TEXT}",
+                {"api_key": "test", "api_url": url, "model": "mock-model"},
+                10,
+                results.append,
+                lambda titre, e: errors.append(e),
+                delay=0
+            )
+            
+            expected_keys = {"titre", "success", "response", "token_count", "tokens_used"}
+            if (len(results) == 20 and not errors and all(r['success'] for r in results)
+                    and expected_keys <= set(results[0])):
+                self.print_success(f"{len(results)} conversations processed")
+                return True
+            else:
+                self.print_fail(f"Unexpected results: {len(results)} results, errors {errors[:1]}")
+                return False
+        except Exception as e:
+            self.print_fail(f"Async engine error: {e}")
+            return False
+        finally:
+            server.shutdown()
+    
+    def test_deferred_retries(self):
+        """Test that 429s are re-queued and succeed on a later attempt."""
+        self.result.total += 1
+        self.print_test("Test deferred retries")
+        
+        try:
+            from prompt_executor import PromptExecutor
+            from execution_engine import run_thread_engine
+            from retry_queue import RetryPolicy
+        except ImportError as e:
+            self.print_skip(f"Missing dependency: {e}")
+            return False
+        
+        server, url = self.start_mock_api(throttled_requests=3)
+        try:
+            conversations = [
+                {"title": f"Conv {i}", "messages": [f"Question {i}"]} for i in range(5)
+            ]
+            results, retries = [], []
+            
+            with PromptExecutor(api_key="test", api_url=url, model="mock-model") as executor:
+                run_thread_engine(
+                    conversations,
+                    "{CONVERSATION_TEXT}",
+                    executor,
+                    2,
+                    results.append,
+                    lambda titre, e: None,
+                    delay=0,
+                    retry_policy=RetryPolicy(max_attempts=5),
+                    on_retry=lambda *args: retries.append(args)
+                )
+            
+            if len(results) == 5 and all(r['success'] for r in results) and len(retries) == 3:
+                self.print_success(f"{len(retries)} retries, all conversations succeeded")
+                return True
+            else:
+                self.print_fail(f"Unexpected outcome: {len(results)} results, {len(retries)} retries")
+                return False
+        except Exception as e:
+            self.print_fail(f"Deferred retries error: {e}")
+            return False
+        finally:
+            server.shutdown()
+    
+    def test_breaker_worker_exception(self):
+        """Test that a worker raising during the half-open probe does not stall dispatch."""
+        self.result.total += 1
+        self.print_test("Test circuit breaker with a raising worker")
+        
+        try:
+            import threading
+            from execution_engine import run_thread_engine
+            from retry_queue import CircuitBreaker
+        except ImportError as e:
+            self.print_skip(f"Missing dependency: {e}")
+            return False
+        
+        class ExecuteurEnPanne:
+            """Executor without any API method: every worker raises AttributeError."""
+        
+        try:
+            breaker = CircuitBreaker(min_samples=1, cooldown=0.2)
+            breaker.record(False)
+            conversations = [{"title": f"t{i}", "messages": [f"Question {i}"]} for i in range(3)]
+            errors = []
+            run = threading.Thread(
+                target=run_thread_engine,
+                args=(conversations, "{CONVERSATION_TEXT}", ExecuteurEnPanne(), 2,
+                      lambda result: None, lambda titre, e: errors.append(titre)),
+                kwargs={'delay': 0, 'circuit_breaker': breaker},
+                daemon=True
+            )
+            run.start()
+            run.join(10)
+            
+            if not run.is_alive() and sorted(errors) == ["t0", "t1", "t2"]:
+                self.print_success(f"3 raising attempts reported, breaker {breaker.state}, no hang")
+                return True
+            else:
+                self.print_fail(f"Engine stalled: alive {run.is_alive()}, errors {errors}, breaker {breaker.state}")
+                return False
+        except Exception as e:
+            self.print_fail(f"Breaker error: {e}")
+            return False
+    
+    def test_response_cache(self):
+        """Test that a second identical run is served from the response cache."""
+        self.result.total += 1
+        self.print_test("Test response cache")
+        
+        try:
+            from prompt_executor import PromptExecutor
+            from execution_engine import run_thread_engine
+            from response_cache import ResponseCache
+        except ImportError as e:
+            self.print_skip(f"Missing dependency: {e}")
+            return False
+        
+        server, url = self.start_mock_api()
+        cache_dir = tempfile.mkdtemp(prefix="test_cache_")
+        try:
+            conversations = [
+                {"title": f"Conv {i}", "messages": [f"Question {i}"]} for i in range(3)
+            ]
+            
+            def executer(mode):
+                results, calls = [], []
+                cache = ResponseCache(os.path.join(cache_dir, "cache.sqlite"), mode=mode)
+                with PromptExecutor(api_key="test", api_url=url, model="mock-model") as executor:
+                    executor.response_callback = lambda status, latency: calls.append(status)
+                    run_thread_engine(conversations, "{CONVERSATION_TEXT}", executor, 2,
+                                      results.append, lambda titre, e: None, delay=0, cache=cache)
+                cache.close()
+                return results, calls
+            
+            premier, appels_premier = executer('read-write')
+            second, appels_second = executer('read-write')
+            _, appels_refresh = executer('refresh')
+            
+            # A hit leaves no open transaction: another process can still write the cache
+            chemin = os.path.join(cache_dir, "cache.sqlite")
+            cle = ResponseCache.make_key("mock-model", None, "x", 0.7, 100)
+            ecrivain = ResponseCache(chemin, mode='read-write')
+            ecrivain.put(cle, {'success': True, 'response': 'ok', 'model': 'mock-model'})
+            lecteurs = [ResponseCache(chemin, mode=mode) for mode in ('read-only', 'read-write')]
+            touches = [lecteur.get(cle) is not None for lecteur in lecteurs]
+            ouvertes = [lecteur._conn.in_transaction for lecteur in lecteurs]
+            ecrivain._conn.execute("PRAGMA busy_timeout = 0")
+            ecrivain.put(ResponseCache.make_key("mock-model", None, "y", 0.7, 100),
+                         {'success': True, 'response': 'ok', 'model': 'mock-model'})
+            for cache in lecteurs + [ecrivain]:
+                cache.close()
+            
+            # Read-only opens the file read-only; a missing file is an empty cache, never created
+            import sqlite3
+            lecteur = ResponseCache(chemin, mode='read-only')
+            try:
+                lecteur._conn.execute("CREATE TABLE probe (x)")
+                lecture_seule = False
+            except sqlite3.OperationalError:
+                lecture_seule = lecteur.get(cle) is not None
+            lecteur.close()
+            absent = os.path.join(cache_dir, "missing", "cache.sqlite")
+            vide = ResponseCache(absent, mode='read-only')
+            lecture_seule = lecture_seule and vide.get(cle) is None and not os.path.exists(os.path.dirname(absent))
+            vide.close()
+            
+            if (len(appels_premier) == 3 and not appels_second and len(appels_refresh) == 3
+                    and all(touches) and not any(ouvertes) and lecture_seule
+                    and all(r['cached'] and r['success'] for r in second)
+                    and not any(r['cached'] for r in premier)):
+                self.print_success("Second run served from cache, refresh bypasses it")
+                return True
+            else:
+                self.print_fail(f"API calls: {len(appels_premier)}, {len(appels_second)}, {len(appels_refresh)}; "
+                                f"hits {touches}, open transactions {ouvertes}, read-only {lecture_seule}")
+                return False
+        except Exception as e:
+            self.print_fail(f"Response cache error: {e}")
+            return False
+        finally:
+            server.shutdown()
+            shutil.rmtree(cache_dir, ignore_errors=True)
+    
+    def test_run_journal(self):
+        """Test that a run journal survives a crash and keeps the latest result per task."""
+        self.result.total += 1
+        self.print_test("Test run journal")
+        
+        try:
+            from run_journal import RunJournal
+            sys.path.insert(0, '.')
+            from analyse_conversations_merged import identifiant_tache
+            
+            conv = {"title": "Conv", "conversation_id": "abc", "_format": "chatgpt"}
+            tache_1 = identifiant_tache(conv, "chatgpt", "1/2", ["a", "b"])
+            tache_2 = identifiant_tache(conv, "chatgpt", "2/2", ["c"])
+            
+            journal_path = Path(self.temp_dir or tempfile.mkdtemp(), "runs", "run_test.jsonl")
+            journal = RunJournal(str(journal_path), "test", batch_size=1)
+            journal.write_header(model="mock-model")
+            journal.append({"_task_id": tache_1, "success": True, "response": "ok"})
+            journal.append({"_task_id": tache_2, "success": False, "error": "HTTP 500"})
+            journal.append({"_task_id": tache_2, "success": True, "response": "ok after retry"})
+            journal.sync()
+            # Simulated crash in the middle of a write
+            with open(journal_path, 'a', encoding='utf-8') as f:
+                f.write('{"type": "result", "_task_id": "trunc')
+            
+            header, results = RunJournal.load(str(journal_path))
+            
+            if (header['run_id'] == "test" and len(results) == 2
+                    and results[tache_2]['response'] == "ok after retry"
+                    and tache_1 == identifiant_tache(conv, "chatgpt", "1/2", ["a", "b"])
+                    and tache_1 != tache_2):
+                self.print_success("Latest result per task kept, truncated line ignored")
+                journal.close()
+                return True
+            else:
+                self.print_fail(f"Unexpected journal content: {results}")
+                return False
+        except Exception as e:
+            self.print_fail(f"Run journal error: {e}")
+            return False
+    
     def test_result_formatter_csv(self):
         """Test CSV result formatting."""
         self.result.total += 1
@@ -478,6 +799,921 @@ Provide a brief summary.
             self.print_fail(f"Markdown formatter error: {e}")
             return False
     
+    def test_stream_writers(self):
+        """Test streaming writers: partial output mid-run, Markdown TOC written last, appendable JSONL."""
+        self.result.total += 1
+        self.print_test("Test streaming writers")
+        
+        try:
+            from result_formatter import open_stream_writer
+            
+            out_dir = tempfile.mkdtemp(prefix="test_writers_")
+            md_file = os.path.join(out_dir, "results.md")
+            jsonl_file = os.path.join(out_dir, "results.jsonl")
+            
+            writer = open_stream_writer('markdown', md_file)
+            writer.write({"titre": "First", "response": "one", "success": True, "token_count": 1})
+            partial = Path(f"{md_file}.part").read_text(encoding='utf-8')
+            writer.write({"titre": "Second", "error": "HTTP 500", "success": False})
+            writer_ok = writer.close()
+            markdown = Path(md_file).read_text(encoding='utf-8')
+            
+            for batch in ("a", "b"):
+                jsonl = open_stream_writer('jsonl', jsonl_file, append=True)
+                jsonl.write({"titre": batch, "success": True})
+                jsonl.close()
+            lines = Path(jsonl_file).read_text(encoding='utf-8').splitlines()
+            shutil.rmtree(out_dir, ignore_errors=True)
+            
+            if (writer_ok and "one" in partial and "2. [Second](#second)" in markdown
+                    and markdown.index("Table of Contents") < markdown.index("## 1. First")
+                    and "- ❌ Errors: 1" in markdown and len(lines) == 2):
+                self.print_success("Partial output readable, TOC assembled at close, JSONL appended")
+                return True
+            else:
+                self.print_fail("Unexpected writer output")
+                return False
+        except Exception as e:
+            self.print_fail(f"Streaming writers error: {e}")
+            return False
+    
+    def test_results_store(self):
+        """Test the SQLite results store and its full-text search."""
+        self.result.total += 1
+        self.print_test("Test SQLite results store")
+        
+        try:
+            from result_formatter import open_stream_writer, query_results_store
+            
+            out_dir = tempfile.mkdtemp(prefix="test_store_")
+            db_file = os.path.join(out_dir, "store.sqlite")
+            
+            for run_id, prompt in (("run1", "security"), ("run2", "resume")):
+                store = open_stream_writer('sqlite', db_file, run_id=run_id, prompt=prompt, model="mock-model")
+                for i in range(30):
+                    store.write({
+                        "_task_id": f"task{i}", "conversation_id": f"conv{i}", "titre": f"Conv {i}",
+                        "success": True, "tokens_used": {"total_tokens": 42},
+                        "response": "Hardcoded password found" if i % 10 == 0 else "Nothing to report"
+                    })
+                store.close()
+            
+            hits = query_results_store(db_file, "password", prompt="security")
+            tous = query_results_store(db_file, "", limit=100)
+            shutil.rmtree(out_dir, ignore_errors=True)
+            
+            if (len(hits) == 3 and all(h['run_id'] == "run1" for h in hits)
+                    and "[password]" in hits[0]['snippet'] and len(tous) == 60
+                    and tous[0]['total_tokens'] == 42):
+                self.print_success("3 flagged conversations found among 60 rows")
+                return True
+            else:
+                self.print_fail(f"Unexpected hits: {len(hits)} / {len(tous)}")
+                return False
+        except Exception as e:
+            self.print_fail(f"Results store error: {e}")
+            return False
+    
+    def test_parquet_writer(self):
+        """Test incremental Parquet row groups with typed columns."""
+        self.result.total += 1
+        self.print_test("Test Parquet writer")
+        
+        try:
+            import pyarrow.parquet as pq
+            from result_formatter import open_stream_writer
+        except ImportError as e:
+            self.print_skip(f"Missing dependency: {e}")
+            return False
+        
+        try:
+            out_dir = tempfile.mkdtemp(prefix="test_parquet_")
+            parquet_file = os.path.join(out_dir, "results.parquet")
+            
+            writer = open_stream_writer('parquet', parquet_file, run_id="run1", row_group_size=10)
+            for i in range(25):
+                writer.write({"titre": f"Conv {i}", "success": i % 5 != 0, "token_count": i,
+                              "tokens_used": {"total_tokens": i * 2}})
+            writer_ok = writer.close()
+            
+            metadata = pq.ParquetFile(parquet_file).metadata
+            table = pq.read_table(parquet_file, columns=["success", "total_tokens"])
+            shutil.rmtree(out_dir, ignore_errors=True)
+            
+            if (writer_ok and metadata.num_row_groups == 3 and metadata.num_rows == 25
+                    and str(table.schema.field("total_tokens").type) == "int64"
+                    and table.column("success").to_pylist().count(False) == 5):
+                self.print_success("25 rows in 3 row groups, typed columns")
+                return True
+            else:
+                self.print_fail(f"Unexpected Parquet layout: {metadata.num_row_groups} row groups")
+                return False
+        except Exception as e:
+            self.print_fail(f"Parquet writer error: {e}")
+            return False
+    
+    def test_multi_format_export(self):
+        """Test the fan-out writer and re-exporting results from a store."""
+        self.result.total += 1
+        self.print_test("Test multi-format output and export")
+        
+        try:
+            import argparse
+            sys.path.insert(0, '.')
+            from analyse_conversations_merged import analyser_formats
+            from result_formatter import open_stream_writer, MultiStreamWriter, iter_results_store
+            
+            formats = analyser_formats("csv, jsonl,csv,sqlite")
+            try:
+                analyser_formats("csv,xml")
+                rejected = False
+            except argparse.ArgumentTypeError:
+                rejected = True
+            
+            out_dir = tempfile.mkdtemp(prefix="test_export_")
+            sorties = MultiStreamWriter([
+                open_stream_writer(fmt, os.path.join(out_dir, f"results.{fmt}")) for fmt in formats
+            ])
+            for i in range(4):
+                sorties.write({"_task_id": f"t{i}", "titre": f"Conv {i}", "success": True,
+                               "response": f"answer {i}", "tokens_used": {"total_tokens": i}})
+            all_ok = sorties.close()
+            
+            exported = list(iter_results_store(os.path.join(out_dir, "results.sqlite")))
+            jsonl_lines = Path(out_dir, "results.jsonl").read_text(encoding='utf-8').splitlines()
+            shutil.rmtree(out_dir, ignore_errors=True)
+            
+            if (formats == ['csv', 'jsonl', 'sqlite'] and rejected and all_ok and len(jsonl_lines) == 4
+                    and [r['response'] for r in exported] == [f"answer {i}" for i in range(4)]
+                    and exported[3]['tokens_used'] == {"total_tokens": 3}):
+                self.print_success("3 formats written in one pass, store exported back")
+                return True
+            else:
+                self.print_fail(f"Unexpected output: formats {formats}, {len(exported)} exported")
+                return False
+        except Exception as e:
+            self.print_fail(f"Multi-format error: {e}")
+            return False
+    
+    def test_compressed_rotation(self):
+        """Test compressed output and row-based shard rotation with its manifest."""
+        self.result.total += 1
+        self.print_test("Test compressed, rotated output")
+        
+        try:
+            import gzip
+            sys.path.insert(0, '.')
+            from result_formatter import open_stream_writer, RotatingStreamWriter
+            
+            out_dir = tempfile.mkdtemp(prefix="test_rotate_")
+            rows = [{"_task_id": f"t{i}", "titre": f"Conv {i}", "success": True,
+                     "response": f"answer {i}"} for i in range(10)]
+            
+            gz_writer = open_stream_writer('jsonl', os.path.join(out_dir, "single.jsonl.gz"), compression='gzip')
+            for row in rows:
+                gz_writer.write(row)
+            gz_writer.close()
+            with gzip.open(os.path.join(out_dir, "single.jsonl.gz"), 'rt', encoding='utf-8') as f:
+                gz_lines = f.read().splitlines()
+            
+            rotating = RotatingStreamWriter('jsonl', os.path.join(out_dir, "results"),
+                                            max_rows=4, compression='gzip').open()
+            for row in rows:
+                rotating.write(row)
+            rotating.close()
+            
+            manifest = json.loads(Path(rotating.output_file).read_text(encoding='utf-8'))
+            with gzip.open(os.path.join(out_dir, manifest['shards'][2]['file']), 'rt', encoding='utf-8') as f:
+                last_shard = [json.loads(line) for line in f]
+            shutil.rmtree(out_dir, ignore_errors=True)
+            
+            if (len(gz_lines) == 10 and manifest['complete'] and manifest['total_rows'] == 10
+                    and [s['rows'] for s in manifest['shards']] == [4, 4, 2]
+                    and manifest['shards'][0]['file'] == "results_0001.jsonl.gz"
+                    and [r['_task_id'] for r in last_shard] == ["t8", "t9"]):
+                self.print_success("gzip stream readable, 10 rows rotated into 3 shards")
+                return True
+            else:
+                self.print_fail(f"Unexpected manifest: {manifest}")
+                return False
+        except Exception as e:
+            self.print_fail(f"Compressed rotation error: {e}")
+            return False
+    
+    def test_background_logger(self):
+        """Test the queue-backed log writer: threads, level filter, rotation."""
+        self.result.total += 1
+        self.print_test("Test background log writer")
+        
+        try:
+            import threading
+            sys.path.insert(0, '.')
+            import signal
+            from log_writer import BackgroundLogWriter, install_signal_handlers
+            
+            log_dir = tempfile.mkdtemp(prefix="test_log_")
+            log_path = os.path.join(log_dir, "test.log")
+            writer = BackgroundLogWriter(log_path, level='INFO').start()
+            
+            def worker(k):
+                for i in range(50):
+                    writer.write(f"worker {k} line {i}", "INFO")
+                    writer.write("hidden", "DEBUG")
+            threads = [threading.Thread(target=worker, args=(k,)) for k in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            flushed = writer.flush()
+            lines = Path(log_path).read_text(encoding='utf-8').splitlines()
+            writer.close()
+            
+            rotating = BackgroundLogWriter(os.path.join(log_dir, "small.log"), max_bytes=500, backups=2).start()
+            for i in range(100):
+                rotating.write(f"rotated line {i}", "WARNING")
+            rotating.close()
+            files = sorted(os.listdir(log_dir))
+            
+            # SIGHUP ignored (nohup) must stay ignored; SIGTERM gets the drain handler
+            originaux = {s: signal.getsignal(s) for s in (signal.SIGTERM, signal.SIGHUP)}
+            try:
+                signal.signal(signal.SIGHUP, signal.SIG_IGN)
+                signal.signal(signal.SIGTERM, signal.SIG_DFL)
+                install_signal_handlers(BackgroundLogWriter(os.path.join(log_dir, "signal.log")))
+                hup_ignored = signal.getsignal(signal.SIGHUP) is signal.SIG_IGN
+                term_wrapped = callable(signal.getsignal(signal.SIGTERM))
+            finally:
+                for signum, handler in originaux.items():
+                    signal.signal(signum, handler)
+            shutil.rmtree(log_dir, ignore_errors=True)
+            
+            well_formed = all(line.startswith("[") and "] [INFO] worker " in line for line in lines)
+            if not (hup_ignored and term_wrapped):
+                self.print_fail(f"Signal handlers: SIGHUP ignored {hup_ignored}, SIGTERM wrapped {term_wrapped}")
+                return False
+            if (flushed and len(lines) == 200 and well_formed and rotating.rotations > 0
+                    and "small.log.1" in files and "small.log.3" not in files):
+                self.print_success(f"200 lines from 4 threads, DEBUG filtered, {rotating.rotations} rotation(s)")
+                return True
+            else:
+                self.print_fail(f"Unexpected log output: {len(lines)} lines, files {files}")
+                return False
+        except Exception as e:
+            self.print_fail(f"Log writer error: {e}")
+            return False
+    
+    def test_run_metrics(self):
+        """Test the engine observer hook and the run metrics summary."""
+        self.result.total += 1
+        self.print_test("Test run metrics")
+        
+        try:
+            from prompt_executor import PromptExecutor
+            from execution_engine import run_thread_engine
+            from retry_queue import RetryPolicy
+            from run_metrics import RunMetrics, percentile
+        except ImportError as e:
+            self.print_skip(f"Missing dependency: {e}")
+            return False
+        
+        server, url = self.start_mock_api(throttled_requests=2)
+        try:
+            conversations = [
+                {"title": f"Conv {i}", "messages": [f"Question {i}"]} for i in range(4)
+            ]
+            results = []
+            metrics = RunMetrics("test")
+            
+            with PromptExecutor(api_key="test", api_url=url, model="mock-model") as executor:
+                with metrics.stage('dispatch'):
+                    run_thread_engine(
+                        conversations,
+                        "{CONVERSATION_TEXT}",
+                        executor,
+                        2,
+                        results.append,
+                        lambda titre, e: None,
+                        delay=0,
+                        retry_policy=RetryPolicy(max_attempts=5),
+                        observer=metrics
+                    )
+            
+            # A cache hit keeps its original usage but sends no token
+            metrics.request_completed(
+                {"title": "Cached"}, 1,
+                {'success': True, 'cached': True, 'tokens_used': {'prompt_tokens': 100, 'completion_tokens': 50}},
+                {}, True
+            )
+            summary = metrics.summary()
+            leaked = [r for r in results if '_timing' in r]
+            if (summary['requests']['final'] == 5 and summary['requests']['retries'] == 2
+                    and summary['tokens']['total'] == 60 and summary['tokens']['cached'] == 150
+                    and summary['latency']['count'] == 6
+                    and summary['throughput']['requests_per_s'] > 0 and not leaked
+                    and percentile([1, 2, 3, 4, 5], 50) == 3 and percentile([1, 2], 95) == 1.95):
+                self.print_success(f"6 attempts observed, p50 latency {summary['latency']['p50']}s")
+                return True
+            else:
+                self.print_fail(f"Unexpected summary: {summary['requests']}, {summary['tokens']}")
+                return False
+        except Exception as e:
+            self.print_fail(f"Run metrics error: {e}")
+            return False
+        finally:
+            server.shutdown()
+    
+    def test_metrics_exporter(self):
+        """Test the Prometheus /metrics endpoint fed by the engine observer hook."""
+        self.result.total += 1
+        self.print_test("Test Prometheus metrics exporter")
+        
+        try:
+            import urllib.request
+            from prompt_executor import PromptExecutor
+            from execution_engine import run_thread_engine
+            from retry_queue import RetryPolicy
+            from metrics_exporter import PrometheusExporter, classe_erreur
+        except ImportError as e:
+            self.print_skip(f"Missing dependency: {e}")
+            return False
+        
+        server, url = self.start_mock_api(throttled_requests=1)
+        exporter = PrometheusExporter("test", total=3, model="mock-model")
+        try:
+            host, port = exporter.serve("127.0.0.1", 0)
+            conversations = [
+                {"title": f"Conv {i}", "messages": [f"Question {i}"]} for i in range(3)
+            ]
+            with PromptExecutor(api_key="test", api_url=url, model="mock-model") as executor:
+                run_thread_engine(
+                    conversations,
+                    "{CONVERSATION_TEXT}",
+                    executor,
+                    2,
+                    lambda result: None,
+                    lambda titre, e: None,
+                    delay=0,
+                    retry_policy=RetryPolicy(max_attempts=3),
+                    observer=exporter
+                )
+            # A cache hit counts as a request but adds no API token
+            exporter.request_completed(
+                {"title": "Cached"}, 1,
+                {'success': True, 'cached': True, 'model_used': 'mock-model',
+                 'tokens_used': {'prompt_tokens': 100, 'completion_tokens': 50}},
+                {}, True
+            )
+            
+            with urllib.request.urlopen(f"http://{host}:{port}/metrics", timeout=5) as response:
+                body = response.read().decode('utf-8')
+            
+            expected = [
+                'prompt_executor_requests_total{model="mock-model",outcome="success"} 4',
+                'prompt_executor_retries_total 1',
+                'prompt_executor_requests_in_flight 0',
+                'prompt_executor_queue_depth 0',
+                'prompt_executor_tokens_total{model="mock-model",type="completion"} 15',
+                'prompt_executor_failures_total{model="mock-model",error_class="rate_limited"} 1',
+                'prompt_executor_request_latency_seconds_count{model="mock-model"} 4',
+                'prompt_executor_cache_hits_total 1',
+            ]
+            missing = [line for line in expected if line not in body.splitlines()]
+            if not missing and classe_erreur("HTTP 503: Service Unavailable") == "server_error":
+                self.print_success("Counters, gauges and latency histogram served on /metrics")
+                return True
+            else:
+                self.print_fail(f"Missing metrics: {missing}")
+                return False
+        except Exception as e:
+            self.print_fail(f"Metrics exporter error: {e}")
+            return False
+        finally:
+            exporter.close()
+            server.shutdown()
+    
+    def test_stage_profiler(self):
+        """Test per-stage cProfile/tracemalloc profiles and the sampling mode."""
+        self.result.total += 1
+        self.print_test("Test stage profiler")
+        
+        try:
+            import pstats
+            import time as time_module
+            sys.path.insert(0, '.')
+            from profiler import StageProfiler
+            
+            out_dir = tempfile.mkdtemp(prefix="test_profile_")
+            profiler = StageProfiler('full', top=5)
+            with profiler.stage('load'):
+                blocs = [bytearray(64 * 1024) for _ in range(16)]
+            with profiler.stage('dispatch'):
+                sum(i * i for i in range(20000))
+            fichiers = profiler.save(out_dir, "test")
+            resume = json.loads(fichiers[0].read_text(encoding='utf-8'))
+            stats = pstats.Stats(str(Path(out_dir, resume['stages']['dispatch']['pstats'])))
+            
+            sampler = StageProfiler('sample', interval=0.002)
+            with sampler.stage('dispatch'):
+                fin = time_module.monotonic() + 0.2
+                while time_module.monotonic() < fin:
+                    pass
+            sampler.save(out_dir, "sampled")
+            folded = Path(out_dir, "profile_sampled_01_dispatch.folded").read_text(encoding='utf-8')
+            shutil.rmtree(out_dir, ignore_errors=True)
+            
+            load = resume['stages']['load']
+            if (len(fichiers) == 3 and load['peak_traced_mb'] >= 1.0 and stats.total_calls > 0
+                    and any('test_features.py' in a['site'] for a in load['top_allocations'])
+                    and sampler.stages['dispatch']['samples'] > 0 and 'test_stage_profiler' in folded):
+                self.print_success(f"load peak {load['peak_traced_mb']} MB, "
+                                   f"{sampler.stages['dispatch']['samples']} stack samples")
+                return True
+            else:
+                self.print_fail(f"Unexpected profile: {resume['stages']}")
+                return False
+        except Exception as e:
+            self.print_fail(f"Profiler error: {e}")
+            return False
+    
+    def test_event_log(self):
+        """Test the JSONL event stream: ids, retry reasons and completed attempts."""
+        self.result.total += 1
+        self.print_test("Test structured event log")
+        
+        try:
+            from prompt_executor import PromptExecutor
+            from execution_engine import run_thread_engine
+            from retry_queue import RetryPolicy
+            from event_log import EventLog
+        except ImportError as e:
+            self.print_skip(f"Missing dependency: {e}")
+            return False
+        
+        server, url = self.start_mock_api(throttled_requests=1)
+        out_dir = tempfile.mkdtemp(prefix="test_events_")
+        try:
+            conversations = [
+                {"title": f"Conv {i}", "_task_id": f"task{i}", "messages": [f"Question {i}"]} for i in range(3)
+            ]
+            events = EventLog(EventLog.path_for(out_dir, "test"), "test")
+            events.queued(conversations)
+            
+            with PromptExecutor(api_key="test", api_url=url, model="mock-model") as executor:
+                run_thread_engine(
+                    conversations,
+                    "{CONVERSATION_TEXT}",
+                    executor,
+                    1,
+                    lambda result: events.written(result, ['jsonl']),
+                    lambda titre, e: None,
+                    delay=0,
+                    retry_policy=RetryPolicy(max_attempts=3),
+                    observer=events
+                )
+            events.close()
+            
+            records = [json.loads(line) for line in
+                       EventLog.path_for(out_dir, "test").read_text(encoding='utf-8').splitlines()]
+            kinds = [r['event'] for r in records]
+            retry = next(r for r in records if r['event'] == 'retry')
+            completed = [r for r in records if r['event'] == 'completed']
+            
+            if (kinds.count('queued') == 3 and kinds.count('started') == 4 and kinds.count('written') == 3
+                    and retry['attempt_id'] == "task0#1" and "429" in retry['reason']
+                    and any(r['attempt_id'] == "task0#2" and r['final'] for r in completed)
+                    and all(r['latency'] >= 0 and r['queue_wait'] >= 0 for r in completed)
+                    and [r['seq'] for r in records] == list(range(1, len(records) + 1))):
+                self.print_success(f"{len(records)} events, retry traced as task0#1 -> task0#2")
+                return True
+            else:
+                self.print_fail(f"Unexpected events: {kinds}")
+                return False
+        except Exception as e:
+            self.print_fail(f"Event log error: {e}")
+            return False
+        finally:
+            shutil.rmtree(out_dir, ignore_errors=True)
+            server.shutdown()
+    
+    def test_token_progress(self):
+        """Test token-weighted progress, in-flight/retry counts and ETA."""
+        self.result.total += 1
+        self.print_test("Test token-based progress and ETA")
+        
+        try:
+            import io
+            import contextlib
+            sys.path.insert(0, '.')
+            from progress import TokenProgress, format_duree
+            
+            horloge = {'t': 0.0}
+            conversations = [{"_task_id": "big", "token_count": 9000},
+                             {"_task_id": "small", "token_count": 1000}]
+            progress = TokenProgress(conversations, window=60.0, clock=lambda: horloge['t'])
+            
+            with contextlib.redirect_stdout(io.StringIO()) as sortie:
+                progress.request_started(conversations[1], 1)
+                progress.request_started(conversations[0], 1)
+                progress.retry_scheduled(conversations[0], 1, 2.0, "HTTP 429")
+                progress.request_completed(conversations[0], 1, {"success": False}, {}, False)
+                horloge['t'] = 10.0
+                progress.request_completed(conversations[1], 1, {"success": True}, {}, True)
+                mid = progress.snapshot()
+                progress.request_started(conversations[0], 2)
+                horloge['t'] = 20.0
+                progress.request_completed(conversations[0], 2, {"success": True}, {}, True)
+            end = progress.snapshot()
+            
+            if (mid['done_tokens'] == 1000 and mid['in_flight'] == 0 and mid['retry_waiting'] == 1
+                    and mid['tokens_per_s'] == 100.0 and mid['eta'] == 90.0
+                    and end['done_tokens'] == 10000 and end['retry_waiting'] == 0 and end['eta'] == 0
+                    and "100% of 10,000 tokens" in sortie.getvalue() and format_duree(3725) == "1h02m"):
+                self.print_success("10% done after the small chat, ETA 90s at 100 tok/s")
+                return True
+            else:
+                self.print_fail(f"Unexpected progress: {mid} / {end}")
+                return False
+        except Exception as e:
+            self.print_fail(f"Token progress error: {e}")
+            return False
+    
+    def test_synthetic_exports(self):
+        """Test the synthetic export generator: determinism, parsing and duplicates."""
+        self.result.total += 1
+        self.print_test("Test synthetic ChatGPT / Claude / LeChat exports")
+        
+        try:
+            sys.path.insert(0, '.')
+            from synthetic_exports import generer_export
+            from extractors import detecter_format_json, extraire_messages
+            
+            options = dict(seed=7, messages_median=6, words_median=20, branch_factor=0.5,
+                           duplicate_ratio=0.3, languages=[('en', 0.5), ('fr', 0.5)])
+            problemes = []
+            with tempfile.TemporaryDirectory() as tmp:
+                for format_name in ('chatgpt', 'claude', 'lechat'):
+                    bilans = [generer_export(format_name, os.path.join(tmp, f"{format_name}_{run}"),
+                                             conversations=30, files=2, **options) for run in (1, 2)]
+                    contenus = [[Path(f).read_bytes() for f in bilan['files']] for bilan in bilans]
+                    if contenus[0] != contenus[1]:
+                        problemes.append(f"{format_name}: not deterministic")
+                    if bilans[0]['conversations'] != 30 or not bilans[0]['duplicates']:
+                        problemes.append(f"{format_name}: {bilans[0]['conversations']} conv, "
+                                         f"{bilans[0]['duplicates']} duplicates")
+                    
+                    data = json.loads(contenus[0][0])
+                    if detecter_format_json(data, bilans[0]['files'][0]) != format_name:
+                        problemes.append(f"{format_name}: detected as {detecter_format_json(data, 'x')}")
+                    conv = {"messages": data} if format_name == 'lechat' else data[0]
+                    if not extraire_messages(conv, format_name):
+                        problemes.append(f"{format_name}: no messages extracted")
+            
+            if not problemes:
+                self.print_success("3 formats parsed, same seed gives the same bytes, duplicates present")
+                return True
+            else:
+                self.print_fail("; ".join(problemes))
+                return False
+        except Exception as e:
+            self.print_fail(f"Synthetic exports error: {e}")
+            return False
+    
+    def test_benchmark_mock_server(self):
+        """Test the benchmark mock server (429 injection, token timing) and per-commit comparison."""
+        self.result.total += 1
+        self.print_test("Test benchmark mock server and comparison")
+        
+        try:
+            import time
+            sys.path.insert(0, '.')
+            from benchmark import MockMistralServer, comparer, enregistrer
+            from prompt_executor import PromptExecutor
+            
+            server = MockMistralServer(latency='fixed:0', ms_per_completion_token=5.0, completion_tokens=500,
+                                       rate_429=0.3, retry_after=2, seed=3)
+            url = server.start()
+            try:
+                with PromptExecutor(api_key="bench", api_url=url, model="mock-model") as executor:
+                    executor.defer_retries = True
+                    debut = time.monotonic()
+                    results = [executor.execute_prompt("Hello " * 40, max_tokens=20) for _ in range(10)]
+                    duree = time.monotonic() - debut
+            finally:
+                server.stop()
+            
+            ok = [r for r in results if r['success']]
+            throttled = [r for r in results if not r['success']]
+            
+            records = Path(self.temp_dir) / "bench_results.jsonl"
+            for commit, rps in (("aaa1111", 10.0), ("aaa1111", 12.0), ("bbb2222", 15.0)):
+                enregistrer({'scenario': 'smoke', 'config_id': 'cfg', 'commit': commit, 'dirty': False,
+                             'wall_s': 1.0, 'peak_rss_mb': 50.0, 'throughput': {'requests_per_s': rps},
+                             'latency': {'p95': 0.1, 'p99': 0.2}}, records)
+            lignes = comparer(records, 'smoke')
+            
+            if (server.stats['throttled'] == len(throttled) > 0 and server.stats['ok'] == len(ok)
+                    and all(r.get('retry_after') == 2.0 and r.get('status_code') == 429 for r in throttled)
+                    and all(r['tokens_used']['completion_tokens'] == 20 for r in ok)
+                    and duree >= len(ok) * 0.1
+                    and [(l['commit'], l['runs'], l['requests_per_s']) for l in lignes]
+                    == [("aaa1111", 2, 11.0), ("bbb2222", 1, 15.0)]):
+                self.print_success(f"{len(throttled)}/10 throttled with Retry-After, "
+                                   f"answers capped to max_tokens, medians per commit")
+                return True
+            else:
+                self.print_fail(f"Unexpected: {server.stats}, {results[:2]}, {lignes}")
+                return False
+        except Exception as e:
+            self.print_fail(f"Benchmark error: {e}")
+            return False
+    
+    def test_autotune(self):
+        """Test the autotune sweep against a mock server enforcing a quota, and tuning profiles."""
+        self.result.total += 1
+        self.print_test("Test autotune sweep and tuning profile")
+        
+        try:
+            sys.path.insert(0, '.')
+            from benchmark import MockMistralServer
+            from autotune import Autotuner, save_profile, load_profile
+            from prompt_executor import PromptExecutor
+            
+            server = MockMistralServer(latency='fixed:0.15', completion_tokens=20, retry_after=1, rpm=600)
+            url = server.start()
+            conversations = [({"title": f"Conv {i}"}, "chatgpt", [f"message {i}"]) for i in range(12)]
+            try:
+                tuner = Autotuner(
+                    conversations,
+                    lambda conv, messages, budget: [{"title": conv["title"], "messages": messages,
+                                                     "partie": "1/1", "token_count": 50}],
+                    "{CONVERSATION_TEXT}",
+                    lambda workers: PromptExecutor(api_key="test", api_url=url, model="mock-model",
+                                                   pool_size=workers),
+                    rpm=600,
+                    sample=12
+                )
+                trials = tuner.sweep([1, 4, 16], [0, 0.5], [31000])
+            finally:
+                server.stop()
+            best = tuner.recommend(trials)
+            
+            profile_path = os.path.join(self.temp_dir, "tuning.json")
+            save_profile(profile_path, best, 600, None, trials)
+            settings = load_profile(profile_path)
+            
+            # 16 workers cannot beat a 600 rpm quota: the sweep must stop before them
+            ceiling = [t for t in trials if t['sustained_tokens_per_s'] < t['tokens_per_s'] or t['throttled']]
+            if (ceiling and not any(t['workers'] == 16 and t['delay'] == 0.5 for t in trials)
+                    and best['throttled'] == 0 and best['failed'] == 0
+                    and best['sustained_tokens_per_s'] <= 600 / 60 * best['tokens_per_s'] / best['requests_per_s'] + 0.1
+                    and settings == {'workers': best['workers'], 'delay': best['delay'],
+                                     'chunk_tokens': 31000, 'rpm': 600}):
+                self.print_success(f"{len(trials)} trials, recommended {best['workers']} workers "
+                                   f"/ delay {best['delay']} without 429")
+                return True
+            else:
+                self.print_fail(f"Unexpected sweep: {trials} -> {best}, profile {settings}")
+                return False
+        except Exception as e:
+            self.print_fail(f"Autotune error: {e}")
+            return False
+    
+    def test_plan(self):
+        """Test --plan: totals, cost and duration without any API call or output."""
+        self.result.total += 1
+        self.print_test("Test --plan dry-run planner")
+        
+        if not self.test_data_created:
+            self.print_skip("No test data available")
+            return False
+        
+        try:
+            sys.path.insert(0, '.')
+            from planner import estimate_duration
+            
+            results_dir = os.path.join(self.temp_dir, 'plan_results')
+            logs_dir = os.path.join(self.temp_dir, 'plan_logs')
+            cmd = [
+                self.script_path, '--plan', '--aiall', '--profile', 'sample',
+                '--fichier', f'{self.temp_dir}/data/test_chatgpt.json', f'{self.temp_dir}/data/test_claude.json',
+                '--prompt-text', 'Summarize this conversation',
+                '--plan-completion', '100', '--plan-latency', '2', '--rpm', '60',
+                '--target-logs', logs_dir, '--target-results', results_dir
+            ]
+            success, stdout, stderr = self.run_command(cmd, timeout=60)
+            # --plan returns early: the profiled stages are still saved
+            profils = list(Path(logs_dir, 'profiles').glob('profile_*.json'))
+            
+            # 120 requests at 60 rpm: the quota (2 min) dominates 5 workers x 2 s (48 s)
+            duration = estimate_duration(120, 50000, 1000, workers=5, latency=2.0, rpm=60)
+            
+            if (success and "Requests after splitting: 2 " in stdout and "Per format:" in stdout
+                    and "👉 pixtral-large-latest" in stdout and "bound by rpm" in stdout
+                    and not os.path.exists(os.path.join(results_dir, 'runs')) and len(profils) == 1
+                    and duration['bound'] == 'rpm' and duration['seconds'] == 120.0):
+                self.print_success("2 requests planned, costs per model, nothing sent or written")
+                return True
+            else:
+                self.print_fail(f"Unexpected plan: {stdout[-800:]} {stderr[-300:]} {duration}")
+                return False
+        except Exception as e:
+            self.print_fail(f"Plan error: {e}")
+            return False
+    
+    def test_virtual_clock(self):
+        """Test --virtual: discrete-event run against a simulated quota, in seconds."""
+        self.result.total += 1
+        self.print_test("Test --virtual clock simulation")
+        
+        try:
+            sys.path.insert(0, '.')
+            from synthetic_exports import generer_export
+            from benchmark import MockMistralServer
+            from retry_queue import RetryPolicy
+            from simulation import VirtualClock, VirtualRun
+            
+            # Unpaced workers against a 60 rpm quota: the instant 429s stay out of the latency
+            clock = VirtualClock()
+            server = MockMistralServer(latency='fixed:1', completion_tokens=50, rpm=60, clock=clock)
+            convs = [{'title': f"c{i}", 'messages': ["hello"], 'token_count': 100, '_task_id': f"t{i}"}
+                     for i in range(12)]
+            throttled = VirtualRun(convs, server, clock, workers=4, delay=0.0,
+                                   retry_policy=RetryPolicy(max_attempts=20)).run()
+            latency = throttled['metrics']['latency']
+            if not (throttled['statuses'].get('429') and latency['p50'] == 1.0
+                    and latency['count'] == throttled['statuses']['200']
+                    and throttled['metrics']['error_latency']['count'] == throttled['statuses']['429']):
+                self.print_fail(f"Throttled calls in latency: {throttled['statuses']} {latency}")
+                return False
+            
+            data_dir = os.path.join(self.temp_dir, 'virtual_data')
+            results_dir = os.path.join(self.temp_dir, 'virtual_results')
+            report_path = os.path.join(self.temp_dir, 'virtual_report.json')
+            export = generer_export('chatgpt', data_dir, conversations=200, seed=7)
+            cmd = [
+                self.script_path, '--virtual', '--aiall', '--fichier', *export['files'],
+                '--prompt-text', 'Summarize this conversation',
+                '--workers', '8', '--rpm', '60', '--max-retries', '20', '--no-circuit-breaker',
+                '--virtual-quota-rpm', '60', '--virtual-report', report_path,
+                '--target-logs', f'{self.temp_dir}/logs', '--target-results', results_dir
+            ]
+            success, stdout, stderr = self.run_command(cmd, timeout=120)
+            
+            with open(report_path, 'r', encoding='utf-8') as f:
+                rapport = json.load(f)
+            requetes = rapport['metrics']['requests']
+            
+            # 200 requests at 60 per minute take over 3 virtual minutes; paced at the
+            # provider quota, none of them is throttled
+            if (success and "Virtual run:" in stdout and requetes['final'] == 200
+                    and requetes['success'] == 200 and '429' not in rapport['statuses']
+                    and rapport['virtual_seconds'] >= 190 and rapport['timeline'][-1]['completed'] == 200
+                    and rapport['real_seconds'] < 30 and not os.path.exists(os.path.join(results_dir, 'runs'))):
+                self.print_success(f"200 requests without 429, "
+                                   f"{rapport['virtual_seconds']:.0f}s virtual in {rapport['real_seconds']:.1f}s")
+                return True
+            else:
+                self.print_fail(f"Unexpected simulation: {stdout[-800:]} {stderr[-300:]}")
+                return False
+        except Exception as e:
+            self.print_fail(f"Virtual clock error: {e}")
+            return False
+    
+    def test_compiled_template(self):
+        """Test precompiled prompt templates and the prompt loader cache."""
+        self.result.total += 1
+        self.print_test("Test compiled prompt templates")
+        
+        try:
+            sys.path.insert(0, '.')
+            from prompt_executor import PromptLoader, compile_template, template_token_cost
+            from utils import compter_tokens
+            
+            template = "---SYSTEM---\nYou review {FORMAT} chats.\n---USER---\n{TITLE} ({MESSAGE_COUNT}):\n{CONVERSATION_TEXT}\n"
+            conversation = {'title': 'Deploy', '_format': 'chatgpt', 'token_count': 12}
+            # Conversation text that looks like a placeholder or a marker stays literal
+            messages = ["User: what does {TITLE} mean?", "---USER--- is not a marker here"]
+            system_prompt, user_prompt = compile_template(template).render(conversation, messages)
+            
+            prompt_dir = os.path.join(self.temp_dir, 'compiled_prompts')
+            loader = PromptLoader(prompt_dir)
+            chemin = Path(prompt_dir) / 'prompt_cached.txt'
+            chemin.write_text("v1 {TITLE}", encoding='utf-8')
+            premier = loader.load_template('cached')
+            deuxieme = loader.load_template('cached')
+            chemin.write_text("version 2 {TITLE}", encoding='utf-8')
+            os.utime(chemin, ns=(chemin.stat().st_mtime_ns + 10**9,) * 2)
+            troisieme = loader.load_template('cached')
+            
+            if (system_prompt == "You review CHATGPT chats."
+                    and user_prompt == "Deploy (2):\nUser: what does {TITLE} mean?\n\n---USER--- is not a marker here"
+                    and template_token_cost(template) == compter_tokens(template)
+                    and premier is deuxieme and troisieme is not premier
+                    and loader.load_prompt('cached') == "version 2 {TITLE}"):
+                self.print_success("SYSTEM/USER split at compile time, one pass, reloaded on mtime change")
+                return True
+            else:
+                self.print_fail(f"Unexpected rendering: {system_prompt!r} / {user_prompt!r}")
+                return False
+        except Exception as e:
+            self.print_fail(f"Compiled template error: {e}")
+            return False
+    
+    def test_previous_run_stats(self):
+        """Test that the planner only learns latency and answer size from real runs."""
+        self.result.total += 1
+        self.print_test("Test planner defaults from previous runs")
+        
+        try:
+            import time
+            sys.path.insert(0, '.')
+            from planner import previous_run_stats
+            from run_metrics import RunMetrics
+            
+            runs_dir = os.path.join(self.temp_dir, "planner_runs")
+            
+            def enregistrer(run_id, age, model, completion, simulated=False):
+                metrics = RunMetrics(run_id=run_id, simulated=simulated)
+                for i in range(3):
+                    metrics.request_completed(
+                        {'_task_id': f"{run_id}-{i}"}, 1,
+                        {'success': True, 'model_used': model,
+                         'tokens_used': {'prompt_tokens': 100, 'completion_tokens': completion}},
+                        {'wait': 0.0, 'latency': 2.0}, True
+                    )
+                chemin = RunMetrics.path_for(runs_dir, run_id)
+                metrics.save(str(chemin))
+                os.utime(chemin, (time.time() - age, time.time() - age))
+            
+            # Only simulated runs: the planner must fall back to its defaults
+            enregistrer("simulate", 30, "simulated", 40, simulated=True)
+            enregistrer("old-simulate", 20, "simulated", 40)
+            enregistrer("empty", 10, "mistral-large-latest", 0)
+            only_simulated = previous_run_stats(runs_dir)
+            
+            enregistrer("real", 40, "mistral-large-latest", 250)
+            latest_real = previous_run_stats(runs_dir)
+            
+            if (only_simulated is None and latest_real
+                    and latest_real['run_id'] == "real" and latest_real['completion_tokens'] == 250):
+                self.print_success("simulated and zero-token runs skipped, real run used")
+                return True
+            else:
+                self.print_fail(f"Unexpected stats: {only_simulated} / {latest_real}")
+                return False
+        except Exception as e:
+            self.print_fail(f"Planner stats error: {e}")
+            return False
+    
+    def test_split_conversation(self):
+        """Test conversation splitting: two halves by default, recursive with an explicit budget."""
+        self.result.total += 1
+        self.print_test("Test conversation splitting")
+        
+        try:
+            sys.path.insert(0, '.')
+            from analyse_conversations_merged import decouper_conversation
+            from utils import compter_tokens
+            
+            conv = {"id": "split-test", "title": "Long"}
+            messages = [f"message {i} " + "word " * 200 for i in range(8)]
+            budget = compter_tokens("\n".join(messages[:3]))
+            
+            # Default: the old split, two halves even when a half is above the budget
+            parts = decouper_conversation(conv, messages, budget)
+            expected = [
+                {"title": "Long (Part 1/2)", "messages": messages[:4], "partie": "1/2",
+                 "token_count": compter_tokens("\n".join(messages[:4]))},
+                {"title": "Long (Part 2/2)", "messages": messages[4:], "partie": "2/2",
+                 "token_count": compter_tokens("\n".join(messages[4:]))}
+            ]
+            default_unchanged = (
+                [{k: p[k] for k in ("title", "messages", "partie", "token_count")} for p in parts] == expected
+                and parts[0]["conversation_id"] == parts[1]["conversation_id"]
+            )
+            
+            recursive = decouper_conversation(conv, messages, budget, recursif=True)
+            recursive_ok = (
+                len(recursive) == 4
+                and [p["partie"] for p in recursive] == ["1/4", "2/4", "3/4", "4/4"]
+                and sum((p["messages"] for p in recursive), []) == messages
+                and all(p["token_count"] <= budget for p in recursive)
+            )
+            
+            single = decouper_conversation(conv, messages[:1], 10, recursif=True)
+            single_ok = len(single) == 1 and single[0]["partie"] == "1/1" and single[0]["messages"] == messages[:1]
+            
+            if default_unchanged and recursive_ok and single_ok:
+                self.print_success("default keeps two halves, --chunk-tokens splits into 4 parts within budget")
+                return True
+            else:
+                self.print_fail(f"Unexpected split: default {[p['partie'] for p in parts]}, "
+                                f"recursive {[p['partie'] for p in recursive]}, single {len(single)}")
+                return False
+        except Exception as e:
+            self.print_fail(f"Split error: {e}")
+            return False
+    
     def test_duplicate_detection(self):
         """Test duplicate conversation detection."""
         self.result.total += 1
@@ -516,6 +1752,52 @@ Provide a brief summary.
             self.print_fail(f"Duplicate detection error: {e}")
             return False
     
+    def test_version_merge(self):
+        """Test merging of conversation snapshots across overlapping exports."""
+        self.result.total += 1
+        self.print_test("Test version merge")
+        
+        try:
+            sys.path.insert(0, '.')
+            from analyse_conversations_merged import fusionner_versions, charger_fichiers
+            
+            test_convs = [
+                {"title": "Conv", "conversation_id": "abc", "update_time": 100,
+                 "mapping": {"n1": {"message": {}}}, "_format": "chatgpt"},
+                {"title": "Conv", "conversation_id": "abc", "update_time": 300,
+                 "mapping": {"n1": {"message": {}}, "n2": {"message": {}}}, "_format": "chatgpt"},
+                {"title": "Conv", "conversation_id": "abc", "update_time": 200,
+                 "mapping": {}, "_format": "chatgpt"},
+                {"name": "Other", "uuid": "xyz", "updated_at": "2024-10-26T14:28:00.000Z",
+                 "chat_messages": [], "_format": "claude"}
+            ]
+            
+            # The loader streams overlapping export files through the same merge
+            merge_dir = os.path.join(self.temp_dir, 'merge_exports')
+            os.makedirs(merge_dir, exist_ok=True)
+            fichiers = []
+            for index, snapshots in enumerate((test_convs[:2], test_convs[2:3])):
+                chemin = os.path.join(merge_dir, f'export_{index}.json')
+                with open(chemin, 'w', encoding='utf-8') as f:
+                    json.dump(snapshots, f)
+                fichiers.append(chemin)
+            charges, stats, _ = charger_fichiers(fichiers, 'chatgpt', fusionner=True)
+            
+            result = fusionner_versions(test_convs)
+            merged = result['conversations_fusionnees']
+            
+            if (len(merged) == 2 and merged[0]['update_time'] == 300 and result['nb_versions_remplacees'] == 2
+                    and len(charges) == 1 and charges[0]['update_time'] == 300
+                    and stats['versions_remplacees'] == 2):
+                self.print_success("Kept newest of 3 snapshots, also when loading overlapping files")
+                return True
+            else:
+                self.print_fail(f"Unexpected merge result: {len(merged)} conversation(s)")
+                return False
+        except Exception as e:
+            self.print_fail(f"Version merge error: {e}")
+            return False
+    
     def test_simulation_mode(self):
         """Test simulation mode execution."""
         self.result.total += 1
@@ -546,6 +1828,77 @@ Provide a brief summary.
             self.print_fail(f"Simulation failed: {stderr}")
             return False
     
+    def test_rate_limiter(self):
+        """Test requests/tokens per minute buckets with a manual clock."""
+        self.result.total += 1
+        self.print_test("Test rate limiter")
+        
+        try:
+            from rate_limiter import RateLimiter
+            from benchmark import MockMistralServer
+            
+            clock = {'now': 0.0}
+            limiter = RateLimiter(requests_per_minute=60, tokens_per_minute=6000,
+                                  clock=lambda: clock['now'])
+            
+            first_wait = limiter.reserve(100)
+            next_wait = limiter.reserve(100)  # one second of quota per burst
+            clock['now'] += 10.0
+            refilled_wait = limiter.reserve(100)
+            
+            minute = RateLimiter(requests_per_minute=60, clock=lambda: clock['now'], burst=60)
+            minute_waits = [minute.reserve(0) for _ in range(60)]
+            
+            # Paced at the mock provider's own quota, no request is throttled
+            clock['now'] = 0.0
+            paced = RateLimiter(requests_per_minute=120, tokens_per_minute=60000, clock=lambda: clock['now'])
+            server = MockMistralServer(latency='fixed:0', completion_tokens=50, rpm=120, tpm=60000,
+                                       clock=lambda: clock['now'])
+            statuses = []
+            for _ in range(300):
+                clock['now'] += paced.reserve(400 + 100)
+                statuses.append(server.respond(400, 100)[0])
+            
+            if (first_wait == 0 and next_wait > 0 and refilled_wait == 0 and all(w == 0 for w in minute_waits)
+                    and statuses.count(200) == 300):
+                self.print_success(f"Waited {next_wait:.2f}s after a one-second burst, no 429 at the mock quota "
+                                   f"({clock['now']:.0f}s for 300 requests)")
+                return True
+            else:
+                self.print_fail(f"Unexpected waits: {first_wait}, {next_wait}, {refilled_wait}, "
+                                f"{statuses.count(429)} x 429")
+                return False
+        except Exception as e:
+            self.print_fail(f"Rate limiter error: {e}")
+            return False
+    
+    def test_adaptive_concurrency(self):
+        """Test AIMD increase on healthy responses and cut on 429."""
+        self.result.total += 1
+        self.print_test("Test adaptive concurrency")
+        
+        try:
+            from concurrency import AdaptiveConcurrency
+            
+            controller = AdaptiveConcurrency(initial=4, minimum=1, maximum=32)
+            for _ in range(40):
+                controller.record_response(200, 0.5)
+            grown = controller.limit
+            
+            controller.record_response(429, 0.1)
+            cut = controller.limit
+            controller.record_response(429, 0.1)  # still in cooldown
+            
+            if grown > 4 and cut == grown // 2 and controller.limit == cut:
+                self.print_success(f"4 -> {grown} -> {cut}")
+                return True
+            else:
+                self.print_fail(f"Unexpected limits: {grown}, {cut}, {controller.limit}")
+                return False
+        except Exception as e:
+            self.print_fail(f"Adaptive concurrency error: {e}")
+            return False
+    
     def test_directory_creation(self):
         """Test automatic directory creation."""
         self.result.total += 1
@@ -655,7 +2008,16 @@ Provide a brief summary.
         self.test_message_extraction()
         self.test_token_counting()
         self.test_prompt_loader()
+        self.test_executor_session()
+        self.test_async_engine()
+        self.test_deferred_retries()
+        self.test_breaker_worker_exception()
+        self.test_response_cache()
+        self.test_run_journal()
         self.test_duplicate_detection()
+        self.test_version_merge()
+        self.test_rate_limiter()
+        self.test_adaptive_concurrency()
         self.test_directory_creation()
         
         # Formatter tests
@@ -663,6 +2025,25 @@ Provide a brief summary.
         self.test_result_formatter_csv()
         self.test_result_formatter_json()
         self.test_result_formatter_markdown()
+        self.test_stream_writers()
+        self.test_results_store()
+        self.test_parquet_writer()
+        self.test_multi_format_export()
+        self.test_compressed_rotation()
+        self.test_background_logger()
+        self.test_run_metrics()
+        self.test_metrics_exporter()
+        self.test_stage_profiler()
+        self.test_event_log()
+        self.test_token_progress()
+        self.test_synthetic_exports()
+        self.test_benchmark_mock_server()
+        self.test_autotune()
+        self.test_plan()
+        self.test_virtual_clock()
+        self.test_compiled_template()
+        self.test_previous_run_stats()
+        self.test_split_conversation()
         
         # Data tests
         self.print_header("Data Integrity Tests")
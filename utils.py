@@ -33,14 +33,31 @@ def nettoyer_texte(texte: str) -> str:
     return texte.lower()
 
 
+# tiktoken encoding, loaded once per process (False: unavailable, word count fallback)
+_ENCODING = None
+
+
+def _encoding():
+    global _ENCODING
+    if _ENCODING is None:
+        try:
+            import tiktoken
+            _ENCODING = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            # Missing package or encoding file that cannot be downloaded: not retried on every call
+            _ENCODING = False
+    return _ENCODING
+
+
 def compter_tokens(texte: str) -> int:
     """Counts tokens with fallback."""
-    try:
-        import tiktoken
-        encoding = tiktoken.get_encoding("cl100k_base")
-        return len(encoding.encode(texte))
-    except Exception:
-        return len(texte.split())
+    encoding = _encoding()
+    if encoding:
+        try:
+            return len(encoding.encode(texte))
+        except Exception:
+            pass
+    return len(texte.split())
 
 
 def generer_nom_sortie(